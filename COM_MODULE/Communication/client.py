@@ -12,18 +12,46 @@
 from enum import Enum
 import select
 import socket
-from queue import Queue
 import threading
 import time
 
 # ---------------------------------------------------------------------------
 # Imports
 # ---------------------------------------------------------------------------
-from layer_core_communication.hl_core_communication import hl_tx_handling, hl_rx_handling
+from layer_core_communication.hl_core_communication import hl_tx_handling, hl_rx_handling, FrameDecoder
+from layer_core_communication.pl_core_communication import FragmentReassembler, MsgProtocol
+from layer_core_communication.core_messages import DebugMessage
+from layer_core_communication.wakeup import WakeupChannel, WakeupQueue, QueuePolicy
 from get_host_ip import GetHostIp, HostIpEvent
 
 exit_comm = False
 HOST_PORT = 6666
+# maximum number of messages in the queues of the layers
+TX_QUEUE_SIZE = 256
+RX_QUEUE_SIZE = 256
+# maximum time in seconds the communication thread waits for data before it checks exit_comm again
+RX_SELECT_TIMEOUT = 0.1
+# messages that are sent periodically, the oldest ones are dropped if the host falls behind
+TX_DROP_MESSAGES = (DebugMessage,)
+_TX_DROP_ADDRESSES = frozenset((message.add0, message.add1) for message in TX_DROP_MESSAGES)
+
+
+def tx_queue_policy(msg) -> tuple:
+    """
+    policy of a message in the tx queues of the client (QueuePolicy), as the tx queues of the HostServer classify
+    - periodic messages (TX_DROP_MESSAGES): the oldest messages are dropped once the queue is full
+    - everything else (acks, answers to the host, ...): never dropped, waits for space in the queue
+    :param msg: message of the message layer or translated message of the protocol layer
+    :return: policy, None
+    """
+    if isinstance(msg, (bytes, bytearray)):
+        periodic = len(msg) > MsgProtocol.ADD_1_POS and \
+            (msg[MsgProtocol.ADD_0_POS], msg[MsgProtocol.ADD_1_POS]) in _TX_DROP_ADDRESSES
+    else:
+        periodic = isinstance(msg, TX_DROP_MESSAGES)
+    if periodic:
+        return QueuePolicy.DROP_OLDEST, None
+    return QueuePolicy.BLOCK, None
 
 
 class SocketState(Enum):
@@ -47,10 +75,32 @@ class Socket:
         # Event used to share the Host-Ip between the two threads
         self.host_ip_event = HostIpEvent()
 
-        self.hl_tx_queue = Queue()
-        self.hl_rx_queue = Queue()
-        self.pl_ml_tx_queue = Queue()
-        self.pl_ml_rx_queue = Queue()
+        # the tx thread blocks on this channel until a message is put into the tx queue
+        self.hl_tx_wakeup = WakeupChannel()
+        # channels the workers of the protocol and message layer block on
+        self.pl_tx_wakeup = WakeupChannel()
+        self.pl_rx_wakeup = WakeupChannel()
+        self.ml_rx_wakeup = WakeupChannel()
+
+        # bounded queues: periodic messages to the host drop the oldest messages if the host falls behind, the other
+        # messages (f.e. acks) wait for space (tx_queue_policy), the messages of the host wait for space (the socket is
+        # not read in the meantime, which slows down the host)
+        self.hl_tx_queue = WakeupQueue(TX_QUEUE_SIZE, self.hl_tx_wakeup, self, classify=tx_queue_policy)
+        self.hl_rx_queue = WakeupQueue(RX_QUEUE_SIZE, self.pl_rx_wakeup, self)
+        self.pl_ml_tx_queue = WakeupQueue(TX_QUEUE_SIZE, self.pl_tx_wakeup, self, classify=tx_queue_policy)
+        self.pl_ml_rx_queue = WakeupQueue(RX_QUEUE_SIZE, self.ml_rx_wakeup, self)
+
+        # keeps frames that are split over several reads of the socket
+        self.frame_decoder = FrameDecoder()
+        # puts the fragments of large messages (f.e. experiments) of the host together again
+        self.fragment_reassembler = FragmentReassembler()
+
+    def queue_report(self) -> dict:
+        """
+        :return: dict with the report of every queue (depth, dropped, conflated, rejected, ...)
+        """
+        return {'hl_tx': self.hl_tx_queue.report(), 'hl_rx': self.hl_rx_queue.report(),
+                'pl_ml_tx': self.pl_ml_tx_queue.report(), 'pl_ml_rx': self.pl_ml_rx_queue.report()}
 
     def start(self):
         #todo: could this here be the problem?
@@ -80,14 +130,22 @@ class Socket:
     def _tx_thread(self):
         """
         - Routine of the tx-Thread is going to be executed
-        - loop through the clients and check if there are any data that is supposed to be sent
-        - check each queue and put data from there into the socket, flush to send data via socket
+        - sleep until a message is put into the tx queue (hl_tx_wakeup), no polling of the queue
+        - put the data from the queue into the socket
         :return: nothing
         """
         print("tx started")
         while True:
-            hl_tx_handling(self.hl_tx_queue, self.sock)
-            time.sleep(0.01)
+            key, _ = self.hl_tx_wakeup.wait()
+            if key is None:
+                continue
+            try:
+                hl_tx_handling(self.hl_tx_queue, self.sock)
+            except OSError:
+                # the connection is lost, the communication thread notices it and connects again
+                print("Could not send data to the host")
+            finally:
+                self.hl_tx_wakeup.done(key)
 
     def _comm_thread(self):
         """
@@ -112,15 +170,16 @@ class Socket:
 
     def _tick(self):
         """
-        once the Client received the Server-Ip via UDP it is going to tick periodically, checks if there is any data to
-        be received or transmitted, if yes the respective function for handling those tasks are started
+        once the Client received the Server-Ip via UDP it is going to tick periodically, waits (at most
+        RX_SELECT_TIMEOUT) until there is any data to be received, the data to be transmitted is written by the tx
+        thread as soon as it is queued
         :return: nothing
         """
         if self.socket_type == 'Client' and self.state == SocketState.NOT_CONNECTED:
             self._connect(self.server_address, self.server_port)
 
-        readable, writable, exceptional = select.select(self.input_connections, self.output_connections,
-                                                        self.input_connections, 0)
+        readable, _, exceptional = select.select(self.input_connections, [], self.input_connections,
+                                                 RX_SELECT_TIMEOUT)
 
         # rx data
         for connection in readable:
@@ -128,7 +187,7 @@ class Socket:
                 # save received data
                 data = connection.recv(8192)
                 # self.incoming_queue.put_nowait(data)
-                hl_rx_handling(data, self.hl_rx_queue, False)
+                hl_rx_handling(data, self.hl_rx_queue, False, self.frame_decoder)
 
             except (ConnectionResetError, ConnectionAbortedError, InterruptedError):
                 print("Connection lost")
@@ -138,10 +197,6 @@ class Socket:
                 self.state = SocketState.NOT_CONNECTED
                 return
 
-        # tx data
-        for connection in writable:
-            hl_tx_handling(self.hl_tx_queue, connection)
-
         for connection in exceptional:
             print("Server exception with " + connection.getpeername())
             self.input_connections.remove(connection)
@@ -165,10 +220,15 @@ class Socket:
             return
 
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # bytes of an incomplete frame of the old connection are not valid anymore
+        self.frame_decoder.reset()
+        self.fragment_reassembler = FragmentReassembler()
         if self.socket_type == "Client":
             print(
                 "Trying to connect client to {:s} on port {:d}...".format(str(self.server_address), self.server_port))
             self.sock.connect((self.server_address, self.server_port))
+            # do not delay small messages, batching is done by hl_tx_handling
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             print("Connected client to {:s} on port {:d}!".format(self.server_address, self.server_port))
             self.sock.setblocking(False)
             self.output_connections.append(self.sock)
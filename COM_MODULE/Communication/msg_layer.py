@@ -12,11 +12,11 @@ This file represents the message-layer of the application
 # ---------------------------------------------------------------------------
 # Module Imports
 # ---------------------------------------------------------------------------
-import threading
 # ---------------------------------------------------------------------------
 # Imports
 # ---------------------------------------------------------------------------
 from layer_core_communication.ml_core_communication import ml_tx_handling, ml_rx_handling
+from layer_core_communication.layer_runtime import LayerRuntime
 from Communication.client import Socket
 from layer_core_communication.core_messages import BaseMessage
 
@@ -27,31 +27,31 @@ class MessageLayer:
     - Responsible for:
         - interpreting received messages (raw-msgs) from the PL
         - create new Messages and send them to the PL
-
+    - the rx workers sleep until the PL put a message into the rx queue (wakeup channel of the client)
     """
-    def __init__(self, client: Socket):
+    def __init__(self, client: Socket, num_workers: int = 1):
         # variable to start protocol layer #todo
         self.pl_start = False
         self.client = client
 
-        # start ML transmit thread
-        pl_tx_thread = threading.Thread(target=self._ml_rx_thread)
-        pl_tx_thread.start()
+        # start ML receive workers
+        self.ml_rx_runtime = LayerRuntime(client.ml_rx_wakeup, self._ml_rx_handling, num_workers, "ml_rx")
+        self.ml_rx_runtime.start()
 
-    def _ml_rx_thread(self):
+    def stop(self):
         """
-        function used by rx_thread to handle protocol layer rx
+        stop the rx workers of the message layer
+        :return: nothing
         """
-        while True:
-            ml_rx_handling(self.client.pl_ml_rx_queue, True)
-
-    def send_msg(self, msg: BaseMessage):
-        self.client.pl_ml_tx_queue.put_nowait(msg)
-
-
-
-
-
-
+        self.ml_rx_runtime.stop()
 
+    @staticmethod
+    def _ml_rx_handling(client: Socket):
+        """
+        function used by the rx workers to handle message layer rx
+        """
+        ml_rx_handling(client.pl_ml_rx_queue, True)
 
+    def send_msg(self, msg: BaseMessage):
+        # waits for space if the queue is full of messages that must not be dropped (see tx_queue_policy)
+        self.client.pl_ml_tx_queue.put(msg)
@@ -12,42 +12,50 @@ This file represents the protocol layer of the application
 # ---------------------------------------------------------------------------
 # Module Imports 
 # ---------------------------------------------------------------------------
-import threading
-# ---------------------------------------------------------------------------
 # Imports 
 # ---------------------------------------------------------------------------
-from Communication.client import client, Socket
+from Communication.client import Socket
 from layer_core_communication.pl_core_communication import pl_tx_handling, pl_rx_handling
+from layer_core_communication.layer_runtime import LayerRuntime
 
 
 class ProtocolLayer:
     """
     The protocol layer is the middleman between HL and ML, it translates the tx/rx queues so that data can be
     exchanged between the two other layers
+    - the tx/rx workers sleep until the respective queue has data (wakeup channels of the client)
     """
-    def __init__(self, client: Socket):
+    def __init__(self, client: Socket, num_workers: int = 1):
         # variable to start protocol layer #todo
         self.pl_start = False
         self.client = client
 
-        # start PL transmit thread
-        pl_tx_thread = threading.Thread(target=self._pl_tx_thread)
-        pl_tx_thread.start()
+        # start PL transmit workers
+        self.pl_tx_runtime = LayerRuntime(client.pl_tx_wakeup, self._pl_tx_handling, num_workers, "pl_tx")
+        self.pl_tx_runtime.start()
+
+        # start PL receive workers
+        self.pl_rx_runtime = LayerRuntime(client.pl_rx_wakeup, self._pl_rx_handling, num_workers, "pl_rx")
+        self.pl_rx_runtime.start()
 
-        # start PL receive thread
-        pl_rx_thread = threading.Thread(target=self._pl_rx_thread)
-        pl_rx_thread.start()
+    def stop(self):
+        """
+        stop the tx/rx workers of the protocol layer
+        :return: nothing
+        """
+        self.pl_tx_runtime.stop()
+        self.pl_rx_runtime.stop()
 
-    def _pl_tx_thread(self):
+    @staticmethod
+    def _pl_tx_handling(client: Socket):
         """
-        function used by tx_thread to handle protocol layer tx
+        function used by the tx workers to handle protocol layer tx
         """
-        while True:
-            pl_tx_handling(client.pl_ml_tx_queue, client.hl_tx_queue)
+        pl_tx_handling(client.pl_ml_tx_queue, client.hl_tx_queue)
 
-    def _pl_rx_thread(self):
+    @staticmethod
+    def _pl_rx_handling(client: Socket):
         """
-        function used by rx_thread to handle protocol layer rx
+        function used by the rx workers to handle protocol layer rx
         """
-        while True:
-            pl_rx_handling(client.hl_rx_queue, client.pl_ml_rx_queue)
\ No newline at end of file
+        pl_rx_handling(client.hl_rx_queue, client.pl_ml_rx_queue, client.fragment_reassembler)
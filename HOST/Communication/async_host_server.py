@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+This module provides an asyncio based alternative to the HostServer: every robot connection is an asyncio.Protocol
+that frames (HL), validates (PL) and dispatches (ML) each message in the event loop, without handing it through the
+queues and threads of the layers. The event loop runs in its own thread, the Qt interface is connected through the
+Signals of the AsyncHostBridge (emitting a Signal from another thread is queued by Qt).
+The messages to a robot go through the same bounded tx queue (policies and TxPriority), setpoint channel and fan-out
+as with the HostServer, a connection stops writing while the write buffer of its transport is above
+TX_WRITE_BUFFER_HIGH (pause_writing/ resume_writing).
+Selected with ASYNC_HOST_SERVER (see main.py).
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import asyncio
+import queue
+import socket
+import threading
+from typing import Callable, Optional, Union
+
+# pyQt
+from PyQt5.QtCore import QObject, pyqtSignal as Signal
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+from Communication.client_registry import ClientRegistry, ClientRegistryFull
+from Communication.g_code.general import Message, msg_builder, tx_priority, tx_queue_policy
+from layer_core_communication.fanout import FanOut
+from layer_core_communication.hl_core_communication import FrameDecoder, EncodedFrame, cobs_encode_batch, \
+    TX_MAX_BATCH_BYTES
+from layer_core_communication.pl_core_communication import pl_create_raw_msgs_rx, pl_translate_msg_tx, \
+    pl_fragment_msg, RawMessage
+from layer_core_communication.setpoint import SetpointChannel
+from layer_core_communication.statistics import LatencyStatistics, TxStatistics
+from layer_core_communication.wakeup import WakeupQueue, TxPriority
+from params import SERVER_PORT, MAX_CLIENTS, TX_QUEUE_SIZE, TX_FRAGMENT_SIZE, TX_CONFLATE_MSG_IDS, \
+    TX_WRITE_BUFFER_HIGH
+
+# ---------------------------------------------------------------------------
+
+
+class AsyncHostBridge(QObject):
+    """
+    Signals of the AsyncHostServer, they can be connected to the slots of an interface like the Signals of the
+    HostServer
+    """
+    new_client_accepted_signal = Signal(str, int)
+    client_disconnected_signal = Signal(str, int)
+    # (RobotProtocol, RawMessage)
+    message_received_signal = Signal(object, object)
+
+
+class RobotProtocol(asyncio.Protocol):
+    """
+    - connection of one robot
+    - HL: data_received() decodes all complete frames of the stream
+    - PL: every frame is validated and translated into a raw message
+    - ML: the raw message is dispatched to the handler of the AsyncHostServer right away
+    - tx: the messages are put into a bounded tx queue with the policies and priorities of the tx queue of a Client
+      (tx_queue_policy, tx_priority), control inputs go through the setpoint channel, a put never blocks the event
+      loop (a message that does not fit is not sent)
+    - flow control: while the write buffer of the transport is above TX_WRITE_BUFFER_HIGH nothing is written, the
+      messages wait in the tx queue
+    """
+
+    def __init__(self, server: "AsyncHostServer"):
+        self.server = server
+        self.transport = None
+        # set by the ClientRegistry
+        self.id = None
+        self.name = None
+        self.ip = None
+        self.port = None
+        self.frame_decoder = FrameDecoder()
+        # only used in the event loop thread, the locks of the queue are never contended
+        self.tx_queue = WakeupQueue(TX_QUEUE_SIZE, classify=tx_queue_policy, priority=tx_priority)
+        # newest control input per msg id, written before the messages of the tx queue
+        self.setpoints = SetpointChannel()
+        # set by pause_writing() until the transport calls resume_writing()
+        self._paused = False
+        self._tx_scheduled = False
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        sock = transport.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport.set_write_buffer_limits(high=TX_WRITE_BUFFER_HIGH)
+        ip, port = transport.get_extra_info('peername')[:2]
+        self.server.register(self, ip, port)
+
+    def connection_lost(self, exc):
+        self.server.unregister(self)
+        self.transport = None
+        # the frames that are still queued are never going to be written, a FanOut must not wait for them
+        while True:
+            try:
+                data = self.tx_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(data, EncodedFrame):
+                data.failed()
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        self._schedule_flush()
+
+    def data_received(self, data: bytes):
+        # frames with a wrong crc8 are dropped (see PL_RX_STATISTICS)
+        for raw_message in pl_create_raw_msgs_rx(self.frame_decoder.feed(data)):
+            self.server.dispatch(self, raw_message)
+
+    def send(self, buffer) -> bool:
+        """
+        queue a translated message, every message queued in the same iteration of the event loop is written at once
+        - has to be called from the event loop thread
+        :param buffer: translated (not encoded) message, a large message is split into fragments, or EncodedFrame
+        :return: false if the tx queue is full or the connection is lost and the message has not been queued
+                 (completely)
+        """
+        if self.transport is None:
+            return False
+        fragments = (buffer,) if isinstance(buffer, EncodedFrame) else pl_fragment_msg(buffer, TX_FRAGMENT_SIZE)
+        if len(fragments) > TX_QUEUE_SIZE - self.tx_queue.qsize() and not self._paused:
+            # the queue only fills up while the transport does not take more data (f.e. many messages have been sent
+            # within one iteration of the event loop)
+            self._flush()
+        if len(fragments) > 1 and len(fragments) > TX_QUEUE_SIZE - self.tx_queue.qsize():
+            # the fragments would not fit, none of them is queued
+            print("tx queue of", self.name, "is full, message not sent!")
+            return False
+        try:
+            for fragment in fragments:
+                self.tx_queue.put_nowait(fragment)
+        except queue.Full:
+            print("tx queue of", self.name, "is full, message not sent!")
+            return False
+        self._schedule_flush()
+        return True
+
+    def set_setpoint(self, key, command):
+        """
+        set the newest control input of a msg id, has to be called from the event loop thread
+        :param key: msg id
+        :param command: translated message
+        :return: nothing
+        """
+        self.setpoints.set(key, command)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if not self._tx_scheduled:
+            self._tx_scheduled = True
+            self.server.loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._tx_scheduled = False
+        while self.transport is not None and not self._paused:
+            batch = self.setpoints.take()
+            batch_bytes = sum(len(data) for data in batch)
+            bulk = False
+            while batch_bytes < TX_MAX_BATCH_BYTES:
+                try:
+                    data = self.tx_queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(data)
+                batch_bytes += len(data)
+                if tx_priority(data) is TxPriority.BULK:
+                    bulk = True
+                    break
+            if not batch:
+                return
+            data = cobs_encode_batch(batch)
+            self.server.tx_statistics.add_write(len(batch), len(data))
+            # calls pause_writing() once the write buffer exceeds the high-water mark
+            self.transport.write(data)
+            for frame in batch:
+                if isinstance(frame, EncodedFrame):
+                    frame.sent()
+            if bulk:
+                # the next fragment is written in the next iteration of the event loop, so a message of a higher
+                # priority that is sent in the meantime waits for one fragment only
+                self._schedule_flush()
+                return
+
+
+class AsyncHostServer:
+    """
+    - asyncio based Host Server, the event loop and all connections run in a single thread
+    - send_message() can be called from any thread
+    """
+
+    def __init__(self, ip: str, port: int = SERVER_PORT, max_clients: int = MAX_CLIENTS,
+                 message_handler: Callable[[RobotProtocol, RawMessage], None] = None, bridge: AsyncHostBridge = None,
+                 forward_messages: bool = False):
+        """
+        :param ip: address the server is listening on
+        :param port: port the server is listening on
+        :param max_clients: maximum number of robots that are connected at the same time
+        :param message_handler: called in the event loop thread for every valid message (ML)
+        :param bridge: Qt Signals that are emitted for new/ lost connections (and messages)
+        :param forward_messages: if true every message is also emitted via bridge.message_received_signal
+        """
+        self.ip = ip
+        self.port = port
+        self.message_handler = message_handler
+        self.bridge = bridge
+        self.forward_messages = forward_messages
+        self.loop = asyncio.new_event_loop()
+        self.clients = ClientRegistry(max_clients)
+        self.tx_statistics = TxStatistics()
+        # time between the first and the last write of a message that is sent to several clients
+        self.fanout_skew = LatencyStatistics()
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+
+    def start(self):
+        """
+        start the event loop thread and listen for new connections
+        :return: nothing
+        """
+        self._thread = threading.Thread(target=self._run, name="async_host_server", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self):
+        """
+        close all connections and stop the event loop thread
+        :return: nothing
+        """
+        future = asyncio.run_coroutine_threadsafe(self._close(), self.loop)
+        future.result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self._server = self.loop.run_until_complete(
+            self.loop.create_server(lambda: RobotProtocol(self), self.ip, self.port))
+        # port 0 -> the system selects a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        print("Async Host Server is listening on", self.ip, ":", self.port, "!\n")
+        self._started.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _close(self):
+        for client in self.clients.snapshot():
+            client.transport.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def register(self, client: RobotProtocol, ip: str, port: int):
+        try:
+            self.clients.add(client, ip, port)
+        except ClientRegistryFull:
+            # do not accept more clients than max number of clients
+            client.transport.close()
+            return
+        print("New connection from", client.name, client.ip, ":", client.port, "!\n")
+        if self.bridge is not None:
+            self.bridge.new_client_accepted_signal.emit(client.ip, client.port)
+
+    def unregister(self, client: RobotProtocol):
+        if not self.clients.remove(client):
+            return
+        print("Client socket", client.name, client.ip, "closed and removed from the registry!")
+        if self.bridge is not None:
+            self.bridge.client_disconnected_signal.emit(client.ip, client.port)
+
+    def dispatch(self, client: RobotProtocol, raw_message: RawMessage):
+        if self.message_handler is not None:
+            self.message_handler(client, raw_message)
+        if self.forward_messages and self.bridge is not None:
+            self.bridge.message_received_signal.emit(client, raw_message)
+
+    def send_message(self, msg, client: Union[RobotProtocol, int, list] = None) -> Optional[FanOut]:
+        """
+        send a message to selected clients, can be called from any thread
+        - the message is translated once in the calling thread, the write happens in the event loop
+        - control inputs (TX_CONFLATE_MSG_IDS): only the newest one of every msg id is sent
+        - a message to several clients is encoded once and shared by their tx queues (FanOut)
+        :param msg: message that has to be sent
+        :param client: a client, its id or name, a list of clients or None for all clients
+        :return: FanOut of the (last fragment of the) message if it is sent to several clients, else None
+        """
+        if isinstance(msg, Message):
+            buffer = bytes(msg_builder(msg))
+        else:
+            buffer = pl_translate_msg_tx(msg)
+        recipients = self._recipients(client)
+        if isinstance(msg, Message) and msg.id in TX_CONFLATE_MSG_IDS:
+            for recipient in recipients:
+                self.loop.call_soon_threadsafe(recipient.set_setpoint, msg.id, buffer)
+            return None
+        if len(recipients) > 1:
+            fanouts = [FanOut(fragment, recipients, self.fanout_skew, priority=tx_priority(fragment))
+                       for fragment in pl_fragment_msg(buffer, TX_FRAGMENT_SIZE)]
+            self.loop.call_soon_threadsafe(self._send_fanouts, fanouts)
+            return fanouts[-1]
+        for recipient in recipients:
+            self.loop.call_soon_threadsafe(recipient.send, buffer)
+        return None
+
+    def _recipients(self, client) -> tuple:
+        if client is None:
+            return self.clients.snapshot()
+        if isinstance(client, RobotProtocol):
+            return client,
+        if isinstance(client, list):
+            return tuple(client)
+        recipient = self.clients.get(client)
+        return () if recipient is None else (recipient,)
+
+    @staticmethod
+    def _send_fanouts(fanouts: list):
+        failed = set()
+        for fanout in fanouts:
+            for recipient in fanout.recipients:
+                frame = fanout.frame(recipient)
+                if recipient in failed or not recipient.send(frame):
+                    failed.add(recipient)
+                    frame.failed()
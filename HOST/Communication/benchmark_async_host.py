@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+simulate many robots that are connected to the AsyncHostServer: every robot sends DebugMessages with a fixed rate, the
+host echoes every message back, the robot measures the round trip time
+usage (from the HOST directory): python -m Communication.benchmark_async_host [num_robots] [rate] [duration]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import asyncio
+import sys
+import time
+from collections import deque
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.async_host_server import AsyncHostServer
+from layer_core_communication.core_messages import DebugMessage
+from layer_core_communication.hl_core_communication import FrameDecoder, cobs_encode_batch
+from layer_core_communication.pl_core_communication import pl_translate_msg_tx
+from layer_core_communication.statistics import LatencyStatistics
+
+
+async def _robot(ip: str, port: int, rate: float, duration: float, statistics: LatencyStatistics):
+    reader, writer = await asyncio.open_connection(ip, port)
+    decoder = FrameDecoder()
+    frame = bytes(cobs_encode_batch([pl_translate_msg_tx(DebugMessage(1, 2, 3, 4, 5, 6, 7, 8, 9, 10))]))
+    sent = deque()
+
+    async def receive():
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            for _ in decoder.feed(data):
+                statistics.add(time.perf_counter() - sent.popleft())
+
+    receiver = asyncio.ensure_future(receive())
+    period = 1 / rate
+    end = time.perf_counter() + duration
+    next_time = time.perf_counter()
+    while next_time < end:
+        sent.append(time.perf_counter())
+        writer.write(frame)
+        next_time += period
+        await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+    # wait for the last echos
+    await asyncio.sleep(0.5)
+    writer.close()
+    receiver.cancel()
+
+
+def bench_echo(num_robots: int = 100, rate: float = 100.0, duration: float = 5.0) -> dict:
+    """
+    :return: round trip report (seconds) and the cpu time of the host per message
+    """
+    received = [0]
+    answer = DebugMessage(10, 9, 8, 7, 6, 5, 4, 3, 2, 1)
+
+    def echo(client, raw_message):
+        # called in the event loop thread
+        received[0] += 1
+        client.send(pl_translate_msg_tx(answer))
+
+    server = AsyncHostServer('127.0.0.1', 0, max_clients=num_robots, message_handler=echo)
+    server.start()
+    statistics = LatencyStatistics(window_size=num_robots * int(rate * duration))
+
+    async def run_robots():
+        await asyncio.gather(*[_robot(server.ip, server.port, rate, duration, statistics) for _ in range(num_robots)])
+
+    cpu_start = time.process_time()
+    asyncio.run(run_robots())
+    cpu = time.process_time() - cpu_start
+    server.stop()
+    report = statistics.report()
+    report['received'] = received[0]
+    report['expected'] = num_robots * int(rate * duration)
+    # robots and host share the process -> upper bound for the host
+    report['cpu_per_message'] = cpu / max(1, received[0])
+    report['tx'] = server.tx_statistics.report()
+    return report
+
+
+if __name__ == '__main__':
+    arguments = [float(x) for x in sys.argv[1:4]]
+    robots = int(arguments[0]) if len(arguments) > 0 else 100
+    result = bench_echo(robots, *arguments[1:])
+    print("robots={} received={}/{} rtt mean={:.2f}ms p99={:.2f}ms max={:.2f}ms cpu/msg={:.1f}us "
+          "writes/msg={:.3f}".format(robots, result['received'], result['expected'], result['mean'] * 1e3,
+                                     result['p99'] * 1e3, result['max'] * 1e3, result['cpu_per_message'] * 1e6,
+                                     result['tx']['writes_per_message']))
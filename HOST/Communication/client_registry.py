@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+This module provides the registry of the clients that are connected to the Host Server. Clients can be looked up by
+their id, their name (f.e. "TWIPR_0") and their peer address in constant time. A robot keeps its id (and name) when it
+reconnects from the same ip, the ids of the last max_known clients that are gone are remembered for this.
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterator, Tuple
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+
+# prefix of the default name of a client, the id is appended
+CLIENT_NAME_PREFIX = "TWIPR_"
+
+
+class ClientRegistryFull(Exception):
+    """
+    raised if a client is added while max_clients clients are registered
+    """
+    pass
+
+
+class ClientNameTaken(Exception):
+    """
+    raised if a client is added or renamed with the name of another registered client
+    """
+    pass
+
+
+class ClientRegistry:
+    """
+    - clients indexed by id, name and peer address (ip, port)
+    - the id of a client is stable: a robot that reconnects from the same ip (or with the same name) gets its old id,
+      the ids of clients that are gone are forgotten in the order they left once there are more than max_known
+    - names are unique, a default name that is taken gets the port appended
+    - add, remove and all lookups are O(1)
+    - iterating is safe while other threads add/ remove clients: it runs over a snapshot that is replaced (not
+      modified) on every change
+    - the clients have to provide the attributes id, name, ip and port, they are set by the registry
+    """
+
+    def __init__(self, max_clients: int = 10, max_known: int = None):
+        """
+        :param max_clients: maximum number of clients that can be registered at the same time
+        :param max_known: maximum number of clients that are gone whose ids are kept for a reconnect, default:
+                          4 * max_clients
+        """
+        self.max_clients = max_clients
+        self.max_known = 4 * max_clients if max_known is None else max_known
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, object] = {}
+        self._by_name: Dict[str, object] = {}
+        self._by_address: Dict[Tuple[str, int], object] = {}
+        # ip/ name -> id that has been assigned before, so that the id survives reconnects
+        self._known_ids: Dict[Hashable, int] = {}
+        # id -> keys of _known_ids that point to it
+        self._keys_by_id: Dict[int, set] = {}
+        # ids of the clients that are gone, the oldest first
+        self._departed: OrderedDict = OrderedDict()
+        self._next_id = 0
+        self._snapshot: tuple = ()
+
+    def add(self, client, ip: str, port: int, name: str = None) -> int:
+        """
+        register a client, the id is reused if the ip (or the name) has been registered before
+        :param client: client that is registered
+        :param ip: peer ip of the client
+        :param port: peer port of the client
+        :param name: name of the client, default: CLIENT_NAME_PREFIX + id, raises ClientNameTaken if the name is used
+                     by another client
+        :return: id of the client
+        """
+        with self._lock:
+            if len(self._by_id) >= self.max_clients:
+                raise ClientRegistryFull("max number of clients ({}) reached".format(self.max_clients))
+            if name is not None and name in self._by_name:
+                raise ClientNameTaken("name {} is used by another client".format(name))
+            client_id = self._known_ids.get(name) if name is not None else None
+            if client_id is None or client_id in self._by_id:
+                client_id = self._known_ids.get(ip)
+            if client_id is None or client_id in self._by_id:
+                client_id = self._next_id
+                self._next_id += 1
+            if name is None:
+                name = CLIENT_NAME_PREFIX + str(client_id)
+                if name in self._by_name:
+                    # another client has been renamed to the default name
+                    name = "{}_{}".format(name, port)
+            self._departed.pop(client_id, None)
+            client.id = client_id
+            client.name = name
+            client.ip = ip
+            client.port = port
+            self._by_id[client_id] = client
+            self._by_name[name] = client
+            self._by_address[(ip, port)] = client
+            self._remember(ip, client_id)
+            self._remember(name, client_id)
+            self._snapshot = tuple(self._by_id.values())
+        return client_id
+
+    def remove(self, client) -> bool:
+        """
+        unregister a client, its id stays reserved for a reconnect until max_known other clients have left
+        :param client: client that is removed
+        :return: false if the client was not registered
+        """
+        with self._lock:
+            if self._by_id.get(client.id) is not client:
+                return False
+            del self._by_id[client.id]
+            if self._by_name.get(client.name) is client:
+                del self._by_name[client.name]
+            if self._by_address.get((client.ip, client.port)) is client:
+                del self._by_address[(client.ip, client.port)]
+            self._departed[client.id] = None
+            while len(self._departed) > self.max_known:
+                self._forget(self._departed.popitem(last=False)[0])
+            self._snapshot = tuple(self._by_id.values())
+        return True
+
+    def rename(self, client, name: str):
+        """
+        change the name of a registered client (f.e. once the robot reported its name)
+        :param client: registered client
+        :param name: new name
+        :return: nothing, raises ClientNameTaken if the name is used by another client
+        """
+        with self._lock:
+            owner = self._by_name.get(name)
+            if owner is client:
+                return
+            if owner is not None:
+                raise ClientNameTaken("name {} is used by another client".format(name))
+            if self._by_name.get(client.name) is client:
+                del self._by_name[client.name]
+            # the old name does not identify the robot anymore
+            if self._known_ids.get(client.name) == client.id:
+                del self._known_ids[client.name]
+                self._keys_by_id[client.id].discard(client.name)
+            client.name = name
+            self._by_name[name] = client
+            self._remember(name, client.id)
+
+    def _remember(self, key: Hashable, client_id: int):
+        # key (ip/ name) -> id for a reconnect, a key that pointed to another id is taken over
+        previous = self._known_ids.get(key)
+        if previous is not None and previous != client_id:
+            keys = self._keys_by_id[previous]
+            keys.discard(key)
+            if not keys and previous in self._departed:
+                # nothing refers to the id of the client that is gone anymore
+                del self._departed[previous]
+                del self._keys_by_id[previous]
+        self._known_ids[key] = client_id
+        self._keys_by_id.setdefault(client_id, set()).add(key)
+
+    def _forget(self, client_id: int):
+        for key in self._keys_by_id.pop(client_id, ()):
+            del self._known_ids[key]
+
+    def get_by_id(self, client_id: int):
+        return self._by_id.get(client_id)
+
+    def get_by_name(self, name: str):
+        return self._by_name.get(name)
+
+    def get_by_address(self, ip: str, port: int):
+        return self._by_address.get((ip, port))
+
+    def get(self, key):
+        """
+        :param key: id (int), name (str) or address ((ip, port))
+        :return: client or None
+        """
+        if isinstance(key, int):
+            return self.get_by_id(key)
+        if isinstance(key, str):
+            return self.get_by_name(key)
+        if isinstance(key, tuple):
+            return self.get_by_address(*key)
+        return None
+
+    def is_full(self) -> bool:
+        return len(self._snapshot) >= self.max_clients
+
+    def snapshot(self) -> tuple:
+        """
+        :return: the registered clients at the time of the call
+        """
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._snapshot)
+
+    def __contains__(self, client) -> bool:
+        return self._by_id.get(getattr(client, 'id', None)) is client
+
+    def __getitem__(self, client_id: int):
+        """
+        lookup by id, raises KeyError for an unknown id
+        """
+        return self._by_id[client_id]
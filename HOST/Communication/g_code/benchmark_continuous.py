@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the decoding of MSG_HOST_IN_CONTINIUOS: every payload decoded and handled as its own message (ctypes) is
+compared to batches of payloads decoded with one np.frombuffer call and handled at once
+usage (from the HOST directory): python -m Communication.g_code.benchmark_continuous [num_samples] [batch_size]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.data import Robot
+from Communication.g_code.general import Message
+from Communication.g_code.messages import CONTINUOUS_DTYPE, MSG_HOST_IN_CONTINIUOS, decode_continuous
+
+
+def generate_payloads(num_samples: int, seed: int = 0) -> list:
+    """
+    :return: list of num_samples payloads of MSG_HOST_IN_CONTINIUOS with random states
+    """
+    rng = np.random.default_rng(seed)
+    records = np.zeros(num_samples, dtype=CONTINUOUS_DTYPE)
+    records['tick'] = np.arange(num_samples)
+    records['fsm_state'] = 2
+    records['ctrl_state'] = 2
+    for field in ('x', 'y', 'v', 'theta', 'theta_dot', 'psi', 'psi_dot', 'gyr', 'acc', 'u'):
+        records[field] = rng.uniform(-1, 1, records[field].shape)
+    return [records[index:index + 1].tobytes() for index in range(num_samples)]
+
+
+def bench_single(payloads: list) -> float:
+    """
+    :return: seconds per sample if every payload is handled as its own message (and logged once)
+    """
+    robot_ui_object = SimpleNamespace(robot=Robot(10), update_checkboxes_flag=False)
+    start = time.perf_counter()
+    for payload in payloads:
+        msg = Message()
+        msg.raw_data = payload
+        MSG_HOST_IN_CONTINIUOS(msg).handler(robot_ui_object, None, None)
+        robot_ui_object.robot.data_logs.log()
+    return (time.perf_counter() - start) / len(payloads)
+
+
+def bench_batch(payloads: list, batch_size: int) -> float:
+    """
+    :return: seconds per sample if the payloads are decoded and handled in batches
+    """
+    robot_ui_object = SimpleNamespace(robot=Robot(10), update_checkboxes_flag=False)
+    start = time.perf_counter()
+    for index in range(0, len(payloads), batch_size):
+        MSG_HOST_IN_CONTINIUOS.batch_handler(robot_ui_object, decode_continuous(payloads[index:index + batch_size]))
+    return (time.perf_counter() - start) / len(payloads)
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    samples = generate_payloads(number)
+    single = bench_single(samples)
+    batched = bench_batch(samples, batch)
+    print("single: {:.2f}us/sample, batch of {}: {:.2f}us/sample ({:.1f}x)".format(single * 1e6, batch,
+                                                                                batched * 1e6, single / batched))
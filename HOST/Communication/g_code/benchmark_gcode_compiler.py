@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the compiled G-code programs: a generated script is executed (without delays) once by parsing every line
+and once from its cached program, the time until the first frame is sent, the total time and the cpu time are compared.
+Every frame of the program has to keep the priority it would get in the tx queues if the line was parsed.
+usage (from the HOST directory): python -m Communication.g_code.benchmark_gcode_compiler [num_lines]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import os
+import sys
+import tempfile
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.benchmark_gcode_parser import generate_script
+from Communication.g_code.file_execution import FileExecution
+from Communication.g_code.gcode_compiler import load_program, STEP_FRAME
+from Communication.g_code.general import Message, msg_builder, tx_priority
+from layer_core_communication.hl_core_communication import FrameDecoder, encode_frame
+from layer_core_communication.pl_core_communication import pl_translate_msg_tx
+
+
+class _Sent:
+    """
+    stands in for the FanOut of a message that has already been written
+    """
+
+    @staticmethod
+    def wait(timeout: float = None) -> bool:
+        return True
+
+    @staticmethod
+    def done() -> bool:
+        return True
+
+
+def bench_execution(path: str, cache_directory: str = None) -> dict:
+    """
+    execute a G-code file, the messages are translated and encoded like HostServer.broadcast does, but not sent
+    :param path: path of the G-code file
+    :param cache_directory: if given, the program of the file in this directory is executed
+    :return: dict with seconds until the first frame, seconds, cpu seconds and number of messages
+    """
+    first = []
+    sent = _Sent()
+
+    def send(msg):
+        encode_frame(msg_builder(msg) if isinstance(msg, Message) else pl_translate_msg_tx(msg))
+        if not first:
+            first.append(time.perf_counter())
+        return sent
+
+    def send_encoded(data, priority):
+        if not first:
+            first.append(time.perf_counter())
+        return sent
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    program = load_program(path, cache_directory) if cache_directory is not None else None
+    execution = FileExecution(path, send, window=1 << 30, honor_delays=False, program=program,
+                              send_encoded=send_encoded)
+    execution.start()
+    execution.wait()
+    seconds = time.perf_counter() - start
+    return {'first': first[0] - start if first else 0.0, 'seconds': seconds,
+            'cpu': time.process_time() - cpu_start, 'messages': execution.progress()['messages']}
+
+
+def check_priorities(path: str, cache_directory: str):
+    """
+    every frame of the program of a G-code file has to have the priority of the decoded frame (tx_priority)
+    :return: nothing, raises AssertionError
+    """
+    program = load_program(path, cache_directory)
+    try:
+        # copy the frames, the views into the program must not outlive it
+        frames = [(bytes(data), line_number, priority) for kind, data, _, line_number, priority in program
+                  if kind == STEP_FRAME]
+    finally:
+        program.close()
+    decoder = FrameDecoder()
+    for data, line_number, priority in frames:
+        frame, = decoder.feed(data)
+        assert priority is tx_priority(frame), "line {}: frame stored as {}, sent as {}".format(
+            line_number, priority, tx_priority(frame))
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, 'bench.gcode')
+        cache = os.path.join(directory, 'cache')
+        generate_script(script, number)
+        results = [('parse', bench_execution(script)),
+                   ('compile', bench_execution(script, cache)),
+                   ('cached', bench_execution(script, cache))]
+        check_priorities(script, cache)
+    print("{:<10}{:>12}{:>12}{:>12}{:>12}".format('', 'first [ms]', 'total [s]', 'cpu [s]', 'messages'))
+    for name, result in results:
+        print("{:<10}{:>12.3f}{:>12.3f}{:>12.3f}{:>12}".format(name, result['first'] * 1000, result['seconds'],
+                                                            result['cpu'], result['messages']))
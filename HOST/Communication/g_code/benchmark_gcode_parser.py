@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the G-code parser: a generated motion script (control inputs with delays and some configuration and state
+changes) is written to a temporary file and every line is parsed
+usage (from the HOST directory): python -m Communication.g_code.benchmark_gcode_parser [num_lines]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import os
+import random
+import sys
+import tempfile
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.gcode_parser import GCODEParser
+
+
+def generate_script(path: str, num_lines: int, seed: int = 0):
+    """
+    write a generated G-code script with num_lines lines
+    :param path: file that is written
+    :param num_lines: number of lines
+    :param seed: seed of the random numbers
+    :return: nothing
+    """
+    rng = random.Random(seed)
+    with open(path, 'w') as file:
+        for index in range(num_lines):
+            kind = index % 20
+            if kind < 12:
+                line = "G1 u({:.3f},{:.3f})".format(rng.uniform(-1, 1), rng.uniform(-1, 1))
+            elif kind < 16:
+                line = "G1 x{:.3f} p{:.3f}".format(rng.uniform(-2, 2), rng.uniform(-2, 2))
+            elif kind < 18:
+                line = "M5 T{:.2f}".format(rng.uniform(0, 1))
+            elif kind == 18:
+                line = "G3 p{:.2f} i{:.2f} d{:.2f} l1 min-1 max1".format(rng.random(), rng.random(), rng.random())
+            else:
+                line = "M2 S{}".format(rng.randint(0, 3))
+            file.write(line + "\n")
+
+
+def bench_parse(path: str) -> dict:
+    """
+    :return: dict with number of lines, seconds, lines per second and number of invalid lines
+    """
+    parser = GCODEParser()
+    invalid = 0
+    lines = 0
+    start = time.perf_counter()
+    with open(path) as file:
+        for line in file:
+            output = parser.parse(line.rstrip('\n'))
+            lines += 1
+            if isinstance(output, list) and output[0]['type'] == 'M60':
+                invalid += 1
+    seconds = time.perf_counter() - start
+    return {'lines': lines, 'seconds': seconds, 'lines_per_second': lines / seconds, 'invalid': invalid}
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, 'bench.gcode')
+        generate_script(script, number)
+        result = bench_parse(script)
+    print("parsed {} lines in {:.3f}s: {:.0f} lines/s ({} invalid)".format(result['lines'], result['seconds'],
+                                                                         result['lines_per_second'],
+                                                                         result['invalid']))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the experiment/ sequence loader: load time of an experiment (inputs in the YAML or in a sequence file) and
+a sequence when the file is parsed, when it is in the cache and when it has been written with the same content (hash),
+and the time until a sequence file that exceeds MAX_INPUT_LENGTH is rejected compared to reading it completely
+usage (from the HOST directory): python -m Communication.g_code.benchmark_loader [repetitions]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import yaml
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.loader import FileLoader, LoadError
+from params import MAX_INPUT_LENGTH
+
+# samples of the file that is rejected
+_OVERSIZE_SAMPLES = 1000000
+
+
+def write_files(directory: str) -> dict:
+    """
+    :return: name -> (path, load function name) of the benchmarked files
+    """
+    rng = np.random.default_rng(0)
+    inputs = rng.uniform(-1, 1, (MAX_INPUT_LENGTH, 2)).astype(np.float32)
+    settings = {'sampling_frequency': 50, 'duration': 40, 'hardware_version': 1.0, 'software_version': 1.0,
+                'ctrl_state': 'STATE_FEEDBACK', 'logging': True, 'abort': ['abs_theta > 0.5', 'abs_x > 2']}
+    sequence_path = os.path.join(directory, 'sequence.csv')
+    with open(sequence_path, 'w') as file:
+        file.write('# ctrl_state: DIRECT\ninput1,input2\n')
+        file.writelines('{!r},{!r}\n'.format(*row) for row in inputs.tolist())
+    inline_path = os.path.join(directory, 'inline.yaml')
+    with open(inline_path, 'w') as file:
+        yaml.safe_dump(dict(settings, input1=inputs[:, 0].tolist(), input2=inputs[:, 1].tolist()), file)
+    csv_path = os.path.join(directory, 'csv.yaml')
+    with open(csv_path, 'w') as file:
+        yaml.safe_dump(dict(settings, inputs='sequence.csv'), file)
+    oversize_path = os.path.join(directory, 'oversize.csv')
+    with open(oversize_path, 'w') as file:
+        file.write('0.5,-0.5\n' * _OVERSIZE_SAMPLES)
+    return {'experiment (YAML inputs)': (inline_path, 'load_experiment'),
+            'experiment (CSV inputs)': (csv_path, 'load_experiment'),
+            'sequence': (sequence_path, 'load_sequence')}
+
+
+def bench_load(path: str, load: str, repetitions: int) -> dict:
+    """
+    :return: source -> mean seconds of a load
+    """
+    times = {}
+    # parsed: a new loader every time
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        getattr(FileLoader(), load)(path)
+    times['file'] = (time.perf_counter() - start) / repetitions
+    loader = FileLoader()
+    getattr(loader, load)(path)
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        getattr(loader, load)(path)
+    times['cache'] = (time.perf_counter() - start) / repetitions
+    # the modification time changes, the content does not
+    elapsed = 0.0
+    for _ in range(repetitions):
+        os.utime(path)
+        start = time.perf_counter()
+        getattr(loader, load)(path)
+        elapsed += time.perf_counter() - start
+        assert loader.last[0] in ('hash', 'cache')
+    times['hash'] = elapsed / repetitions
+    return times
+
+
+def bench_oversize(path: str) -> tuple:
+    """
+    :return: seconds until the loader rejects the file, seconds to read all lines of it
+    """
+    start = time.perf_counter()
+    try:
+        FileLoader().load_sequence(path)
+    except LoadError:
+        pass
+    rejected = time.perf_counter() - start
+    start = time.perf_counter()
+    with open(path, 'r') as file:
+        for line in file:
+            line.split(',')
+    return rejected, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as temp_directory:
+        files = write_files(temp_directory)
+        print("{} samples, {} repetitions".format(MAX_INPUT_LENGTH, num))
+        print("{:<28}{:>12}{:>12}{:>12}".format('ms/load', 'parsed', 'cached', 'touched'))
+        for name, (file_path, load_function) in files.items():
+            result = bench_load(file_path, load_function, num)
+            print("{:<28}{:>12.3f}{:>12.3f}{:>12.3f}".format(name, result['file'] * 1e3, result['cache'] * 1e3,
+                                                              result['hash'] * 1e3))
+        rejected_seconds, read_seconds = bench_oversize(os.path.join(temp_directory, 'oversize.csv'))
+        print("sequence with {} samples: rejected after {:.2f}ms, reading it takes {:.0f}ms".format(
+            _OVERSIZE_SAMPLES, rejected_seconds * 1e3, read_seconds * 1e3))
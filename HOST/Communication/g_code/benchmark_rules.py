@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the abort rules of an experiment: size of the (condition, threshold) pairs of MSG_HOST_OUT_LOAD_EXPERIMENT
+compared to the sparse rule list, and the offline check of recorded samples one by one (every rule compared per sample
+in python) compared to evaluate_rules() on blocks of samples
+usage (from the HOST directory): python -m Communication.g_code.benchmark_rules [num_samples]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import sys
+import time
+from ctypes import sizeof
+
+import numpy as np
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.data import RULE_OP
+from Communication.g_code.messages import CONTINUOUS_DTYPE, MSG_HOST_OUT_LOAD_EXPERIMENT
+from Communication.g_code.rules import build_rules, check_recording, encode_rules, signal_values
+
+_RULES = ['abs_theta > 0.9', 'abs_theta_dot > 0.99', 'x < -0.999', 'abs_psi_dot >= 0.999', 'abs_u1 > 0.9999']
+_PYTHON_COMPARE = {RULE_OP.GREATER: lambda a, b: a > b, RULE_OP.GREATER_EQUAL: lambda a, b: a >= b,
+                   RULE_OP.LESS: lambda a, b: a < b, RULE_OP.LESS_EQUAL: lambda a, b: a <= b,
+                   RULE_OP.EQUAL: lambda a, b: a == b, RULE_OP.NOT_EQUAL: lambda a, b: a != b}
+
+
+def _records(num_samples: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    records = np.zeros(num_samples, dtype=CONTINUOUS_DTYPE)
+    records['tick'] = np.arange(num_samples)
+    for field in ('x', 'y', 'v', 'theta', 'theta_dot', 'psi', 'psi_dot', 'gyr', 'acc', 'u'):
+        records[field] = rng.uniform(-1, 1, records[field].shape)
+    return records
+
+
+def condition_size() -> int:
+    """
+    :return: bytes of the (condition, threshold) pairs of MSG_HOST_OUT_LOAD_EXPERIMENT
+    """
+    structure = MSG_HOST_OUT_LOAD_EXPERIMENT.msg_structure
+    return sum(sizeof(field_type) for name, field_type in structure._fields_
+               if name.endswith(('_condition', '_threshold')))
+
+
+def bench_loop(rules: np.ndarray, records: np.ndarray) -> tuple:
+    """
+    :return: seconds per sample and number of violations if every sample is checked on its own
+    """
+    columns = {signal: signal_values(records, signal).tolist() for signal in set(rules['signal'].tolist())}
+    checks = [(columns[signal], _PYTHON_COMPARE[op], threshold) for signal, op, threshold in rules.tolist()]
+    start = time.perf_counter()
+    violations = 0
+    for index in range(len(records)):
+        for values, compare, threshold in checks:
+            if compare(values[index], threshold):
+                violations += 1
+    return (time.perf_counter() - start) / len(records), violations
+
+
+def bench_vectorized(rules: np.ndarray, records: np.ndarray) -> tuple:
+    """
+    :return: seconds per sample and number of violations with check_recording()
+    """
+    start = time.perf_counter()
+    report = check_recording(rules, records)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(records), sum(count for _, count in report['violations'])
+
+
+if __name__ == '__main__':
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print("conditions of MSG_HOST_OUT_LOAD_EXPERIMENT: {} bytes".format(condition_size()))
+    for count in (0, 1, 3, len(_RULES)):
+        print("rule list with {} rules: {} bytes".format(count, len(encode_rules(build_rules(_RULES[:count])))))
+    abort_rules = build_rules(_RULES)
+    samples = _records(num)
+    loop_seconds, loop_violations = bench_loop(abort_rules, samples)
+    vectorized_seconds, vectorized_violations = bench_vectorized(abort_rules, samples)
+    print("{} samples, {} rules".format(num, len(abort_rules)))
+    print("{:<12}{:>14}{:>12}".format('', 'ns/sample', 'violations'))
+    print("{:<12}{:>14.1f}{:>12}".format('loop', loop_seconds * 1e9, loop_violations))
+    print("{:<12}{:>14.1f}{:>12}".format('vectorized', vectorized_seconds * 1e9, vectorized_violations))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the rx path of G-code messages: the messages of a generated G-code script are built (msg_builder),
+framed (encode_frame), decoded by a FrameDecoder and checked by the protocol layer (pl_create_raw_msgs_rx) frame by
+frame and in batches. Every message has to arrive unchanged, a corrupted message has to be dropped. A G-code message
+that is sent in fragments (MSG_HOST_OUT_LOAD_EXPERIMENT) has to be put together by pl_rx_handling, also if other
+messages are received between its fragments.
+usage (from the HOST directory): python -m Communication.g_code.benchmark_rx_path [num_lines]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import os
+import queue
+import sys
+import tempfile
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.benchmark_gcode_parser import generate_script
+from Communication.g_code.gcode_parser import gcode_parser
+from Communication.g_code.general import msg_builder
+from Communication.g_code.messages import MSG_HOST_OUT_LOAD_EXPERIMENT
+from layer_core_communication.hl_core_communication import FrameDecoder, encode_frame
+from layer_core_communication.pl_core_communication import pl_create_raw_msg_rx, pl_create_raw_msgs_rx, \
+    pl_fragment_msg, pl_rx_handling, FragmentReassembler
+from layer_core_communication.statistics import RxStatistics
+from params import MAX_INPUT_LENGTH, TX_FRAGMENT_SIZE
+
+# lines that have to reach the robot (plus the messages of the generated script)
+_LINES = ['M1 S1', 'G1 X0.5 P0.1', 'M0 D"hello"', 'M4']
+
+
+def build_messages(num_lines: int) -> list:
+    """
+    :return: the built G-code messages (bytes) of _LINES and of a generated script with num_lines lines
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'script.gcode')
+        generate_script(path, num_lines)
+        with open(path, 'r') as file:
+            lines = _LINES + [line.strip() for line in file]
+    outputs = (gcode_parser.parse(line) for line in lines)
+    # internal calls (lists) are not sent
+    return [bytes(msg_builder(output)) for output in outputs if not isinstance(output, list)]
+
+
+def check_round_trip(messages: list):
+    """
+    every message has to pass the rx path unchanged, frame by frame and in a batch, a corrupted one has to be dropped
+    :return: nothing, raises AssertionError
+    """
+    decoder = FrameDecoder()
+    frames = decoder.feed(b''.join(encode_frame(message) for message in messages))
+    assert frames == messages, "the FrameDecoder changed G-code messages"
+    statistics = RxStatistics()
+    single = [pl_create_raw_msg_rx(frame, statistics) for frame in frames]
+    assert all(raw_message is not None for raw_message in single), \
+        "G-code messages dropped by the protocol layer: {}".format(statistics.report())
+    batch = pl_create_raw_msgs_rx(frames, statistics)
+    assert [bytes(raw_message.frame) for raw_message in batch] == messages, \
+        "G-code messages dropped by the protocol layer (batch): {}".format(statistics.report())
+    corrupted = bytearray(messages[0])
+    corrupted[-2] ^= 0x01
+    assert pl_create_raw_msg_rx(bytes(corrupted), statistics) is None, "corrupted G-code message not dropped"
+
+
+def check_fragmented(messages: list):
+    """
+    a MSG_HOST_OUT_LOAD_EXPERIMENT is split into fragments, the other messages are sent between them, everything has to
+    arrive unchanged through FrameDecoder and pl_rx_handling
+    :return: nothing, raises AssertionError
+    """
+    # (condition, threshold) pairs of the abort conditions
+    conditions = [0] * (len(MSG_HOST_OUT_LOAD_EXPERIMENT.msg_structure._fields_) - 12)
+    experiment = bytes(msg_builder(MSG_HOST_OUT_LOAD_EXPERIMENT(0, 'experiment', 50, 10, 1.0, 1.0, 2, True, 'log',
+                                                                MAX_INPUT_LENGTH, [0.5] * MAX_INPUT_LENGTH,
+                                                                [-0.5] * MAX_INPUT_LENGTH, *conditions)))
+    fragments = pl_fragment_msg(experiment, TX_FRAGMENT_SIZE)
+    assert len(fragments) > 1, "the experiment is not fragmented"
+    others = messages[:len(fragments) - 1]
+    sent = [fragments[0]]
+    for fragment, message in zip(fragments[1:], others):
+        sent += [message, fragment]
+    rx_queue = queue.Queue()
+    for frame in FrameDecoder().feed(b''.join(encode_frame(frame) for frame in sent)):
+        rx_queue.put(frame)
+    pl_ml_rx_queue = queue.Queue()
+    pl_rx_handling(rx_queue, pl_ml_rx_queue, FragmentReassembler())
+    received = [bytes(pl_ml_rx_queue.get_nowait().frame) for _ in range(pl_ml_rx_queue.qsize())]
+    assert received == others + [experiment], "the fragmented experiment did not arrive unchanged"
+
+
+def bench(frames: list, batch_size: int) -> float:
+    """
+    :return: seconds per frame of the protocol layer checks
+    """
+    statistics = RxStatistics()
+    start = time.perf_counter()
+    if batch_size == 1:
+        for frame in frames:
+            pl_create_raw_msg_rx(frame, statistics)
+    else:
+        for index in range(0, len(frames), batch_size):
+            pl_create_raw_msgs_rx(frames[index:index + batch_size], statistics)
+    return (time.perf_counter() - start) / len(frames)
+
+
+if __name__ == '__main__':
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    built = build_messages(num)
+    check_round_trip(built)
+    check_fragmented(built)
+    print("{} G-code messages and a fragmented experiment passed the rx path".format(len(built)))
+    for size in (1, 16, 256):
+        print("batch of {:>3}: {:.2f}us/frame".format(size, bench(built, size) * 1e6))
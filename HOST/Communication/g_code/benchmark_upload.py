@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+upload of an experiment to a fleet of simulated robots, every robot has its own link (bytes per second and latency):
+MSG_HOST_OUT_LOAD_EXPERIMENT (always 2000 samples per input, one robot after the other or all at once) is compared to
+the chunked upload (upload.py) of the same experiment, to the chunked upload of an experiment the robots already have
+(digest known), to an upload that resumes after it has been interrupted, to an upload over a link that loses chunks
+and to a robot with an older firmware that only knows the load message (fallback); bytes on the wire per robot and the
+time until all robots have the experiment are reported
+usage (from the HOST directory): python -m Communication.g_code.benchmark_upload [num_robots] [input_length] [link_rate]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import hashlib
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.data import UPLOAD_STATUS
+from Communication.g_code.general import Message, msg_builder
+from Communication.g_code.messages import MessageHandler, MSG_HOST_OUT_LOAD_EXPERIMENT, MSG_HOST_OUT_UPLOAD_BEGIN, \
+    MSG_HOST_OUT_UPLOAD_CHUNK, MSG_HOST_OUT_UPLOAD_COMMIT, MSG_HOST_IN_UPLOAD_ACK, MSG_HOST_IN_LOAD_EXPERIMENT
+from Communication.g_code.rules import build_rules
+from Communication.g_code.upload import Upload, experiment_content, upload_fleet
+from params import HEADER_SIZE, TAIL_SIZE, ID_MSG_HOST_OUT_LOAD_EXPERIMENT, ID_MSG_HOST_OUT_UPLOAD_BEGIN, \
+    ID_MSG_HOST_OUT_UPLOAD_CHUNK, ID_MSG_HOST_OUT_UPLOAD_COMMIT, ID_MSG_HOST_IN_UPLOAD_ACK, \
+    ID_MSG_HOST_IN_LOAD_EXPERIMENT
+
+_CHUNK_HEADER_SIZE = len(bytes(MSG_HOST_OUT_UPLOAD_CHUNK.msg_structure()))
+
+
+class _Pipe:
+    """
+    one direction of a link: the frames are delivered in order after latency + size / rate
+    """
+
+    def __init__(self, rate: float, latency: float, deliver):
+        self.rate = rate
+        self.latency = latency
+        self.deliver = deliver
+        self.bytes = 0
+        self._queue = queue.Queue()
+        self._free = 0.0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def put(self, frame) -> bool:
+        self.bytes += len(frame)
+        self._queue.put((time.perf_counter(), bytes(frame)))
+        return True
+
+    def _run(self):
+        while True:
+            sent, frame = self._queue.get()
+            self._free = max(self._free, sent + self.latency) + len(frame) / self.rate
+            delay = self._free - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.deliver(frame)
+
+
+class _SimulatedRobot:
+    """
+    robot side of the upload: keeps the contents it has received (by digest) and the part of the current upload
+    """
+
+    def __init__(self, rate: float, latency: float):
+        self.handler = MessageHandler()
+        # answers whose futures have been cancelled (late answers after a timeout) are ignored
+        self.handler.handler = lambda msg: None
+        self.uplink = _Pipe(rate, latency, self._receive)
+        self.downlink = _Pipe(rate, latency, self._answer_received)
+        self.contents = {}
+        self.partial = {}
+        self.current = None
+        # chunks from this offset on are lost (None -> no chunk is lost), a chunk is lost with probability loss_rate
+        self.lose_from = None
+        self.loss_rate = 0.0
+        # older firmware: the upload messages are ignored, only the load message is handled
+        self.legacy = False
+        # names of the experiments received with the load message
+        self.loaded = []
+        self._random = random.Random(1)
+
+    def send(self, msg: Message) -> bool:
+        return self.uplink.put(msg_builder(msg))
+
+    def _answer_received(self, frame):
+        # the message layer of the host completes the futures, late answers are dropped by update()
+        self.handler.receive(frame)
+        self.handler.update()
+
+    def _answer(self, msg_id: int, structure):
+        msg = Message()
+        msg.id = msg_id
+        msg.raw_data = bytes(structure)
+        self.downlink.put(msg_builder(msg))
+
+    def _ack(self, tick: int, status: UPLOAD_STATUS, offset: int):
+        self._answer(ID_MSG_HOST_IN_UPLOAD_ACK, MSG_HOST_IN_UPLOAD_ACK.msg_structure(tick, status, offset))
+
+    def _receive(self, frame):
+        msg_id = frame[4]
+        payload = frame[HEADER_SIZE:-TAIL_SIZE]
+        if msg_id == ID_MSG_HOST_OUT_LOAD_EXPERIMENT:
+            data = MSG_HOST_OUT_LOAD_EXPERIMENT.msg_structure.from_buffer_copy(payload)
+            self.loaded.append(data.name)
+            self._answer(ID_MSG_HOST_IN_LOAD_EXPERIMENT, MSG_HOST_IN_LOAD_EXPERIMENT.msg_structure(
+                data.tick, data.name, data.ctrl_state, data.input_length))
+        elif self.legacy:
+            return
+        elif msg_id == ID_MSG_HOST_OUT_UPLOAD_BEGIN:
+            data = MSG_HOST_OUT_UPLOAD_BEGIN.msg_structure.from_buffer_copy(payload)
+            digest = bytes(data.digest)
+            if digest in self.contents:
+                self._ack(data.tick, UPLOAD_STATUS.COMPLETE, data.size)
+                return
+            self.current = digest
+            self._ack(data.tick, UPLOAD_STATUS.ACCEPTED, len(self.partial.setdefault(digest, bytearray())))
+        elif msg_id == ID_MSG_HOST_OUT_UPLOAD_CHUNK:
+            data = MSG_HOST_OUT_UPLOAD_CHUNK.msg_structure.from_buffer_copy(payload)
+            if (self.lose_from is not None and data.offset >= self.lose_from) or \
+                    self._random.random() < self.loss_rate:
+                return
+            received = self.partial[self.current]
+            if data.offset == len(received):
+                received += payload[_CHUNK_HEADER_SIZE:_CHUNK_HEADER_SIZE + data.length]
+            self._ack(data.tick, UPLOAD_STATUS.ACCEPTED, len(received))
+        elif msg_id == ID_MSG_HOST_OUT_UPLOAD_COMMIT:
+            data = MSG_HOST_OUT_UPLOAD_COMMIT.msg_structure.from_buffer_copy(payload)
+            digest = bytes(data.digest)
+            received = self.partial.pop(digest, bytearray())
+            if hashlib.blake2b(received, digest_size=16).digest() != digest:
+                self._ack(data.tick, UPLOAD_STATUS.ERROR, 0)
+                return
+            self.contents[digest] = bytes(received)
+            self._ack(data.tick, UPLOAD_STATUS.COMPLETE, len(received))
+
+
+def _experiment(input_length: int) -> dict:
+    t = np.linspace(0, 1, input_length, dtype=np.float32)
+    return {'name': 'step_response', 'sampling_frequency': 50, 'duration': 10, 'hardware_version': 1.0,
+            'software_version': 1.0, 'ctrl_state': 2, 'logging_active': True, 'filename': 'step_response',
+            'input1': list(np.sin(t)), 'input2': list(np.cos(t)),
+            'rules': build_rules(['abs_theta > 0.5', 'abs_psi_dot > 3'])}
+
+
+def _load_experiment_msg(tick: int, experiment: dict) -> MSG_HOST_OUT_LOAD_EXPERIMENT:
+    # the condition/ threshold arguments after the inputs, all unused
+    return MSG_HOST_OUT_LOAD_EXPERIMENT(tick, experiment['name'], experiment['sampling_frequency'],
+                                        experiment['duration'], experiment['hardware_version'],
+                                        experiment['software_version'], experiment['ctrl_state'],
+                                        experiment['logging_active'], experiment['filename'],
+                                        len(experiment['input1']), experiment['input1'], experiment['input2'],
+                                        *([0] * (len(MSG_HOST_OUT_LOAD_EXPERIMENT.msg_structure._fields_) - 12)))
+
+
+def _load_monolithic(robot: _SimulatedRobot, tick: int, experiment: dict, timeout: float = 30.0):
+    future = robot.handler.expect(ID_MSG_HOST_IN_LOAD_EXPERIMENT, tick)
+    robot.send(_load_experiment_msg(tick, experiment))
+    future.result(timeout)
+
+
+def bench_monolithic(robots: list, experiment: dict, parallel: bool) -> tuple:
+    """
+    :return: seconds until all robots answered MSG_HOST_IN_LOAD_EXPERIMENT and bytes sent per robot
+    """
+    before = [robot.uplink.bytes for robot in robots]
+    start = time.perf_counter()
+    if parallel:
+        with ThreadPoolExecutor(len(robots)) as pool:
+            list(pool.map(lambda item: _load_monolithic(item[1], item[0] + 1, experiment), enumerate(robots)))
+    else:
+        for tick, robot in enumerate(robots, 1):
+            _load_monolithic(robot, tick, experiment)
+    elapsed = time.perf_counter() - start
+    return elapsed, (sum(robot.uplink.bytes for robot in robots) - sum(before)) / len(robots)
+
+
+def bench_chunked(robots: list, content: bytes, parallel: bool, **kwargs) -> tuple:
+    """
+    :return: seconds until all robots have the content, bytes sent per robot and the reports of the uploads
+    """
+    start = time.perf_counter()
+    links = {index: (robot.send, robot.handler) for index, robot in enumerate(robots)}
+    reports = upload_fleet(content, ID_MSG_HOST_OUT_LOAD_EXPERIMENT, links, len(robots) if parallel else 1, **kwargs)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(report['bytes_sent'] for report in reports.values()) / len(robots), reports
+
+
+def bench_resume(rate: float, latency: float, content: bytes) -> tuple:
+    """
+    the link of the robot breaks after half of the content, the upload fails and is started again once the link is
+    back
+    :return: reports of the interrupted and of the resumed upload
+    """
+    robot = _SimulatedRobot(rate, latency)
+    robot.lose_from = len(content) // 2
+    interrupted = Upload(content, ID_MSG_HOST_OUT_LOAD_EXPERIMENT, robot.send, robot.handler, timeout=0.2,
+                         retries=1).run()
+    robot.lose_from = None
+    resumed = Upload(content, ID_MSG_HOST_OUT_LOAD_EXPERIMENT, robot.send, robot.handler).run()
+    return interrupted, resumed
+
+
+def bench_loss(rate: float, latency: float, content: bytes, loss_rate: float) -> dict:
+    """
+    :return: report of an upload over a link that loses chunks with probability loss_rate
+    """
+    robot = _SimulatedRobot(rate, latency)
+    robot.loss_rate = loss_rate
+    return Upload(content, ID_MSG_HOST_OUT_LOAD_EXPERIMENT, robot.send, robot.handler, timeout=0.1).run()
+
+
+def bench_fallback(rate: float, latency: float, content: bytes, experiment: dict) -> dict:
+    """
+    the robot does not answer the begin message, the upload sends the load message instead
+    :return: report of the upload
+    """
+    robot = _SimulatedRobot(rate, latency)
+    robot.legacy = True
+    fallback = _load_experiment_msg(0, experiment)
+    report = Upload(content, ID_MSG_HOST_OUT_LOAD_EXPERIMENT, robot.send, robot.handler, timeout=0.1, retries=1,
+                    fallback=fallback).run()
+    deadline = time.perf_counter() + 5.0
+    while not robot.loaded and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert report['state'] == 'fallback', report
+    assert robot.loaded == [fallback.data.name], "the robot did not get the load message"
+    return report
+
+
+if __name__ == '__main__':
+    num_robots = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    link_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 100e3
+    link_latency = 0.005
+    fleet = [_SimulatedRobot(link_rate, link_latency) for _ in range(num_robots)]
+    experiment_data = _experiment(length)
+    experiment_content_bytes = experiment_content(**experiment_data)
+    print("{} robots, link {:.0f} kB/s, latency {:.0f}ms, experiment with {} samples per input ({} bytes)".format(
+        num_robots, link_rate / 1000, link_latency * 1000, length, len(experiment_content_bytes)))
+    print("{:<28}{:>14}{:>12}".format('', 'bytes/robot', 'fleet [s]'))
+    for name, parallel in (('load message, sequential', False), ('load message, parallel', True)):
+        seconds, sent = bench_monolithic(fleet, experiment_data, parallel)
+        print("{:<28}{:>14.0f}{:>12.3f}".format(name, sent, seconds))
+    results = [('chunked, sequential', bench_chunked([_SimulatedRobot(link_rate, link_latency)
+                                                      for _ in range(num_robots)], experiment_content_bytes, False)),
+               ('chunked, parallel', bench_chunked(fleet, experiment_content_bytes, True)),
+               ('chunked, robots have it', bench_chunked(fleet, experiment_content_bytes, True))]
+    for name, (seconds, sent, fleet_reports) in results:
+        states = sorted(set(report['state'] for report in fleet_reports.values()))
+        print("{:<28}{:>14.0f}{:>12.3f}  {}".format(name, sent, seconds, ','.join(states)))
+    first, second = bench_resume(link_rate, link_latency, experiment_content_bytes)
+    print("interrupted upload: {} after {} bytes, resumed at offset {}: {} with {} bytes".format(
+        first['state'], first['bytes_sent'], second['resumed_at'], second['state'], second['bytes_sent']))
+    lossy = bench_loss(link_rate, link_latency, experiment_content_bytes, 0.2)
+    print("20% of the chunks lost: {} with {} bytes, {} retries, {:.3f}s".format(
+        lossy['state'], lossy['bytes_sent'], lossy['retries'], lossy['elapsed']))
+    legacy = bench_fallback(link_rate, link_latency, experiment_content_bytes, experiment_data)
+    print("robot without upload protocol: {} with {} bytes after {} retries, {:.3f}s".format(
+        legacy['state'], legacy['bytes_sent'], legacy['retries'], legacy['elapsed']))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of waiting for an answer of a robot: the answer is passed to MessageHandler.receive() by another thread (like
+the message layer of the HostServer does) while the main thread waits for it with wait_for_message() or with the future
+of expect(). Both have to return as soon as the answer is there and not only once the timeout has passed; the time from
+receive() until the waiting thread has the answer and the cpu time of the wait are reported
+usage (from the HOST directory): python -m Communication.g_code.benchmark_wait [repetitions]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import sys
+import threading
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.data import UPLOAD_STATUS
+from Communication.g_code.general import Message, msg_builder
+from Communication.g_code.messages import MessageHandler, MSG_HOST_IN_UPLOAD_ACK
+from params import ID_MSG_HOST_IN_UPLOAD_ACK
+
+# time until the answer is received and timeout of the wait in seconds
+_ANSWER_DELAY = 0.05
+_TIMEOUT = 2.0
+
+
+def build_answer(tick: int) -> bytes:
+    """
+    :return: built MSG_HOST_IN_UPLOAD_ACK with the given tick
+    """
+    msg = Message()
+    msg.id = ID_MSG_HOST_IN_UPLOAD_ACK
+    msg.raw_data = bytes(MSG_HOST_IN_UPLOAD_ACK.msg_structure(tick, UPLOAD_STATUS.COMPLETE, 0))
+    return bytes(msg_builder(msg))
+
+
+def _answer_later(handler: MessageHandler, answer: bytes, received: list):
+    time.sleep(_ANSWER_DELAY)
+    received.append(time.perf_counter())
+    handler.receive(answer)
+
+
+def wait_once(use_future: bool) -> tuple:
+    """
+    wait for an answer that is received by another thread
+    :param use_future: if true the future of expect() is used, otherwise wait_for_message()
+    :return: seconds from receive() until the waiting thread returned, cpu seconds of the wait
+    """
+    handler = MessageHandler()
+    answer = build_answer(1)
+    received = []
+    cpu_start = time.process_time()
+    if use_future:
+        future = handler.expect(ID_MSG_HOST_IN_UPLOAD_ACK, 1)
+        threading.Thread(target=_answer_later, args=(handler, answer, received), daemon=True).start()
+        msg = future.result(_TIMEOUT)
+    else:
+        threading.Thread(target=_answer_later, args=(handler, answer, received), daemon=True).start()
+        msg = handler.wait_for_message(ID_MSG_HOST_IN_UPLOAD_ACK, _TIMEOUT * 1000)
+    returned = time.perf_counter()
+    assert msg != -1 and msg.id == ID_MSG_HOST_IN_UPLOAD_ACK, "the answer has not been received"
+    latency = returned - received[0]
+    assert latency < _TIMEOUT / 2, "the wait returned {:.3f}s after the answer had been received".format(latency)
+    return latency, time.process_time() - cpu_start
+
+
+if __name__ == '__main__':
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print("{:<20}{:>16}{:>16}".format('', 'latency [ms]', 'cpu [ms]'))
+    for name, future_wait in (('wait_for_message', False), ('expect().result', True)):
+        results = [wait_once(future_wait) for _ in range(num)]
+        print("{:<20}{:>16.3f}{:>16.3f}".format(name, max(latency for latency, _ in results) * 1e3,
+                                                sum(cpu for _, cpu in results) / num * 1e3))
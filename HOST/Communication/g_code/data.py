@@ -19,6 +19,67 @@ class CTRL_STATE(IntEnum):
     VELOCITY = 3
 
 
+# answer of a robot to the messages of an upload (MSG_HOST_IN_UPLOAD_ACK)
+class UPLOAD_STATUS(IntEnum):
+    ACCEPTED = 0
+    COMPLETE = 1
+    ERROR = 2
+
+
+# signals of the abort rules of an experiment, same order as the conditions of MSG_HOST_OUT_LOAD_EXPERIMENT
+class RULE_SIGNAL(IntEnum):
+    FSM_STATE = 0
+    CTRL_STATE = 1
+    X = 2
+    Y = 3
+    X_DOT = 4
+    THETA = 5
+    THETA_DOT = 6
+    PSI = 7
+    PSI_DOT = 8
+    GYR_X = 9
+    GYR_Y = 10
+    GYR_Z = 11
+    ACC_X = 12
+    ACC_Y = 13
+    ACC_Z = 14
+    TORQUE_LEFT = 15
+    OMEGA_LEFT = 16
+    TORQUE_RIGHT = 17
+    OMEGA_RIGHT = 18
+    U1 = 19
+    U2 = 20
+    ABS_X = 21
+    ABS_Y = 22
+    ABS_X_DOT = 23
+    ABS_THETA = 24
+    ABS_THETA_DOT = 25
+    ABS_PSI = 26
+    ABS_PSI_DOT = 27
+    ABS_GYR_X = 28
+    ABS_GYR_Y = 29
+    ABS_GYR_Z = 30
+    ABS_ACC_X = 31
+    ABS_ACC_Y = 32
+    ABS_ACC_Z = 33
+    ABS_TORQUE_LEFT = 34
+    ABS_OMEGA_LEFT = 35
+    ABS_TORQUE_RIGHT = 36
+    ABS_OMEGA_RIGHT = 37
+    ABS_U1 = 38
+    ABS_U2 = 39
+
+
+# comparison of an abort rule: the experiment is aborted once "signal op threshold" holds
+class RULE_OP(IntEnum):
+    GREATER = 0
+    GREATER_EQUAL = 1
+    LESS = 2
+    LESS_EQUAL = 3
+    EQUAL = 4
+    NOT_EQUAL = 5
+
+
 class Imu:
     gyr: list
     acc: list
@@ -140,7 +201,36 @@ class Supervisor:
         self.sv_number = 9
 
 
+class _LogSeries:
+    """
+    read-only attribute of DataLogs (f.e. log_theta) that returns the latest window of one series
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def __get__(self, data_logs, owner=None):
+        if data_logs is None:
+            return self
+        return data_logs.series(self.index)
+
+
 class DataLogs:
+    # names of the logged series, log_<name> returns the latest window of a series, oldest sample first
+    SERIES = ('theta', 'psi',
+              'sdot', 'thetadot', 'psidot', 'xdot_cmd', 'psidot_cmd',
+              'imu_wx', 'imu_wy', 'imu_wz', 'imu_ax', 'imu_ay', 'imu_az',
+              'left_omega', 'right_omega',
+              'left_torque', 'right_torque', 'left_u', 'right_u',
+              'x', 'y', 'x_cmd', 'y_cmd')
+    # field (and element) of a continuous state record for every series, see append_records()
+    RECORD_FIELDS = (('theta', None), ('psi', None),
+                     ('v', None), ('theta_dot', None), ('psi_dot', None), ('xdot_cmd', None), ('psidot_cmd', None),
+                     ('gyr', 0), ('gyr', 1), ('gyr', 2), ('acc', 0), ('acc', 1), ('acc', 2),
+                     ('omega_left', None), ('omega_right', None),
+                     ('torque_left', None), ('torque_right', None), ('u', 0), ('u', 1),
+                     ('x', None), ('y', None), ('x', None), ('y', None))
+
     def __init__(self, robot, refresh_time_ms):
         self.robot = robot
         # time settings for logs and plots
@@ -153,67 +243,84 @@ class DataLogs:
         # x axis
         self.log_t = np.linspace(0, self.n_max - 1, self.n_max) * self.t  # constant
 
-        # respective y axes
-        # ---- 1. Plot: theta, psi
-        self.log_theta = [0] * self.n_max
-        self.log_psi = [0] * self.n_max
-        # ---- 2. Plot: x_dot, theta_dot, psi_dot, set_x_dot, set_psi_dot
-        self.log_sdot = [0] * self.n_max
-        self.log_thetadot = [0] * self.n_max
-        self.log_psidot = [0] * self.n_max
-        self.log_xdot_cmd = [0] * self.n_max
-        self.log_psidot_cmd = [0] * self.n_max
-        # ---- 4. Plot: IMU
-        self.log_imu_wx = [0] * self.n_max
-        self.log_imu_wy = [0] * self.n_max
-        self.log_imu_wz = [0] * self.n_max
-        self.log_imu_ax = [0] * self.n_max
-        self.log_imu_ay = [0] * self.n_max
-        self.log_imu_az = [0] * self.n_max
-        # ---- 5. Plot: Encoder
-        self.log_left_omega = [0] * self.n_max
-        self.log_right_omega = [0] * self.n_max
-        # ---- 6. Plot: Torque + U
-        self.log_left_torque = [0] * self.n_max
-        self.log_right_torque = [0] * self.n_max
-        self.log_left_u = [0] * self.n_max
-        self.log_right_u = [0] * self.n_max
-        # ---- 7. Plot: U + cmds
-
-        # 3. Plot: X & Y coordinate + CMDs
-        self.log_x = [0] * self.n_max
-        self.log_y = [0] * self.n_max
-        self.log_x_cmd = [0] * self.n_max
-        self.log_y_cmd = [0] * self.n_max
+        # respective y axes: ring buffer (series x samples), every sample is written twice (at i and i + n_max), so the
+        # latest n_max samples are always the contiguous slice [i, i + n_max) and no sample is ever moved
+        self._buffer = np.zeros((len(self.SERIES), 2 * self.n_max))
+        # column the next sample is written to, the oldest sample of the window
+        self._index = 0
+        # number of samples logged so far
+        self.count = 0
 
     def log(self):
-        self.update_array(self.log_theta, self.robot.state.theta)
-        self.update_array(self.log_psi, self.robot.state.psi)
-        self.update_array(self.log_sdot, self.robot.state.sdot)
-        self.update_array(self.log_thetadot, self.robot.state.thetadot)
-        self.update_array(self.log_psidot, self.robot.state.psidot)
-        self.update_array(self.log_xdot_cmd, self.robot.controller.xdot_cmd)
-        self.update_array(self.log_psidot_cmd, self.robot.controller.psidot_cmd)
-        self.update_array(self.log_imu_wx, self.robot.sensors.imu.gyr[0])
-        self.update_array(self.log_imu_wy, self.robot.sensors.imu.gyr[1])
-        self.update_array(self.log_imu_wz, self.robot.sensors.imu.gyr[2])
-        self.update_array(self.log_imu_ax, self.robot.sensors.imu.acc[0])
-        self.update_array(self.log_imu_ay, self.robot.sensors.imu.acc[1])
-        self.update_array(self.log_imu_az, self.robot.sensors.imu.acc[2])
-        self.update_array(self.log_left_omega, self.robot.sensors.encoder_left.omega)
-        self.update_array(self.log_right_omega, self.robot.sensors.encoder_right.omega)
-        self.update_array(self.log_left_torque, self.robot.drive.torque_left)
-        self.update_array(self.log_right_torque, self.robot.drive.torque_right)
-        self.update_array(self.log_left_u, self.robot.controller.u[0])
-        self.update_array(self.log_right_u, self.robot.controller.u[1])
-        self.update_array(self.log_x, self.robot.state.x)
-        self.update_array(self.log_y, self.robot.state.y)
-        self.update_array(self.log_x_cmd, self.robot.state.x)
-        self.update_array(self.log_y_cmd, self.robot.state.y)
-
-    def update_array(self, arr, data_point):
-        arr.pop(0)
-        arr.append(data_point)
+        state = self.robot.state
+        controller = self.robot.controller
+        imu = self.robot.sensors.imu
+        self.append((state.theta, state.psi,
+                     state.sdot, state.thetadot, state.psidot, controller.xdot_cmd, controller.psidot_cmd,
+                     imu.gyr[0], imu.gyr[1], imu.gyr[2], imu.acc[0], imu.acc[1], imu.acc[2],
+                     self.robot.sensors.encoder_left.omega, self.robot.sensors.encoder_right.omega,
+                     self.robot.drive.torque_left, self.robot.drive.torque_right,
+                     controller.u[0], controller.u[1],
+                     state.x, state.y, state.x, state.y))
+
+    def append(self, sample):
+        """
+        add one sample of every series
+        :param sample: one value per series, in the order of SERIES
+        :return: nothing
+        """
+        column = self._buffer[:, self._index]
+        column[:] = sample
+        # the sample is converted only once
+        self._buffer[:, self._index + self.n_max] = column
+        self._index = (self._index + 1) % self.n_max
+        self.count += 1
+
+    def append_batch(self, samples):
+        """
+        add many samples of every series at once
+        :param samples: array (samples x series), the columns in the order of SERIES
+        :return: nothing
+        """
+        samples = np.asarray(samples, dtype=self._buffer.dtype)
+        number = len(samples)
+        # only the latest n_max samples end up in the window
+        samples = samples[-self.n_max:]
+        columns = (self._index + np.arange(number - len(samples), number)) % self.n_max
+        self._buffer[:, columns] = samples.T
+        self._buffer[:, columns + self.n_max] = samples.T
+        self._index = (self._index + number) % self.n_max
+        self.count += number
+
+    def append_records(self, records):
+        """
+        add many samples of the continuous state at once
+        :param records: array of CONTINUOUS_DTYPE records (see messages.decode_continuous)
+        :return: nothing
+        """
+        samples = np.empty((len(records), len(self.SERIES)), dtype=self._buffer.dtype)
+        for index, (field, element) in enumerate(self.RECORD_FIELDS):
+            samples[:, index] = records[field] if element is None else records[field][:, element]
+        self.append_batch(samples)
+
+    def window(self) -> np.ndarray:
+        """
+        :return: view (series x n_max) of the latest samples, oldest sample first, valid until the next append
+        """
+        return self._buffer[:, self._index:self._index + self.n_max]
+
+    def series(self, series) -> np.ndarray:
+        """
+        :param series: name or index of a series
+        :return: contiguous view of the latest n_max samples of the series, oldest sample first
+        """
+        if isinstance(series, str):
+            series = self.SERIES.index(series)
+        return self._buffer[series, self._index:self._index + self.n_max]
+
+
+for _index, _name in enumerate(DataLogs.SERIES):
+    setattr(DataLogs, 'log_' + _name, _LogSeries(_index))
 
 
 class Robot:
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+This module executes G-code files (M63): the file is read lazily line by line, every line is parsed and the messages
+are sent to the robots as a pipeline of generators, so the memory does not depend on the size of the file. The number
+of messages that have not been written to the sockets yet is limited (flow control), M5 delays are honored and the
+execution can be paused, resumed and aborted. Instead of the file, the compiled program of the file (see gcode_compiler)
+can be executed, its frames are sent as they are.
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.gcode_parser import GCODEParser
+from Communication.g_code.messages import MSG_HOST_OUT_DELAY
+
+# lines starting with this character are comments
+COMMENT_PREFIX = '#'
+
+# states of a FileExecution
+STATE_IDLE = 'idle'
+STATE_RUNNING = 'running'
+STATE_PAUSED = 'paused'
+STATE_ABORTED = 'aborted'
+STATE_FINISHED = 'finished'
+
+
+def read_gcode_lines(path: str, progress: Dict[str, Any] = None) -> Iterator[Tuple[int, str]]:
+    """
+    read a G-code file lazily, empty lines and comments are skipped
+    :param path: path of the file
+    :param progress: if given, the number of bytes read so far is written to progress['bytes']
+    :return: generator of (line number, line)
+    """
+    with open(path, 'rb') as file:
+        for line_number, raw_line in enumerate(file, 1):
+            if progress is not None:
+                progress['bytes'] += len(raw_line)
+            line = raw_line.decode('utf-8', errors='replace').strip()
+            if line and not line.startswith(COMMENT_PREFIX):
+                yield line_number, line
+
+
+def parse_gcode_lines(lines: Iterator[Tuple[int, str]], parser: GCODEParser = None) -> Iterator[Tuple[int, str, Any]]:
+    """
+    parse every line of a generator
+    :param lines: generator of (line number, line)
+    :param parser: parser that is used, default: a new GCODEParser
+    :return: generator of (line number, line, output of the parser)
+    """
+    if parser is None:
+        parser = GCODEParser()
+    for line_number, line in lines:
+        yield line_number, line, parser.parse(line)
+
+
+class FileExecution:
+    """
+    - executes a G-code file in its own thread
+    - send(msg) is called for every message, it has to return an object with wait(timeout) and done() (f.e. the FanOut
+      of HostServer.broadcast), at most window messages are waiting to be written to the sockets at the same time
+    - after an M5 line the next message is sent once the delay has passed (the M5 message itself is sent as well)
+    - internal calls (HL -> HL) of the file are passed to internal_call, nested file executions (M63) are skipped
+    - if a compiled program is given, its frames are passed to send_encoded (with the TxPriority the program stores for
+      them) instead and the file is not read, the program is closed once the execution has ended
+    """
+
+    def __init__(self, path: str, send: Callable[[Any], Any],
+                 internal_call: Callable[[List[Dict[str, Any]]], None] = None, window: int = 32,
+                 honor_delays: bool = True, progress_callback: Callable[[dict], None] = None,
+                 progress_interval: float = 0.5, program=None, send_encoded: Callable[[bytes, Any], Any] = None):
+        """
+        :param path: path of the G-code file
+        :param send: function that sends a message to the robots
+        :param internal_call: function that executes an internal call, if None internal calls are skipped
+        :param window: maximum number of messages that have been sent but are not written to the sockets yet
+        :param honor_delays: if true the execution waits for the time of every M5 line
+        :param progress_callback: called with the progress (see progress()) every progress_interval seconds and once
+                                  the execution has ended
+        :param progress_interval: time between two calls of progress_callback in seconds
+        :param program: CompiledProgram of the file
+        :param send_encoded: function that sends an encoded frame of the program and its TxPriority to the robots
+        """
+        self.path = path
+        self.send = send
+        self.internal_call = internal_call
+        self.window = window
+        self.honor_delays = honor_delays
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self.program = program
+        self.send_encoded = send_encoded
+        self.state = STATE_IDLE
+        self._progress = {'bytes': 0, 'total_bytes': 0, 'steps': 0, 'total_steps': 0, 'lines': 0, 'messages': 0,
+                          'invalid': 0, 'delay': 0.0}
+        self._start_time = None
+        self._end_time = None
+        self._thread = None
+        # set while the execution is not paused
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        # set once the execution is aborted, interrupts delays
+        self._abort_event = threading.Event()
+        self._finished_event = threading.Event()
+
+    def start(self):
+        """
+        start the execution in a new thread
+        :return: nothing
+        """
+        if self.program is None:
+            self._progress['total_bytes'] = os.path.getsize(self.path)
+        else:
+            self._progress['total_steps'] = len(self.program)
+            self._progress['invalid'] = self.program.invalid
+        self.state = STATE_RUNNING
+        self._thread = threading.Thread(target=self._run, name="file_execution", daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        """
+        pause the execution after the current line
+        :return: nothing
+        """
+        if self.state == STATE_RUNNING:
+            self.state = STATE_PAUSED
+            self._resume_event.clear()
+
+    def resume(self):
+        if self.state == STATE_PAUSED:
+            self.state = STATE_RUNNING
+            self._resume_event.set()
+
+    def abort(self):
+        """
+        stop the execution, messages that have already been sent are not revoked
+        :return: nothing
+        """
+        if self.state in (STATE_RUNNING, STATE_PAUSED, STATE_IDLE):
+            self.state = STATE_ABORTED
+        self._abort_event.set()
+        self._resume_event.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        wait until the execution has ended (finished or aborted)
+        :param timeout: maximum time to wait in seconds
+        :return: true if the execution has ended
+        """
+        return self._finished_event.wait(timeout)
+
+    def progress(self) -> dict:
+        """
+        :return: dict with state, bytes read, total bytes, steps of the program, total steps, fraction of the file
+                 (program) that has been executed, lines, messages sent, invalid lines, time spent in delays, elapsed
+                 time and lines per second
+        """
+        progress = dict(self._progress)
+        end = self._end_time if self._end_time is not None else time.perf_counter()
+        elapsed = end - self._start_time if self._start_time is not None else 0.0
+        progress['state'] = self.state
+        if self.program is not None:
+            progress['fraction'] = progress['steps'] / progress['total_steps'] if progress['total_steps'] else 1.0
+        else:
+            progress['fraction'] = progress['bytes'] / progress['total_bytes'] if progress['total_bytes'] else 1.0
+        progress['elapsed'] = elapsed
+        progress['lines_per_second'] = progress['lines'] / elapsed if elapsed > 0 else 0.0
+        return progress
+
+    def _run(self):
+        self._start_time = time.perf_counter()
+        next_report = self._start_time + self.progress_interval
+        in_flight = deque()
+        try:
+            for line_number, line, output, priority, delay in self._steps():
+                self._resume_event.wait()
+                if self._abort_event.is_set():
+                    break
+                self._progress['lines'] += 1
+                self._execute_step(line_number, line, output, priority, delay, in_flight)
+
+                if self.progress_callback is not None and time.perf_counter() >= next_report:
+                    next_report = time.perf_counter() + self.progress_interval
+                    self.progress_callback(self.progress())
+            # wait until every message has been written
+            while in_flight and not self._abort_event.is_set():
+                in_flight.popleft().wait(self.progress_interval)
+        finally:
+            if self.state != STATE_ABORTED:
+                self.state = STATE_FINISHED
+            self._end_time = time.perf_counter()
+            if self.program is not None:
+                self.program.close()
+            if self.progress_callback is not None:
+                self.progress_callback(self.progress())
+            self._finished_event.set()
+
+    def _steps(self) -> Iterator[Tuple[int, str, Any, Any, float]]:
+        """
+        :return: generator of (line number, line, output of the parser or encoded frame, TxPriority of an encoded frame
+                 (None if the output is not encoded), delay)
+        """
+        if self.program is None:
+            for line_number, line, output in parse_gcode_lines(read_gcode_lines(self.path, self._progress)):
+                delay = output.data.delay if isinstance(output, MSG_HOST_OUT_DELAY) else 0.0
+                yield line_number, line, output, None, delay
+            return
+
+        # avoid a circular import
+        from Communication.g_code.gcode_compiler import STEP_FRAME
+        parser = GCODEParser()
+        for kind, data, delay, line_number, priority in self.program:
+            self._progress['steps'] += 1
+            if kind == STEP_FRAME:
+                # copy the frame, it is shared by the tx queues and has to outlive the mapping of the program
+                yield line_number, None, bytes(data), priority, delay
+            else:
+                line = bytes(data).decode('utf-8')
+                yield line_number, line, parser.parse(line), None, 0.0
+
+    def _execute_step(self, line_number: int, line: str, output, priority, delay: float, in_flight: deque):
+        if isinstance(output, list):
+            cmd_type = output[0]['type']
+            if cmd_type == 'M60':
+                self._progress['invalid'] += 1
+                print("{}:{}: invalid G-code '{}' is skipped".format(self.path, line_number, line))
+            elif cmd_type == 'M63':
+                print("{}:{}: M63 can not be used in a file and is skipped".format(self.path, line_number))
+            elif self.internal_call is not None:
+                self.internal_call(output)
+            return
+
+        # flow control: wait until the oldest message has been written if the window is full
+        while len(in_flight) >= self.window:
+            if in_flight[0].wait(self.progress_interval):
+                in_flight.popleft()
+            elif self._abort_event.is_set():
+                return
+        while in_flight and in_flight[0].done():
+            in_flight.popleft()
+
+        in_flight.append(self.send(output) if priority is None else self.send_encoded(output, priority))
+        self._progress['messages'] += 1
+
+        if self.honor_delays and delay > 0:
+            self._progress['delay'] += delay
+            # interrupted by abort()
+            self._abort_event.wait(delay)
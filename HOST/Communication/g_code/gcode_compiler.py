@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+This module compiles G-code files into programs: every message of the file is parsed, translated and cobs encoded
+once and stored together with its delay (M5) and its priority in the tx queues (tx_priority) in a binary file, a
+large message is stored as the frames of its fragments. The programs are kept in a cache directory, the name of
+a program is the hash of the G-code file, the version of the parser and the fragment size, so a file that did not
+change is never parsed again. A program is memory-mapped and its frames are sent as they are.
+
+layout of a program (little endian):
+    header      see _HEADER_STRUCT
+    frames      cobs encoded messages including the delimiter, internal calls as utf-8 text
+    index       one PROGRAM_INDEX_DTYPE entry per step
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from typing import Iterator, Tuple
+
+import numpy as np
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.file_execution import read_gcode_lines, parse_gcode_lines
+from Communication.g_code.gcode_parser import GCODE_PARSER_VERSION
+from Communication.g_code.general import Message, msg_builder, tx_priority
+from Communication.g_code.messages import MSG_HOST_OUT_DELAY
+from layer_core_communication.hl_core_communication import encode_frame
+from layer_core_communication.pl_core_communication import pl_translate_msg_tx, pl_fragment_msg
+from layer_core_communication.wakeup import TxPriority
+from params import TX_FRAGMENT_SIZE
+
+# magic, format version, parser version, number of steps, offset of the index, invalid lines
+_HEADER_STRUCT = struct.Struct('<4sHHQQQ')
+_MAGIC = b'TWGC'
+PROGRAM_FORMAT_VERSION = 2
+PROGRAM_EXTENSION = '.gcp'
+
+# kind of a step
+STEP_FRAME = 0
+STEP_INTERNAL_CALL = 1
+
+# number of index entries that are converted at once while iterating over a program
+_ITER_CHUNK = 4096
+
+# priority: TxPriority of a frame (0 for internal calls)
+PROGRAM_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4'), ('delay', '<f4'), ('kind', 'u1'),
+                                ('line', '<u4'), ('priority', 'u1')])
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    :param path: path of the file
+    :param chunk_size: number of bytes that are read at once
+    :return: sha256 of the content of the file (hex)
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def program_name(content_hash: str) -> str:
+    """
+    :return: file name of the program of a G-code file with the given hash
+    """
+    return "{}_p{}_f{}_s{}{}".format(content_hash, GCODE_PARSER_VERSION, PROGRAM_FORMAT_VERSION, TX_FRAGMENT_SIZE,
+                                     PROGRAM_EXTENSION)
+
+
+def compile_gcode(path: str, program_path: str) -> int:
+    """
+    compile a G-code file into a program, the program is written to a temporary file first and then renamed, so a
+    program is either complete or not there
+    :param path: path of the G-code file
+    :param program_path: path of the program
+    :return: number of invalid lines
+    """
+    index = []
+    invalid = 0
+    directory = os.path.dirname(os.path.abspath(program_path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(bytes(_HEADER_STRUCT.size))
+            offset = _HEADER_STRUCT.size
+            for line_number, line, output in parse_gcode_lines(read_gcode_lines(path)):
+                if isinstance(output, list):
+                    cmd_type = output[0]['type']
+                    if cmd_type == 'M60':
+                        invalid += 1
+                        continue
+                    if cmd_type == 'M63':
+                        continue
+                    # internal calls are parsed again when the program is executed
+                    data = line.encode('utf-8')
+                    file.write(data)
+                    index.append((offset, len(data), 0.0, STEP_INTERNAL_CALL, line_number, 0))
+                    offset += len(data)
+                    continue
+                translated = msg_builder(output) if isinstance(output, Message) else pl_translate_msg_tx(output)
+                delay = output.data.delay if isinstance(output, MSG_HOST_OUT_DELAY) else 0.0
+                # a large message is sent in fragments (as HostServer.broadcast does), the delay follows the last one
+                fragments = pl_fragment_msg(translated, TX_FRAGMENT_SIZE)
+                for number, fragment in enumerate(fragments, 1):
+                    data = encode_frame(fragment)
+                    file.write(data)
+                    index.append((offset, len(data), delay if number == len(fragments) else 0.0, STEP_FRAME,
+                                  line_number, tx_priority(fragment)))
+                    offset += len(data)
+            file.write(np.array(index, dtype=PROGRAM_INDEX_DTYPE).tobytes())
+            file.seek(0)
+            file.write(_HEADER_STRUCT.pack(_MAGIC, PROGRAM_FORMAT_VERSION, GCODE_PARSER_VERSION, len(index), offset,
+                                           invalid))
+        os.replace(temp_path, program_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return invalid
+
+
+class CompiledProgram:
+    """
+    - memory-mapped program of a G-code file
+    - iterating returns (kind, data, delay, line number, priority) for every step, data is a memoryview into the mapped
+      file (valid until close()), priority is the TxPriority of a frame
+    """
+
+    def __init__(self, program_path: str, source_path: str = None):
+        """
+        :param program_path: path of the program
+        :param source_path: path of the G-code file (only used for messages)
+        """
+        self.path = program_path
+        self.source_path = source_path
+        self._file = open(program_path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, format_version, parser_version, count, index_offset, self.invalid = \
+            _HEADER_STRUCT.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or format_version != PROGRAM_FORMAT_VERSION or parser_version != GCODE_PARSER_VERSION:
+            self.close()
+            raise ValueError("{} is not a program of this parser version".format(program_path))
+        self.index = np.frombuffer(self._mmap, dtype=PROGRAM_INDEX_DTYPE, count=count, offset=index_offset)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[Tuple[int, memoryview, float, int, TxPriority]]:
+        view = self._view
+        # tolist() converts a chunk of the index into python numbers at once, instead of creating numpy scalars per
+        # step, the memory does not depend on the size of the program
+        for start in range(0, len(self.index), _ITER_CHUNK):
+            for offset, length, delay, kind, line_number, priority in self.index[start:start + _ITER_CHUNK].tolist():
+                yield kind, view[offset:offset + length], delay, line_number, TxPriority(priority)
+
+    def total_delay(self) -> float:
+        """
+        :return: sum of all delays of the program in seconds
+        """
+        return float(self.index['delay'].sum())
+
+    def close(self):
+        if hasattr(self, 'index'):
+            del self.index
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def load_program(path: str, cache_directory: str) -> CompiledProgram:
+    """
+    return the program of a G-code file, the file is only compiled if there is no program of its content (and the
+    current parser version) in the cache yet
+    :param path: path of the G-code file
+    :param cache_directory: directory of the programs
+    :return: the memory-mapped program
+    """
+    os.makedirs(cache_directory, exist_ok=True)
+    program_path = os.path.join(cache_directory, program_name(hash_file(path)))
+    if not os.path.isfile(program_path):
+        compile_gcode(path, program_path)
+    return CompiledProgram(program_path, path)
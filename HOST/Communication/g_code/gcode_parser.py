@@ -1,11 +1,207 @@
 from Communication.g_code.messages import *
 from Communication.g_code.data import *
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, NamedTuple, Pattern, Tuple
 from layer_core_communication.core_messages import * #TODO: remove since this is just for testing!!
 
 
+# version of the parser, has to be increased whenever a G-code results in a different message (compiled G-code files
+# of an older version are not used anymore, see gcode_compiler)
+GCODE_PARSER_VERSION = 1
+
+# number with up to two digits before the decimal point, as used by all G-codes
+_NUM = r'[-+]?[0-9]{1,2}.?[0-9]{0,20}'
+
+# first characters of every line: the command (G/M + number)
+_CMD_PATTERN = re.compile(r'(?i)^([GM][0-9]{1,3})')
+
+
+class _Arg(NamedTuple):
+    """
+    argument of a G-code: name of the regex group, conversion of the matched string and value if it is missing
+    """
+    group: str
+    convert: Callable[[str], Any]
+    default: Any = None
+
+
+class _Command:
+    """
+    specification of a G-code: compiled pattern, arguments (passed to build in this order) and the function that
+    creates the message (HL -> ML/LL) or the list with the internal call (HL -> HL) from the converted arguments
+    """
+    __slots__ = ('pattern', 'args', 'build', 'groups')
+
+    def __init__(self, pattern: Pattern, args: Tuple[_Arg, ...], build: Callable[..., Any]):
+        self.pattern = pattern
+        self.args = args
+        self.build = build
+        # names of the regex groups, so match.group(*groups) returns all arguments with a single call
+        self.groups = tuple(arg.group for arg in args)
+
+    def __call__(self, match):
+        if not self.args:
+            return self.build()
+        values = match.group(*self.groups) if len(self.groups) > 1 else (match.group(self.groups[0]),)
+        return self.build(*[arg.default if value is None else arg.convert(value)
+                            for arg, value in zip(self.args, values)])
+
+
+def _invalid():
+    return [{'type': 'M60'}]
+
+
+def _internal_call(cmd: str) -> Callable[..., List[Dict[str, Any]]]:
+    return lambda: [{'type': cmd}]
+
+
+def _internal_file_call(cmd: str) -> Callable[[str], List[Dict[str, Any]]]:
+    return lambda filename: [{'type': cmd, 'filename': filename}]
+
+
+def _bool(value: str) -> bool:
+    return bool(int(value))
+
+
+def _true(value: str) -> bool:
+    return True
+
+
+def _build_debug(debug_string: str):
+    # UTF-8, 1 Byte max., meaning 40 Unicode characters up until codepoint 7F are allowed
+    for ch in debug_string:
+        if ord(ch) >= 0x7f:
+            return _invalid()
+    return MSG_HOST_OUT_DEBUG(0, debug_string)
+
+
+def _build_sf_config(*k):
+    # arguments are given column by column: K11, K21, ..., K61, K12, ..., K62
+    K = np.array([k[0:6], k[6:12]])
+    return MSG_HOST_OUT_CTRL_SF_CONFIG(0, K)
+
+
+def _speed_controller_pattern() -> Pattern:
+    return re.compile(r'(?i)(?:'
+                      r'\s+p(?P<P>' + _NUM + ')|'
+                      r'\s+i(?P<I>' + _NUM + ')|'
+                      r'\s+d(?P<D>' + _NUM + ')|'
+                      r'\s+l(?P<enable_limit>[01])|'
+                      r'\s+min(?P<min>' + _NUM + ')|'
+                      r'\s+max(?P<max>' + _NUM + ')|'
+                      r'\s+rl(?P<enable_rate_limit>[01])|'
+                      r'\s+dmin(?P<dmin>' + _NUM + ')|'
+                      r'\s+dmax(?P<dmax>' + _NUM + r'))+\s*$')
+
+
+# arguments of the speed controllers in the order of the message constructors
+_SPEED_CONTROLLER_ARGS = (_Arg('P', float, 255), _Arg('I', float, 255), _Arg('D', float, 255),
+                          _Arg('enable_limit', _bool, False), _Arg('max', float, 255), _Arg('min', float, 255),
+                          _Arg('enable_rate_limit', _bool, False), _Arg('dmax', float, 255), _Arg('dmin', float, 255))
+
+
+def _file_pattern(cmd: str, extension: str) -> Pattern:
+    return re.compile(r'(?i)^' + cmd + r'\s?(F"(?P<filename>\w{1,40})(?:.' + extension + ')?")?\s*$')
+
+
+# dispatch table: command -> specification
+_COMMANDS: Dict[str, _Command] = {
+    # ------------------------------------------------------------------------------------------------ #
+    #                                                G                                                 #
+    # ------------------------------------------------------------------------------------------------ #
+
+    # G0 - Configuration of the supervisor
+    # example: G0 E(0,0,0,0,0,0,0,0,0)
+    'G0': _Command(re.compile(r'(?i)^G0\s?E\(' + ','.join('(?P<SV{}>[01])'.format(i) for i in range(9)) + r'\)\s*$'),
+                   tuple(_Arg('SV{}'.format(i), int) for i in range(9)),
+                   lambda *sv: MSG_HOST_OUT_SV_CTRL(0, len(sv), list(sv))),
+
+    # G1 - General control input
+    'G1': _Command(re.compile(r'(?i)(?:'
+                              r'\s?u\((?P<u1>' + _NUM + '),(?P<u2>' + _NUM + r')\)|'
+                              r'\s?x(?P<x_velocity>' + _NUM + ')|'
+                              r'\s?p(?P<p_velocity>' + _NUM + r'))+\s*$'),
+                   (_Arg('u1', float, 0xFF), _Arg('u2', float, 0xFF), _Arg('x_velocity', float, 0xFF),
+                    _Arg('p_velocity', float, 0xFF)),
+                   lambda u1, u2, x_velocity, p_velocity: MSG_HOST_OUT_CTRL_INPUT(0, (u1, u2), x_velocity,
+                                                                                  p_velocity)),
+
+    # G2 - Configuration of the state feedback controller
+    'G2': _Command(re.compile(r'(?i)^G2\s?K\s?\(' +
+                              ','.join('(?P<K{}{}>{})'.format(row, col, _NUM) for col in (1, 2) for row in range(1, 7))
+                              + r'\)\s*$'),
+                   tuple(_Arg('K{}{}'.format(row, col), float) for col in (1, 2) for row in range(1, 7)),
+                   _build_sf_config),
+
+    # G3 - Configuration of the xdot controller
+    'G3': _Command(_speed_controller_pattern(), _SPEED_CONTROLLER_ARGS,
+                   lambda *args: MSG_HOST_OUT_CTRL_SC_X_CONFIG(0, *args)),
+
+    # G4 - Configuration of the psidot controller
+    'G4': _Command(_speed_controller_pattern(), _SPEED_CONTROLLER_ARGS,
+                   lambda *args: MSG_HOST_OUT_CTRL_SC_PSI_CONFIG(0, *args)),
+
+    # todo: remove this message since it is only for testing
+    'G5': _Command(re.compile(r'(?i)^G5'), (), lambda: SetLEDMessage(0, 1)),
+
+    # ------------------------------------------------------------------------------------------------ #
+    #                                                M                                                 #
+    # ------------------------------------------------------------------------------------------------ #
+
+    # M0 - Debug message (ML should respond with exactly the same string)
+    'M0': _Command(re.compile(r'(?i)^M0\s?D"(?P<debug_string>.{1,40})"\s*$'), (_Arg('debug_string', str),),
+                   _build_debug),
+
+    # M1 - Change FSM state
+    'M1': _Command(re.compile(r'(?i)^M1\s?S(?P<state>[0-4])\s*$'), (_Arg('state', int),),
+                   lambda state: MSG_HOST_OUT_FSM(0, FSM_STATE(state))),
+
+    # M2 - Change controller state
+    'M2': _Command(re.compile(r'(?i)^M2\s?S(?P<state>[0-4])\s*$'), (_Arg('state', int),),
+                   lambda state: MSG_HOST_OUT_CTRL_STATE(0, CTRL_STATE(state))),
+
+    # M3 - ML enable/disable logging
+    'M3': _Command(re.compile(r'(?i)^M3\s?(?:(?P<enable>E1)|(?P<disable>E0))\s?'
+                              r'(?:F"(?(enable)(?P<filename>\w{1,40})|)(?:.csv)?")?\s*$'),
+                   (_Arg('enable', _true, False), _Arg('filename', str, 'log')),
+                   lambda enable, filename: MSG_HOST_OUT_LOGGING(0, enable, filename)),
+
+    # M4 - Reset LL state vector
+    'M4': _Command(re.compile(r'(?i)^M4\s*$'), (), lambda: MSG_HOST_OUT_RESET_STATE_VEC(0)),
+
+    # M5 - ML client message handler sleep
+    'M5': _Command(re.compile(r'(?i)^\s?M5\s?T(?P<delay_s>[+]?[0-9]{1,2}.?[0-9]{0,20})\s*$'),
+                   (_Arg('delay_s', float),), lambda delay: MSG_HOST_OUT_DELAY(0, delay)),
+
+    # M61 - Write g-code documentation to terminal
+    'M61': _Command(re.compile(r'(?i)^\s*M61\s*$'), (), _internal_call('M61')),
+
+    # M62 - Clear terminal window
+    'M62': _Command(re.compile(r'(?i)^\s*M62\s*$'), (), _internal_call('M62')),
+
+    # M63 - Execute g-codes from file
+    'M63': _Command(_file_pattern('M63', 'gcode'), (_Arg('filename', str, 'general'),), _internal_file_call('M63')),
+
+    # M64 - Display robot data
+    'M64': _Command(re.compile(r'(?i)^\s*M64\s*$'), (), _internal_call('M64')),
+
+    # M65 - Load experiment, M66 - Start experiment, M67 - Load and start experiment, M68 - End experiment
+    **{cmd: _Command(_file_pattern(cmd, 'yaml'), (_Arg('filename', str, 'experiment'),), _internal_file_call(cmd))
+       for cmd in ('M65', 'M66', 'M67', 'M68')},
+
+    # M69 - Load sequence, M70 - Start sequence, M71 - Load and start sequence, M72 - End sequence
+    **{cmd: _Command(_file_pattern(cmd, 'csv'), (_Arg('filename', str, 'sequence'),), _internal_file_call(cmd))
+       for cmd in ('M69', 'M70', 'M71', 'M72')},
+}
+
+
 class GCODEParser:
+    """
+    - table driven G-code parser: the command of a line is looked up in _COMMANDS, its compiled pattern is matched
+      once and the converted arguments are passed to the constructor of the message
+    - the output is either a message for the ML/LL or a list with a dictionary containing the internal call (HL),
+      invalid lines result in [{'type': 'M60'}]
+    """
     cmd_list: List[Dict[str, Any]]
 
     def __init__(self):
@@ -17,392 +213,22 @@ class GCODEParser:
         :param string: GCODE that needs to be parsed
         :return: parsed message if string is valid, otherwise return M60
         """
-        # delete old commands
-        self.cmd_list.clear()
-        # check for G-code, if string not valid set type to M60
-        first_check = re.search('(?i)^([GM][0-9]{1,3})', string)
-        if first_check is None:
+        first_check = _CMD_PATTERN.match(string)
+        command = _COMMANDS.get(first_check.group(1).upper()) if first_check is not None else None
+        if command is None:
             # Set message type to M60
-            self.cmd_list = [{'type': 'M60'}]
+            self.cmd_list = _invalid()
+            return self.cmd_list
+
+        match = command.pattern.search(string)
+        if match is None:
+            self.cmd_list = _invalid()
             return self.cmd_list
-        else:
-            cmd = first_check.group(1).upper()
-
-            # ------------------------------------------------------------------------------------------------ #
-            #                                                G                                                 #
-            # ------------------------------------------------------------------------------------------------ #
-
-            # G0 - Configuration of the supervisor
-            # example: G0 E(0,0,0,0,0,0,0,0,0)
-            if cmd == 'G0':
-                match = re.search(r'(?i)^G0\s?E\('
-                                  '(?P<SV0>[01]),'
-                                  '(?P<SV1>[01]),'
-                                  '(?P<SV2>[01]),'
-                                  '(?P<SV3>[01]),'
-                                  '(?P<SV4>[01]),'
-                                  '(?P<SV5>[01]),'
-                                  '(?P<SV6>[01]),'
-                                  '(?P<SV7>[01]),'
-                                  '(?P<SV8>[01])\)\s*$', string)
-                if match:
-                    SV0 = int(match.groupdict()['SV0'])
-                    SV1 = int(match.groupdict()['SV1'])
-                    SV2 = int(match.groupdict()['SV2'])
-                    SV3 = int(match.groupdict()['SV3'])
-                    SV4 = int(match.groupdict()['SV4'])
-                    SV5 = int(match.groupdict()['SV5'])
-                    SV6 = int(match.groupdict()['SV6'])
-                    SV7 = int(match.groupdict()['SV7'])
-                    SV8 = int(match.groupdict()['SV8'])
-    
-                    sv_enable_list = [SV0, SV1, SV2, SV3, SV4, SV5, SV6, SV7, SV8]
-                    sv_number = len(sv_enable_list)
-    
-                    msg = MSG_HOST_OUT_SV_CTRL(0, sv_number, sv_enable_list)
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # G1 - General control input
-            elif cmd == 'G1':
-                match = re.search(
-                    r'(?i)(?:'
-                    '\s?u\((?P<u1>[-+]?[0-9]{1,2}.?[0-9]{0,20}),(?P<u2>[-+]?[0-9]{1,2}.?[0-9]{0,20})\)|'
-                    '\s?x(?P<x_velocity>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                    '\s?p(?P<p_velocity>[-+]?[0-9]{1,2}.?[0-9]{0,20}))+\s*$',
-                    string)
-                if match:
-                    u1 = float(match.groupdict()['u1']) if match.groupdict()['u1'] else 0xFF
-                    u2 = float(match.groupdict()['u2']) if match.groupdict()['u2'] else 0xFF
-                    x_velocity = float(match.groupdict()['x_velocity']) if match.groupdict()['x_velocity'] else 0xFF
-                    p_velocity = float(match.groupdict()['p_velocity']) if match.groupdict()['p_velocity'] else 0xFF
-
-                    msg = MSG_HOST_OUT_CTRL_INPUT(0, (u1, u2), x_velocity, p_velocity)
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # G2 - Configuration of the state feedback controller
-            elif cmd == 'G2':
-                match = re.search(r'(?i)^G2\s?K\s?\('
-                                  '(?P<K11>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K21>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K31>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K41>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K51>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K61>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K12>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K22>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K32>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K42>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K52>[-+]?[0-9]{1,2}.?[0-9]{0,20}),'
-                                  '(?P<K62>[-+]?[0-9]{1,2}.?[0-9]{0,20})\)\s*$', string)
-                if match:
-                    K11 = float(match.groupdict()['K11'])
-                    K21 = float(match.groupdict()['K21'])
-                    K31 = float(match.groupdict()['K31'])
-                    K41 = float(match.groupdict()['K41'])
-                    K51 = float(match.groupdict()['K51'])
-                    K61 = float(match.groupdict()['K61'])
-
-                    K12 = float(match.groupdict()['K12'])
-                    K22 = float(match.groupdict()['K22'])
-                    K32 = float(match.groupdict()['K32'])
-                    K42 = float(match.groupdict()['K42'])
-                    K52 = float(match.groupdict()['K52'])
-                    K62 = float(match.groupdict()['K62'])
-
-                    K = np.array([[K11, K21, K31, K41, K51, K61],
-                                  [K12, K22, K32, K42, K52, K62]])
-
-                    msg = MSG_HOST_OUT_CTRL_SF_CONFIG(0, K)
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # G3 - Configuration of the xdot controller
-            elif cmd == 'G3':
-                match = re.search(r'(?i)(?:'
-                                  '\s+p(?P<P>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+i(?P<I>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+d(?P<D>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+l(?P<enable_limit>[01])|'
-                                  '\s+min(?P<min>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+max(?P<max>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+rl(?P<enable_rate_limit>[01])|'
-                                  '\s+dmin(?P<dmin>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+dmax(?P<dmax>[-+]?[0-9]{1,2}.?[0-9]{0,20}))+\s*$', string)
-                if match:
-                    P = float(match.groupdict()['P']) if match.groupdict()['P'] is not None else 255
-                    I = float(match.groupdict()['I']) if match.groupdict()['I'] is not None else 255
-                    D = float(match.groupdict()['D']) if match.groupdict()['D'] is not None else 255
-                    L = bool(int(match.groupdict()['enable_limit'])) if match.groupdict()[
-                                                                            'enable_limit'] is not None else False
-                    MIN = float(match.groupdict()['min']) if match.groupdict()['min'] is not None else 255
-                    MAX = float(match.groupdict()['max']) if match.groupdict()['max'] is not None else 255
-                    LR = bool(int(match.groupdict()['enable_rate_limit'])) if match.groupdict()[
-                                                                                  'enable_rate_limit'] is not None else False
-                    DMIN = float(match.groupdict()['dmin']) if match.groupdict()['dmin'] is not None else 255
-                    DMAX = float(match.groupdict()['dmax']) if match.groupdict()['dmax'] is not None else 255
-
-                    msg = MSG_HOST_OUT_CTRL_SC_X_CONFIG(0, P, I, D, L, MAX, MIN, LR, DMAX, DMIN)
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # G4 - Configuration of the psidot controller
-            elif cmd == 'G4':
-                match = re.search(r'(?i)(?:'
-                                  '\s+p(?P<P>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+i(?P<I>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+d(?P<D>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+l(?P<enable_limit>[01])|'
-                                  '\s+min(?P<min>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+max(?P<max>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+rl(?P<enable_rate_limit>[01])|'
-                                  '\s+dmin(?P<dmin>[-+]?[0-9]{1,2}.?[0-9]{0,20})|'
-                                  '\s+dmax(?P<dmax>[-+]?[0-9]{1,2}.?[0-9]{0,20}))+\s*$', string)
-                if match:
-                    P = float(match.groupdict()['P']) if match.groupdict()['P'] is not None else 255
-                    I = float(match.groupdict()['I']) if match.groupdict()['I'] is not None else 255
-                    D = float(match.groupdict()['D']) if match.groupdict()['D'] is not None else 255
-                    L = bool(int(match.groupdict()['enable_limit'])) if match.groupdict()[
-                                                                            'enable_limit'] is not None else False
-                    MIN = float(match.groupdict()['min']) if match.groupdict()['min'] is not None else 255
-                    MAX = float(match.groupdict()['max']) if match.groupdict()['max'] is not None else 255
-                    LR = bool(int(match.groupdict()['enable_rate_limit'])) if match.groupdict()[
-                                                                                  'enable_rate_limit'] is not None else False
-                    DMIN = float(match.groupdict()['dmin']) if match.groupdict()['dmin'] is not None else 255
-                    DMAX = float(match.groupdict()['dmax']) if match.groupdict()['dmax'] is not None else 255
-
-                    msg = MSG_HOST_OUT_CTRL_SC_PSI_CONFIG(0, P, I, D, L, MAX, MIN, LR, DMAX, DMIN)
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # todo: remove this message since it is only for testing
-            elif cmd == 'G5':
-                msg = SetLEDMessage(0,1)
-                return msg
-
-
-            # ------------------------------------------------------------------------------------------------ #
-            #                                                M                                                 #
-            # ------------------------------------------------------------------------------------------------ #
-
-            # M0 - Debug message (ML should respond with exactly the same string)
-            elif cmd == 'M0':
-                # UTF-8, 1 Byte max., meaning 40 Unicode characters up until codepoint 7F are allowed
-                match = re.search(r'(?i)^(M0\s?)D"(.{1,40})"\s*$', string)
-                if match:
-                    for ch in match.group(2):
-                        if hex(ord(ch)) >= '0x7f':
-                            return 'M60'
-                    debug_string = match.group(2)
-                    msg = MSG_HOST_OUT_DEBUG(0, debug_string)
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # M1 - Change FSM state
-            if cmd == 'M1':
-                # Check for anything other than M1 S[0-4]
-                match = re.search(r'(?i)^(M1\s?)S([0-4])\s*$', string)
-                if match:
-                    state_id = int(match.group(2))
-                    msg = MSG_HOST_OUT_FSM(0, FSM_STATE(state_id))
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # M2 - Change controller state
-            elif cmd == 'M2':
-                # Check for anything other than M2 S[0-4]
-                match = re.search(r'(?i)^(M2\s?)S([0-4])\s*$', string)
-                if match:
-                    controller_state = int(match.group(2))
-                    msg = MSG_HOST_OUT_CTRL_STATE(0, CTRL_STATE(controller_state))
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # M3 - ML enable/disable logging
-            elif cmd == 'M3':
-                match = re.search(
-                    r'(?i)^M3\s?(?:(?P<enable>E1)|(?P<disable>E0))\s?(?:F"(?(enable)(?P<filename>\w{1,40})|)(?:.csv)?")?\s*$',
-                    string)
-                if match:
-                    logging_enable = True if match.groupdict()['enable'] else False
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] not in [None, ''] else 'log'
-                    msg = MSG_HOST_OUT_LOGGING(0, logging_enable, filename)
-                    return msg
-                else:         
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # M4 - Reset LL state vector
-            elif cmd == 'M4':
-                match = re.search(
-                    r'(?i)^M4\s*$', string)
-                if match:
-                    msg = MSG_HOST_OUT_RESET_STATE_VEC(0)
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list                    
-
-            # M5 - ML client message handler sleep
-            elif cmd == 'M5':
-                match = re.search(r'(?i)^\s?M5\s?T(?P<delay_s>[+]?[0-9]{1,2}.?[0-9]{0,20})\s*$', string)
-                if match:
-                    delay = float(match.groupdict()['delay_s'])
-                    msg = MSG_HOST_OUT_DELAY(0, delay)
-                    return msg
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    return self.cmd_list
-
-            # M61 - Write g-code documentation to terminal
-            elif cmd == 'M61':
-                match = re.search(r'(?i)^\s*M61\s*$', string)
-                if match:
-                    self.cmd_list = [{'type': 'M61'}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M62 - Clear terminal window
-            elif cmd == 'M62':
-                match = re.search(r'(?i)^\s*M62\s*$', string)
-                if match:
-                    self.cmd_list = [{'type': 'M62'}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M63 - Execute g-codes from file
-            elif cmd == 'M63':
-                match = re.search(r'(?i)^M63\s?(F"(?P<filename>\w{1,40})(?:.gcode)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else 'general'
-                    self.cmd_list = [{'type': 'M63', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-                    
-                return self.cmd_list
-
-            # M64 - Display robot data
-            elif cmd == 'M64':
-                match = re.search(r'(?i)^\s*M64\s*$', string)
-                if match:
-                    self.cmd_list = [{'type': 'M64'}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M65 - Load experiment
-            elif cmd == 'M65':
-                match = re.search(r'(?i)^M65\s?(F"(?P<filename>\w{1,40})(?:.yaml)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else None
-                    self.cmd_list = [{'type': 'M65', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M66 - Start experiment
-            elif cmd == 'M66':
-                match = re.search(r'(?i)^M66\s?(F"(?P<filename>\w{1,40})(?:.yaml)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else None
-                    self.cmd_list = [{'type': 'M66', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M67 - Load and start experiment
-            elif cmd == 'M67':
-                match = re.search(r'(?i)^M67\s?(F"(?P<filename>\w{1,40})(?:.yaml)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else None
-                    self.cmd_list = [{'type': 'M67', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M68 - End experiment
-            elif cmd == 'M68':
-                match = re.search(r'(?i)^M68\s?(F"(?P<filename>\w{1,40})(?:.yaml)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else None
-                    self.cmd_list = [{'type': 'M68', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M69 - Load sequence
-            elif cmd == 'M69':
-                match = re.search(r'(?i)^M69\s?(F"(?P<filename>\w{1,40})(?:.csv)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else None
-                    self.cmd_list = [{'type': 'M69', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M70 - Start sequence
-            elif cmd == 'M70':
-                match = re.search(r'(?i)^M70\s?(F"(?P<filename>\w{1,40})(?:.csv)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else None
-                    self.cmd_list = [{'type': 'M70', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M71 - Load and start sequence
-            elif cmd == 'M71':
-                match = re.search(r'(?i)^M71\s?(F"(?P<filename>\w{1,40})(?:.csv)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else None
-                    self.cmd_list = [{'type': 'M71', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            # M72 - End sequence
-            elif cmd == 'M72':
-                match = re.search(r'(?i)^M72\s?(F"(?P<filename>\w{1,40})(?:.csv)?")?\s*$', string)
-                if match:
-                    filename = match.groupdict()['filename'] if match.groupdict()['filename'] else None
-                    self.cmd_list = [{'type': 'M72', 'filename': filename}]
-                else:
-                    self.cmd_list = [{'type': 'M60'}]
-
-                return self.cmd_list
-
-            else:
-                self.cmd_list = [{'type': 'M60'}]
-                return self.cmd_list
-
-
-gcode_parser = GCODEParser()
\ No newline at end of file
+
+        output = command(match)
+        # internal calls are returned as a (new) list, messages are returned as they are
+        self.cmd_list = output if isinstance(output, list) else []
+        return output
+
+
+gcode_parser = GCODEParser()
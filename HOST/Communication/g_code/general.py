@@ -1,10 +1,17 @@
 # General
-import crc8
+import struct
 from ctypes import *
 from typing import List, Dict, Tuple, Set, Optional, Union, Sequence, Callable, Iterable, Iterator, Any
 
 # My Imports
 from params import *
+from layer_core_communication.crc import crc8
+from layer_core_communication.hl_core_communication import EncodedFrame
+from layer_core_communication.pl_core_communication import pl_is_fragment
+from layer_core_communication.wakeup import TxPriority, QueuePolicy
+
+# header of a message: HEADER_0, HEADER_1, length (2 bytes, big endian), id
+_HEADER_STRUCT = struct.Struct('>BBHB')
 
 
 class Message:
@@ -22,6 +29,24 @@ class Message:
     def handler(self):
         pass
 
+    @classmethod
+    def from_buffer(cls, buffer, offset: int, msg_id: int):
+        """
+        create a message whose data is a view of the payload at offset in buffer (no copy), so the same message can be
+        used for every message of its type that is written to this position of the buffer
+        :param buffer: writable buffer (bytearray), it must not be resized while the message exists
+        :param offset: position of the payload in the buffer
+        :param msg_id: id of the message
+        :return: the message
+        """
+        msg = cls.__new__(cls)
+        Message.__init__(msg)
+        msg.id = msg_id
+        msg.data = cls.msg_structure.from_buffer(buffer, offset)
+        msg.raw_data = memoryview(buffer)[offset:offset + sizeof(cls.msg_structure)]
+        msg.len = HEADER_SIZE + len(msg.raw_data) + TAIL_SIZE
+        return msg
+
 
 def check_header(header):
     if not (header[0] == HEADER_0 and header[1] == HEADER_1):
@@ -39,35 +64,98 @@ def get_msg_len(header):
 
 def msg_parser(bytes_received):
     msg = Message()
-    msg.len, _ = get_msg_len(bytes_received[:5])
-    msg.id = bytes_received[4]
-    msg.raw_data = bytes_received[5:-1]
+    _, _, msg.len, msg.id = _HEADER_STRUCT.unpack_from(bytes_received)
+    msg.raw_data = bytes_received[HEADER_SIZE:-TAIL_SIZE]
     msg.crc8 = bytes_received[-1]
     return msg
 
 
 def crc_generate(payload):
-    # create a new CRC8 object
-    crc_object = crc8.crc8()
-    crc_object.update(payload)
-    crc_byte = crc_object.digest()
-    crc_byte = int.from_bytes(crc_byte, "big")
-    return crc_byte
-
-
-def msg_builder(msg: Message):
+    # table-driven, works on memoryviews without a copy
+    return crc8(payload)
+
+
+def msg_size(msg: Message) -> int:
+    """
+    :param msg: message that is supposed to be built
+    :return: number of bytes of the message (header + payload + crc)
+    """
+    return HEADER_SIZE + len(msg.raw_data) + TAIL_SIZE
+
+
+def msg_builder_into(msg: Message, buffer, offset: int = 0) -> int:
+    """
+    build a message directly into a preallocated buffer
+    :param msg: message that is supposed to be built
+    :param buffer: writable buffer (bytearray) with at least msg_size(msg) bytes after offset
+    :param offset: position of the header in the buffer
+    :return: position after the last byte of the message
+    """
     payload_size = len(msg.raw_data)
     msg_length = HEADER_SIZE + payload_size + TAIL_SIZE
-    buffer = bytearray(msg_length)
+    end = offset + msg_length
 
-    buffer[0] = HEADER_0
-    buffer[1] = HEADER_1
-    buffer[2] = msg_length.to_bytes(2, 'big')[0]
-    buffer[3] = msg_length.to_bytes(2, 'big')[1]
-    buffer[4] = msg.id
-    buffer[5:5 + payload_size] = msg.raw_data
-    buffer[-1] = crc_generate(buffer[:-1])
+    _HEADER_STRUCT.pack_into(buffer, offset, HEADER_0, HEADER_1, msg_length, msg.id)
+    with memoryview(buffer) as view:
+        view[offset + HEADER_SIZE:end - TAIL_SIZE] = msg.raw_data
+        view[end - 1] = crc_generate(view[offset:end - 1])
+    return end
+
+
+def msg_builder(msg: Message):
+    buffer = bytearray(msg_size(msg))
+    msg_builder_into(msg, buffer)
 
     # print(buffer.hex())
 
     return buffer
+
+
+def tx_priority(data) -> TxPriority:
+    """
+    class of a message in the tx queue of a client, see TX_SAFETY_MSG_IDS and TX_BULK_MSG_IDS, the programs of G-code
+    files store it for their frames (see gcode_compiler)
+    :param data: translated message, fragment or EncodedFrame
+    :return: priority of the message
+    """
+    if isinstance(data, EncodedFrame):
+        return TxPriority.CONFIG if data.priority is None else data.priority
+    if pl_is_fragment(data):
+        return TxPriority.BULK
+    if len(data) > HEADER_SIZE and data[0] == HEADER_0 and data[1] == HEADER_1:
+        if data[4] in TX_SAFETY_MSG_IDS:
+            return TxPriority.SAFETY
+        if data[4] in TX_CONFLATE_MSG_IDS:
+            return TxPriority.CONTROL
+        if data[4] in TX_BULK_MSG_IDS:
+            return TxPriority.BULK
+    return TxPriority.CONFIG
+
+
+def tx_queue_policy(data) -> tuple:
+    """
+    policy of a message in the tx queue of a client (QueuePolicy)
+    - control inputs (TX_CONFLATE_MSG_IDS): only the latest message of every msg id is kept
+    - everything else (config, experiments, core messages): wait for space in the queue
+    :param data: translated message
+    :return: policy, conflate key (msg id or None)
+    """
+    if isinstance(data, (bytes, bytearray)) and len(data) > HEADER_SIZE and data[0] == HEADER_0 and \
+            data[1] == HEADER_1 and data[4] in TX_CONFLATE_MSG_IDS:
+        return QueuePolicy.CONFLATE, data[4]
+    return QueuePolicy.BLOCK, None
+
+
+def rx_queue_policy(data) -> tuple:
+    """
+    policy of a received message in the rx queues of a client (QueuePolicy)
+    - telemetry (RX_DROP_MSG_IDS): the oldest messages are dropped once the queue is full
+    - everything else (acks, answers to config messages, errors, fragments): never dropped, waits for space or takes
+      the place of the oldest telemetry message
+    :param data: received frame or raw message of the protocol layer
+    :return: policy, None
+    """
+    frame = getattr(data, 'frame', data)
+    if len(frame) > HEADER_SIZE and frame[0] == HEADER_0 and frame[1] == HEADER_1 and frame[4] in RX_DROP_MSG_IDS:
+        return QueuePolicy.DROP_OLDEST, None
+    return QueuePolicy.BLOCK, None
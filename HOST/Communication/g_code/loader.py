@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+This module loads experiments (YAML, M65-M68) and sequences (CSV, M69-M72) into Experiment and Sequence objects whose
+inputs are numpy arrays, validated against the limits of the robots (params). The loaded objects are cached: as long as
+the modification time and size of a file do not change it is not read again, a file that has been written but whose
+content did not change (same hash) is not parsed again. Sequences are read line by line, reading stops as soon as a
+file has more than MAX_INPUT_LENGTH samples.
+
+experiment (YAML):
+    name: step_response             default: name of the file
+    sampling_frequency: 50          Hz
+    duration: 10                    s
+    hardware_version: 1.0
+    software_version: 1.0
+    ctrl_state: STATE_FEEDBACK      name or value of CTRL_STATE
+    logging: true                   default: false
+    log_filename: step_response     default: name
+    input1: [0.0, 0.1, ...]         input1 and input2, or
+    inputs: step_response.csv       sequence file (relative to the YAML file) whose inputs are used
+    abort:                          abort rules, see rules.py
+      - abs_theta > 0.5
+
+sequence (CSV):
+    # name: ramp                    optional, default: name of the file
+    # ctrl_state: DIRECT            optional, default: SEQUENCE_CTRL_STATE
+    input1,input2                   optional header
+    0.0,0.0                         one line per sample
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import os
+import threading
+from collections import OrderedDict
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+import numpy as np
+import yaml
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.data import CTRL_STATE
+from Communication.g_code.gcode_compiler import hash_file
+from Communication.g_code.messages import MSG_HOST_OUT_LOAD_EXPERIMENT, MSG_HOST_OUT_LOAD_SEQUENCE
+from Communication.g_code.rules import build_rules, legacy_conditions
+from Communication.g_code.upload import experiment_content, sequence_content
+from layer_core_communication.statistics import LatencyStatistics
+from params import LOADER_CACHE_SIZE, MAX_INPUT_LENGTH, MAX_SAMPLING_FREQUENCY, MAX_EXPERIMENT_DURATION, \
+    MAX_EXPERIMENT_NAME_LENGTH, MAX_LOG_FILENAME_LENGTH, SEQUENCE_CTRL_STATE
+
+# the C implementation of the YAML parser if it is available
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# where a loaded object came from (FileLoader.last)
+SOURCE_CACHE = 'cache'
+SOURCE_HASH = 'hash'
+SOURCE_FILE = 'file'
+
+
+class LoadError(Exception):
+    """
+    raised if a file cannot be read or exceeds the limits of the robots
+    """
+    pass
+
+
+def _check(condition: bool, path: str, text: str):
+    if not condition:
+        raise LoadError("{}: {}".format(path, text))
+
+
+def _check_inputs(path: str, input1: np.ndarray, input2: np.ndarray):
+    _check(input1.ndim == 1 and input1.shape == input2.shape, path, "input1 and input2 must have the same length")
+    _check(0 < len(input1) <= MAX_INPUT_LENGTH, path,
+           "{} samples, a robot can keep 1 to {}".format(len(input1), MAX_INPUT_LENGTH))
+    _check(bool(np.isfinite(input1).all() and np.isfinite(input2).all()), path, "inputs must be finite numbers")
+
+
+def _check_length(path: str, key: str, text: str, maximum: int):
+    _check(len(text.encode()) <= maximum, path, "{} '{}' is longer than {} bytes".format(key, text, maximum))
+
+
+def _ctrl_state(value, path: str) -> CTRL_STATE:
+    try:
+        if isinstance(value, str) and not value.strip().isdigit():
+            return CTRL_STATE[value.strip().upper()]
+        return CTRL_STATE(int(value))
+    except (KeyError, ValueError):
+        raise LoadError("{}: unknown ctrl_state '{}'".format(path, value)) from None
+
+
+class Sequence:
+    """
+    inputs of a sequence, the objects of a FileLoader are shared and must not be changed
+    """
+    name: str
+    ctrl_state: CTRL_STATE
+    input1: np.ndarray
+    input2: np.ndarray
+    path: str
+
+    def __init__(self, name: str, ctrl_state: CTRL_STATE, input1, input2, path: str = None):
+        self.name = name
+        self.ctrl_state = ctrl_state
+        self.input1 = np.asarray(input1, dtype=np.float32)
+        self.input2 = np.asarray(input2, dtype=np.float32)
+        self.path = path
+        self._content = None
+
+    @property
+    def input_length(self) -> int:
+        return len(self.input1)
+
+    def validate(self):
+        """
+        :return: nothing, raises LoadError if the sequence exceeds the limits of the robots
+        """
+        _check_length(self.path, 'name', self.name, MAX_EXPERIMENT_NAME_LENGTH)
+        _check_inputs(self.path, self.input1, self.input2)
+
+    def content(self) -> bytes:
+        """
+        :return: content for the upload (see upload.py), built once
+        """
+        if self._content is None:
+            self._content = sequence_content(self.name, self.ctrl_state, self.input1, self.input2)
+        return self._content
+
+    def load_message(self, tick: int = 0) -> MSG_HOST_OUT_LOAD_SEQUENCE:
+        """
+        :return: load message of the sequence for robots that do not know the upload protocol (see upload.py)
+        """
+        return MSG_HOST_OUT_LOAD_SEQUENCE(tick, self.name, self.ctrl_state, self.input_length, self.input1.tolist(),
+                                          self.input2.tolist())
+
+
+class Experiment(Sequence):
+    """
+    settings, inputs and abort rules of an experiment
+    """
+    sampling_frequency: int
+    duration: int
+    hardware_version: float
+    software_version: float
+    logging_active: bool
+    log_filename: str
+    rules: np.ndarray
+
+    def __init__(self, name: str, sampling_frequency: int, duration: int, hardware_version: float,
+                 software_version: float, ctrl_state: CTRL_STATE, logging_active: bool, log_filename: str, input1,
+                 input2, rules: np.ndarray = None, path: str = None):
+        super().__init__(name, ctrl_state, input1, input2, path)
+        self.sampling_frequency = sampling_frequency
+        self.duration = duration
+        self.hardware_version = hardware_version
+        self.software_version = software_version
+        self.logging_active = logging_active
+        self.log_filename = log_filename
+        self.rules = build_rules(None) if rules is None else rules
+
+    def validate(self):
+        super().validate()
+        _check_length(self.path, 'log_filename', self.log_filename, MAX_LOG_FILENAME_LENGTH)
+        _check(0 < self.sampling_frequency <= MAX_SAMPLING_FREQUENCY, self.path,
+               "sampling_frequency must be 1 to {}".format(MAX_SAMPLING_FREQUENCY))
+        _check(0 < self.duration <= MAX_EXPERIMENT_DURATION, self.path,
+               "duration must be 1 to {}".format(MAX_EXPERIMENT_DURATION))
+
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = experiment_content(self.name, self.sampling_frequency, self.duration,
+                                               self.hardware_version, self.software_version, self.ctrl_state,
+                                               self.logging_active, self.log_filename, self.input1, self.input2,
+                                               self.rules)
+        return self._content
+
+    def load_message(self, tick: int = 0) -> MSG_HOST_OUT_LOAD_EXPERIMENT:
+        """
+        :return: load message of the experiment for robots that do not know the upload protocol (see upload.py), raises
+                 ValueError if the abort rules cannot be expressed by its conditions
+        """
+        return MSG_HOST_OUT_LOAD_EXPERIMENT(tick, self.name, self.sampling_frequency, self.duration,
+                                            self.hardware_version, self.software_version, self.ctrl_state,
+                                            self.logging_active, self.log_filename, self.input_length,
+                                            self.input1.tolist(), self.input2.tolist(), *legacy_conditions(self.rules))
+
+
+def _name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def read_sequence(path: str) -> Tuple[Sequence, List[str]]:
+    """
+    read a sequence file line by line
+    :return: the sequence and the paths of the files it has been read from
+    """
+    inputs = np.empty((MAX_INPUT_LENGTH, 2), dtype=np.float32)
+    metadata = {}
+    count = 0
+    header = True
+    with open(path, 'r', newline='') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                key, separator, value = line[1:].partition(':')
+                if separator:
+                    metadata[key.strip().lower()] = value.strip()
+                continue
+            fields = line.split(',')
+            try:
+                if len(fields) != 2:
+                    raise ValueError
+                values = float(fields[0]), float(fields[1])
+            except ValueError:
+                # the first line that is not a comment can be the header
+                _check(header, path, "line {} is not 'input1,input2'".format(line_number))
+                header = False
+                continue
+            header = False
+            _check(count < MAX_INPUT_LENGTH, path, "more than {} samples".format(MAX_INPUT_LENGTH))
+            inputs[count] = values
+            count += 1
+    sequence = Sequence(metadata.get('name', _name(path)),
+                        _ctrl_state(metadata.get('ctrl_state', SEQUENCE_CTRL_STATE), path),
+                        inputs[:count, 0].copy(), inputs[:count, 1].copy(), path)
+    sequence.validate()
+    return sequence, [path]
+
+
+def _number(spec: dict, key: str, convert: Callable, path: str, default=None):
+    value = spec.get(key, default)
+    _check(value is not None, path, "'{}' is missing".format(key))
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise LoadError("{}: '{}' is not a number".format(path, key)) from None
+
+
+def read_experiment(path: str) -> Tuple[Experiment, List[str]]:
+    """
+    :return: the experiment and the paths of the files it has been read from (the YAML and its sequence file)
+    """
+    with open(path, 'rb') as file:
+        try:
+            spec = yaml.load(file, Loader=_YAML_LOADER)
+        except yaml.YAMLError as error:
+            raise LoadError("{}: {}".format(path, error)) from None
+    _check(isinstance(spec, dict), path, "an experiment is a mapping")
+    paths = [path]
+    if 'inputs' in spec:
+        sequence, sequence_paths = read_sequence(os.path.join(os.path.dirname(path), str(spec['inputs'])))
+        input1, input2 = sequence.input1, sequence.input2
+        paths += sequence_paths
+    else:
+        _check('input1' in spec and 'input2' in spec, path, "'input1' and 'input2' or 'inputs' are missing")
+        try:
+            input1 = np.asarray(spec['input1'], dtype=np.float32)
+            input2 = np.asarray(spec['input2'], dtype=np.float32)
+        except (TypeError, ValueError):
+            raise LoadError("{}: inputs must be lists of numbers".format(path)) from None
+    name = str(spec.get('name', _name(path)))
+    try:
+        rules = build_rules(spec.get('abort'))
+    except ValueError as error:
+        raise LoadError("{}: {}".format(path, error)) from None
+    experiment = Experiment(name, _number(spec, 'sampling_frequency', int, path),
+                            _number(spec, 'duration', int, path), _number(spec, 'hardware_version', float, path),
+                            _number(spec, 'software_version', float, path),
+                            _ctrl_state(spec.get('ctrl_state'), path), bool(spec.get('logging', False)),
+                            str(spec.get('log_filename', name)), input1, input2, rules, path)
+    experiment.validate()
+    return experiment, paths
+
+
+class _CacheEntry:
+    __slots__ = ('obj', 'paths', 'stats', 'digests')
+
+    def __init__(self, obj, paths: List[str]):
+        self.obj = obj
+        self.paths = paths
+        self.stats = _stats(paths)
+        self.digests = [hash_file(path) for path in paths]
+
+
+def _stats(paths: List[str]) -> list:
+    stats = []
+    for path in paths:
+        stat = os.stat(path)
+        stats.append((stat.st_mtime_ns, stat.st_size))
+    return stats
+
+
+class FileLoader:
+    """
+    - loads experiments and sequences, the loaded objects are kept by path (the cache_size least recently loaded)
+    - an object is loaded from the cache as long as the files it has been read from did not change (modification time
+      and size), a file that has been written with the same content is not parsed again (hash)
+    - the load time of every load is recorded (load_time), last is (source, seconds) of the last load
+    """
+
+    def __init__(self, cache_size: int = LOADER_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.load_time = LatencyStatistics()
+        self.sources = {SOURCE_CACHE: 0, SOURCE_HASH: 0, SOURCE_FILE: 0}
+        self.last = (None, 0.0)
+
+    def load_experiment(self, path: str) -> Experiment:
+        """
+        :return: the experiment of a YAML file, raises LoadError if it cannot be loaded
+        """
+        return self._load(path, read_experiment)
+
+    def load_sequence(self, path: str) -> Sequence:
+        """
+        :return: the sequence of a CSV file, raises LoadError if it cannot be loaded
+        """
+        return self._load(path, read_sequence)
+
+    def report(self) -> dict:
+        """
+        :return: dict with the number of loads per source, the number of cached objects and the load times (seconds,
+                 see LatencyStatistics)
+        """
+        return {'sources': dict(self.sources), 'cached': len(self._cache), 'load_time': self.load_time.report()}
+
+    def _load(self, path: str, read: Callable):
+        start = perf_counter()
+        key = (read, os.path.abspath(path))
+        with self._lock:
+            try:
+                entry = self._cache.get(key)
+                if entry is not None and _stats(entry.paths) == entry.stats:
+                    source = SOURCE_CACHE
+                elif entry is not None and [hash_file(path) for path in entry.paths] == entry.digests:
+                    entry.stats = _stats(entry.paths)
+                    source = SOURCE_HASH
+                else:
+                    entry = _CacheEntry(*read(path))
+                    source = SOURCE_FILE
+            except OSError as error:
+                self._cache.pop(key, None)
+                raise LoadError("{}: {}".format(path, error.strerror)) from None
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            elapsed = perf_counter() - start
+            self.sources[source] += 1
+            self.last = (source, elapsed)
+        self.load_time.add(elapsed)
+        return entry.obj
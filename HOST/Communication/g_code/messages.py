@@ -1,52 +1,225 @@
 # General
 
+import struct
+import threading
 import time
-from queue import Queue
+from concurrent.futures import Future
+from queue import Queue, Empty
 
 # My Imports
 from Communication.g_code.data import *
 from Communication.g_code.general import *
+from layer_core_communication.wakeup import WakeupQueue, QueuePolicy
+
+# tick of a received message, the first field of every message
+_TICK_STRUCT = struct.Struct('<I')
+_MIN_TICK_LENGTH = HEADER_SIZE + _TICK_STRUCT.size + TAIL_SIZE
+# put into the incoming queue once the future of wait_for_message() is done, so the waiting thread wakes up also if the
+# message has been taken by receive() of another thread
+_WAKEUP = object()
 
 
 class MessageHandler:
-    def __init__(self):
-        self.incoming_queue = Queue()
+    """
+    - update() handles the received messages: for every id of host_in_dictionary there is one decoder (a message of
+      that type) whose data is a view of the receive buffer, a received message is copied into the buffer and handled
+      by its decoder, so no message objects are created
+    - the data of a decoder is only valid while it is handled, handlers have to copy what they keep
+    - messages without a decoder (unknown id, wrong length) are handled by handler()
+    - the handlers of the messages are called with the context of the robot (robot_ui_object, experiment_handler,
+      sequence_handler) the MessageHandler has been created with
+    - expect() returns a future that is completed by the receive path once a message with the id (and tick) has been
+      received, so any number of threads can wait for answers of the robot at the same time without using the cpu
+    - receive() is called by the thread that received the message (f.e. the message layer of the HostServer): it
+      completes the futures right away and queues the other messages for update(), the messages are handled in the
+      order they have been received
+    """
+
+    def __init__(self, recorder=None, continuous_handler=None, robot_ui_object=None, experiment_handler=None,
+                 sequence_handler=None, queue_size: int = 0):
+        """
+        :param recorder: if given, every MSG_HOST_IN_CONTINIUOS that is passed to receive() is recorded (see
+                         recorder.TelemetryRecorder), also if nobody calls update()
+        :param continuous_handler: if given, it is called with the decoded records (see decode_continuous) of all
+                                   MSG_HOST_IN_CONTINIUOS of one update() instead of handling them one by one, f.e.
+                                   lambda records: MSG_HOST_IN_CONTINIUOS.batch_handler(robot_ui_object, records)
+        :param robot_ui_object: robot (ui) the received messages belong to, passed to the handlers of the messages
+        :param experiment_handler: passed to the handlers of the messages
+        :param sequence_handler: passed to the handlers of the messages
+        :param queue_size: maximum number of messages that wait for update(), once the queue is full the oldest
+                           message is dropped (0 -> unbounded)
+        """
+        self.incoming_queue = WakeupQueue(queue_size, policy=QueuePolicy.DROP_OLDEST)
         self.outgoing_queue = Queue()
+        self.recorder = recorder
+        self.continuous_handler = continuous_handler
+        # arguments of the handler of every message
+        self.handler_context = (robot_ui_object, experiment_handler, sequence_handler)
+        # id -> decoder, receive buffer and frame length of every id
+        self._decoders = [None] * 256
+        self._frame_lengths = [0] * 256
+        self._rx_buffer = None
         self.host_in_dictionary = {}
-        self.wait_list = []
+        # id -> list of [tick, future, execute] of the expected messages
+        self._expected = {}
+        self._expected_lock = threading.Lock()
+
+    @property
+    def host_in_dictionary(self) -> dict:
+        return self._host_in_dictionary
+
+    @host_in_dictionary.setter
+    def host_in_dictionary(self, dictionary: dict):
+        """
+        set the messages that are handled and create their decoders
+        :param dictionary: id -> message class
+        :return: nothing
+        """
+        self._host_in_dictionary = dictionary
+        self._decoders = [None] * 256
+        self._frame_lengths = [0] * 256
+        payload_sizes = {msg_id: sizeof(cls.msg_structure) for msg_id, cls in dictionary.items()}
+        # the decoders keep views of the buffer, so it is never resized, only replaced when the dictionary is set
+        self._rx_buffer = bytearray(HEADER_SIZE + max(payload_sizes.values(), default=0) + TAIL_SIZE)
+        for msg_id, cls in dictionary.items():
+            self._decoders[msg_id] = cls.from_buffer(self._rx_buffer, HEADER_SIZE, msg_id)
+            self._frame_lengths[msg_id] = HEADER_SIZE + payload_sizes[msg_id] + TAIL_SIZE
 
     def handler(self, msg):
         if msg.id in self.host_in_dictionary:
             msg_cast = self.host_in_dictionary[msg.id](msg)
-            msg_cast.handler()
+            msg_cast.handler(*self.handler_context)
         else:
             print("received a message with unknown id 0x{:02X}".format(msg.id))
 
     def update(self):
-        if self.incoming_queue.qsize() > 0:
-            raw_string = self.incoming_queue.get_nowait()
-            msg = msg_parser(raw_string)
-            if msg is not -1:
-                # print("Received a msg with id {0}".format(msg.id))
-                if msg.id not in self.wait_list:
-                    self.handler(msg)
+        """
+        handle all messages that are in the incoming queue in the order they have been received, if there is a
+        continuous_handler consecutive continuous states are decoded and handled at once
+        :return: nothing
+        """
+        continuous = []
+        get = self.incoming_queue.get_nowait
+        # messages that arrive meanwhile are handled by the next update()
+        for _ in range(self.incoming_queue.qsize()):
+            self._receive(get(), continuous)
+        self._handle_continuous(continuous)
+
+    def expect(self, msg_id: int, tick: int = None, execute: bool = False) -> Future:
+        """
+        register interest in a message, f.e. the answer to a command
+        - the future is completed with the message (see msg_parser) by the thread that receives it (update() or
+          wait_for_message()), future.result(timeout) waits without using the cpu
+        - in asyncio code use await asyncio.wrap_future(future)
+        - cancel the future if the message is not needed anymore
+        :param msg_id: id of the message
+        :param tick: if given, only a message with this tick (first field of every message) completes the future
+        :param execute: if true the message is handled as well, otherwise it is only passed to the future
+        :return: the future
+        """
+        future = Future()
+        with self._expected_lock:
+            expected = [entry for entry in self._expected.get(msg_id, ()) if not entry[1].cancelled()]
+            expected.append([tick, future, execute])
+            self._expected[msg_id] = expected
+        return future
 
     def wait_for_message(self, msg_id, timeout_ms, execute=False):
-        time_start = time.time_ns()
-        self.wait_list.append(msg_id)
-        while (time.time_ns() - time_start) < (timeout_ms * 1000 * 1000):
-            if self.incoming_queue.qsize() > 0:
-                msg = msg_parser(self.incoming_queue.get_nowait())
-                if msg is not -1:
-                    if msg.id == msg_id:
-                        if execute:
-                            self.handler(msg)
-                        self.wait_list.remove(msg_id)
-                        return msg
-                    else:
-                        self.handler(msg)
+        """
+        wait for a message and handle all other messages meanwhile, for the thread that calls update(), other threads
+        use expect()
+        :param msg_id: id of the message
+        :param timeout_ms: maximum time to wait in ms
+        :param execute: if true the message is handled as well
+        :return: the message (see msg_parser) or -1 if it has not been received in time
+        """
+        future = self.expect(msg_id, execute=execute)
+        future.add_done_callback(lambda _: self.incoming_queue.put(_WAKEUP))
+        deadline = time.monotonic() + timeout_ms / 1000
+        while not future.done():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                raw_string = self.incoming_queue.get(timeout=remaining)
+            except Empty:
+                break
+            continuous = []
+            self._receive(raw_string, continuous)
+            self._handle_continuous(continuous)
+        if future.done():
+            return future.result()
+        future.cancel()
         return -1
 
+    def receive(self, raw_string) -> bool:
+        """
+        complete the futures that expect a received message, record the continuous states, a message that has to be
+        handled as well is put into the incoming queue for update()
+        :param raw_string: received message (bytes)
+        :return: true if the message has been queued, false if it has been taken by a future
+        """
+        msg_id = raw_string[4]
+        if msg_id in self._expected and not self._complete_expected(msg_id, raw_string):
+            return False
+        if msg_id == ID_MSG_HOST_IN_CONT and self.recorder is not None:
+            self.recorder.record(memoryview(raw_string)[HEADER_SIZE:-TAIL_SIZE])
+        self.incoming_queue.put(raw_string)
+        return True
+
+    def _receive(self, raw_string, continuous: list):
+        if raw_string is _WAKEUP:
+            return
+        msg_id = raw_string[4]
+        # print("Received a msg with id {0}".format(msg_id))
+        if msg_id in self._expected and not self._complete_expected(msg_id, raw_string):
+            return
+        if msg_id == ID_MSG_HOST_IN_CONT and self.continuous_handler is not None:
+            continuous.append(raw_string[HEADER_SIZE:-TAIL_SIZE])
+            return
+        # the continuous states received before this message are handled first
+        self._handle_continuous(continuous)
+        decoder = self._decoders[msg_id]
+        length = len(raw_string)
+        if decoder is None or length != self._frame_lengths[msg_id]:
+            self.handler(msg_parser(raw_string))
+            return
+        self._rx_buffer[:length] = raw_string
+        decoder.handler(*self.handler_context)
+
+    def _complete_expected(self, msg_id: int, raw_string) -> bool:
+        """
+        complete the futures that expect this message
+        :return: true if the message has to be handled as well
+        """
+        tick, = _TICK_STRUCT.unpack_from(raw_string, HEADER_SIZE) if len(raw_string) >= _MIN_TICK_LENGTH else (None,)
+        with self._expected_lock:
+            expected = self._expected.get(msg_id, ())
+            matched = [entry for entry in expected if entry[0] is None or entry[0] == tick]
+            if not matched:
+                return True
+            remaining = [entry for entry in expected if entry not in matched and not entry[1].cancelled()]
+            if remaining:
+                self._expected[msg_id] = remaining
+            else:
+                del self._expected[msg_id]
+        msg = msg_parser(raw_string)
+        execute = False
+        taken = False
+        for _, future, execute_entry in matched:
+            if future.set_running_or_notify_cancel():
+                future.set_result(msg)
+                taken = True
+                execute = execute or execute_entry
+        # a message whose futures have all been cancelled is handled as usual
+        return execute or not taken
+
+    def _handle_continuous(self, continuous: list):
+        if continuous:
+            records = decode_continuous(continuous)
+            continuous.clear()
+            self.continuous_handler(records)
+
 
 # =====================================================================================================
 # =====================================================================================================
@@ -125,6 +298,50 @@ class MSG_HOST_IN_CONTINIUOS(Message):
         robot_ui_object.robot.controller.xdot_cmd = self.data.xdot_cmd
         robot_ui_object.robot.controller.psidot_cmd = self.data.psidot_cmd
 
+    @staticmethod
+    def batch_handler(robot_ui_object, records):
+        """
+        handle many samples at once: the robot is updated from the last sample, all samples are added to its logs
+        :param robot_ui_object: ui object of the robot
+        :param records: array of CONTINUOUS_DTYPE records (see decode_continuous), oldest first
+        :return: nothing
+        """
+        if not len(records):
+            return
+        robot = robot_ui_object.robot
+        (tick, fsm_state, x, y, v, theta, theta_dot, psi, psi_dot, gyr, acc, torque_left, omega_left, torque_right,
+         omega_right, ctrl_state, u, xdot_cmd, psidot_cmd) = records[-1].tolist()
+        ctrl_state = CTRL_STATE(ctrl_state)
+
+        # hack to avoid a flashing checkbox when changing ctrl states (gb3/gb4 in robot ui)
+        if robot.controller.state == CTRL_STATE.STATE_FEEDBACK and ctrl_state == CTRL_STATE.VELOCITY:
+            robot_ui_object.update_checkboxes_flag = True
+        elif robot.controller.state == CTRL_STATE.VELOCITY and ctrl_state == CTRL_STATE.STATE_FEEDBACK:
+            robot_ui_object.update_checkboxes_flag = True
+
+        # update data
+        robot.tick = tick
+        robot.fsm_state = FSM_STATE(fsm_state)
+        robot.state.x = x
+        robot.state.y = y
+        robot.state.sdot = v
+        robot.state.theta = theta
+        robot.state.thetadot = theta_dot
+        robot.state.psi = psi
+        robot.state.psidot = psi_dot
+        robot.sensors.imu.gyr = gyr.tolist()
+        robot.sensors.imu.acc = acc.tolist()
+        robot.sensors.encoder_left.omega = omega_left
+        robot.sensors.encoder_right.omega = omega_right
+        robot.drive.torque_left = torque_left
+        robot.drive.torque_right = torque_right
+        robot.controller.state = ctrl_state
+        robot.controller.u = u.tolist()
+        robot.controller.xdot_cmd = xdot_cmd
+        robot.controller.psidot_cmd = psidot_cmd
+
+        robot.data_logs.append_records(records)
+
     def get_string(self):
         string = ''
         return string
@@ -134,6 +351,24 @@ class MSG_HOST_IN_CONTINIUOS(Message):
         return color
 
 
+# numpy dtype of the payload of MSG_HOST_IN_CONTINIUOS (one record per sample, same layout as msg_structure), used to
+# decode and record many samples at once
+CONTINUOUS_DTYPE = np.dtype(MSG_HOST_IN_CONTINIUOS.msg_structure).newbyteorder('<')
+
+
+def decode_continuous(payloads) -> np.ndarray:
+    """
+    decode the payloads of many MSG_HOST_IN_CONTINIUOS at once
+    :param payloads: payloads of the messages (f.e. msg.raw_data), payloads with the wrong size are skipped
+    :return: array of CONTINUOUS_DTYPE records, one per payload
+    """
+    size = CONTINUOUS_DTYPE.itemsize
+    return np.frombuffer(b''.join([payload for payload in payloads if len(payload) == size]), dtype=CONTINUOUS_DTYPE)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 
 
@@ -329,7 +564,8 @@ class MSG_HOST_IN_CTRL_SF_CONFIG(Message):
         self.data = self.msg_structure.from_buffer_copy(msg.raw_data)
 
     def handler(self, robot_ui_object, experiment_handler, sequence_handler):
-        robot_ui_object.robot.controller.state_feedback.K = np.reshape(self.data.K, (2, 6))
+        # copy, the data of a received message can be a view of the receive buffer (see MessageHandler)
+        robot_ui_object.robot.controller.state_feedback.K = np.array(self.data.K).reshape((2, 6))
 
     def get_string(self):
         string = "State Feedback has been configured successfully! \n" \
@@ -877,6 +1113,36 @@ class MSG_HOST_IN_END_SEQUENCE(Message):
         return color
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+class MSG_HOST_IN_UPLOAD_ACK(Message):
+    """
+    answer of a robot to every message of an upload (see upload.py), tick is the tick of the answered message
+    - ACCEPTED: offset is the number of bytes of the content the robot has received (position to resume at)
+    - COMPLETE: the robot has the whole content (the digest of the begin message is known or the commit was valid)
+    - ERROR: the robot cannot take the content (f.e. no memory, digest of the commit does not match)
+    """
+    class msg_structure(Structure):
+        _pack_ = 1
+        _fields_ = [("tick", c_uint32), ("status", c_uint8), ("offset", c_uint32)]
+
+    def __init__(self, msg: Message):
+        super().__init__()
+        self.data = self.msg_structure.from_buffer_copy(msg.raw_data)
+
+    def handler(self, robot_ui_object, experiment_handler, sequence_handler):
+        pass
+
+    def get_string(self):
+        string = "Upload: {} at offset {}".format(UPLOAD_STATUS(self.data.status).name, self.data.offset)
+        return string
+
+    def get_color(self):
+        color = 'R' if self.data.status == UPLOAD_STATUS.ERROR else 'G'
+        return color
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 
 # ======================================================================================================================
@@ -894,7 +1160,7 @@ class MSG_HOST_OUT_DEBUG(Message):  # M0
         by = bytes(debug_string, "utf-8")
         by += b"0" * (40 - len(by))
         self.data = self.msg_structure(tick, by)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 # ----------------------------------------------------------------------------------------------------------------------
 
@@ -908,7 +1174,7 @@ class MSG_HOST_OUT_MOCAP(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_MOCAP
         self.data = self.msg_structure(tick, x, y, theta, psi)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 # ----------------------------------------------------------------------------------------------------------------------
 
@@ -922,7 +1188,7 @@ class MSG_HOST_OUT_FSM(Message):  # M1
         super().__init__()
         self.id = ID_MSG_HOST_OUT_FSM
         self.data = self.msg_structure(tick, fsm_state.value)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 # ----------------------------------------------------------------------------------------------------------------------
 
@@ -936,7 +1202,7 @@ class MSG_HOST_OUT_CTRL_STATE(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_CTRL_STATE
         self.data = self.msg_structure(tick, ctrl_state.value)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 # ----------------------------------------------------------------------------------------------------------------------
 
@@ -950,7 +1216,7 @@ class MSG_HOST_OUT_CTRL_INPUT(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_CTRL_INPUT
         self.data = self.msg_structure(tick, external_torque, xdot_cmd, psidot_cmd)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 # ----------------------------------------------------------------------------------------------------------------------
 
@@ -964,7 +1230,7 @@ class MSG_HOST_OUT_CTRL_SF_CONFIG(Message):  # M11
         super().__init__()
         self.id = ID_MSG_HOST_OUT_CTRL_SF_CONFIG
         self.data = self.msg_structure(tick, tuple(K.flatten()))
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -981,7 +1247,7 @@ class MSG_HOST_OUT_CTRL_SC_X_CONFIG(Message):  # M12
         super().__init__()
         self.id = ID_MSG_HOST_OUT_CTRL_SC_X_CONFIG
         self.data = self.msg_structure(tick, P, I, D, enable_limit, v_max, v_min, enable_rate_limit, vdot_max, vdot_min)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -998,7 +1264,7 @@ class MSG_HOST_OUT_CTRL_SC_PSI_CONFIG(Message):  # M13
         super().__init__()
         self.id = ID_MSG_HOST_OUT_CTRL_SC_PSI_CONFIG
         self.data = self.msg_structure(tick, P, I, D, enable_limit, v_max, v_min, enable_rate_limit, vdot_max, vdot_min)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1015,7 +1281,7 @@ class MSG_HOST_OUT_CTRL_PC_DISTANCE_CONFIG(Message):  # M17
         super().__init__()
         self.id = ID_MSG_HOST_OUT_CTRL_PC_DISTANCE_CONFIG
         self.data = self.msg_structure(tick, P, I, D, enable_limit, v_max, v_min, enable_rate_limit, vdot_max, vdot_min)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1032,7 +1298,7 @@ class MSG_HOST_OUT_CTRL_PC_ANGLE_CONFIG(Message):  # M18
         super().__init__()
         self.id = ID_MSG_HOST_OUT_CTRL_PC_ANGLE_CONFIG
         self.data = self.msg_structure(tick, P, I, D, enable_limit, v_max, v_min, enable_rate_limit, vdot_max, vdot_min)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1047,7 +1313,7 @@ class MSG_HOST_OUT_SELFTEST(Message):  # M14
         super().__init__()
         self.id = ID_MSG_HOST_OUT_SELFTEST
         self.data = self.msg_structure(tick)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1062,7 +1328,7 @@ class MSG_HOST_OUT_CALIBRATION(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_CALIBRATION
         self.data = self.msg_structure(tick)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1079,7 +1345,7 @@ class MSG_HOST_OUT_LOGGING(Message):
         by = bytes(file, "utf-8")
         by += b"0" * (40 - len(by))
         self.data = self.msg_structure(tick, running, by)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1096,7 +1362,7 @@ class MSG_HOST_OUT_EXPERIMENT(Message):
         by = bytes(file, "utf-8")
         by += b"0" * (40 - len(by))
         self.data = self.msg_structure(tick, running, by)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1111,7 +1377,7 @@ class MSG_HOST_OUT_HEADING(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_HEADING
         self.data = self.msg_structure(tick, heading)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1126,7 +1392,7 @@ class MSG_HOST_OUT_MOVE(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_MOVE
         self.data = self.msg_structure(tick, xdot, psidot, time)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1141,7 +1407,7 @@ class MSG_HOST_OUT_SV_CTRL(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_SV_CTRL
         self.data = self.msg_structure(tick, sv_number, tuple(sv_enable_list))
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1156,7 +1422,7 @@ class MSG_HOST_OUT_RESET_STATE_VEC(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_RESET_STATE_VEC
         self.data = self.msg_structure(tick)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1171,7 +1437,7 @@ class MSG_HOST_OUT_DELAY(Message):
         super().__init__()
         self.id = ID_MSG_HOST_OUT_DELAY
         self.data = self.msg_structure(tick, delay)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1254,11 +1520,11 @@ class MSG_HOST_OUT_LOAD_EXPERIMENT(Message):
         by1 += b"0" * (15 - len(by1))
         by2 = bytes(filename, "utf-8")
         by2 += b"0" * (20 - len(by2))
-        if input_length < 2000 or input_length < 2000:
-            input1 += [0] * (2000 - input_length)
-            input2 += [0] * (2000 - input_length)
+        # the arrays are filled with zeros after input_length, the lists of the caller are not changed
         self.data = self.msg_structure(tick, by1, sampling_frequency, duration, hardware_version, software_version, ctrl_state,
-                                       logging_active, by2, input_length, input1, input2, fsm_state_condition, fsm_state_threshold, ctrl_state_condition,
+                                       logging_active, by2, input_length, tuple(input1[:input_length]),
+                                       tuple(input2[:input_length]), fsm_state_condition, fsm_state_threshold,
+                                       ctrl_state_condition,
                                        ctrl_state_threshold,  x_condition, x_threshold,  y_condition, y_threshold,  x_dot_condition, x_dot_threshold,
                                        theta_condition, theta_threshold,  theta_dot_condition, theta_dot_threshold, psi_condition, psi_threshold,
                                        psi_dot_condition, psi_dot_threshold, gyr_x_condition, gyr_x_threshold, gyr_y_condition, gyr_y_threshold,
@@ -1276,7 +1542,7 @@ class MSG_HOST_OUT_LOAD_EXPERIMENT(Message):
                                        abs_omega_left_threshold, abs_torque_right_condition, abs_torque_right_threshold,
                                        abs_omega_right_condition, abs_omega_right_threshold, abs_u1_condition, abs_u1_threshold,
                                        abs_u2_condition, abs_u2_threshold)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1293,7 +1559,7 @@ class MSG_HOST_OUT_START_EXPERIMENT(Message):
         by = bytes(name, "utf-8")
         by += b"0" * (30 - len(by))
         self.data = self.msg_structure(tick, by)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1310,7 +1576,7 @@ class MSG_HOST_OUT_END_EXPERIMENT(Message):
         by = bytes(name, "utf-8")
         by += b"0" * (30 - len(by))
         self.data = self.msg_structure(tick, by)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1327,11 +1593,10 @@ class MSG_HOST_OUT_LOAD_SEQUENCE(Message):
         self.id = ID_MSG_HOST_OUT_LOAD_SEQUENCE
         by = bytes(name, "utf-8")
         by += b"0" * (30 - len(by))
-        if input_length < 2000 or input_length < 2000:
-            input1 += [0] * (2000 - input_length)
-            input2 += [0] * (2000 - input_length)
-        self.data = self.msg_structure(tick, by, ctrl_state, input_length, tuple(input1), tuple(input2))
-        self.raw_data = bytes(self.data)
+        # the arrays are filled with zeros after input_length, the lists of the caller are not changed
+        self.data = self.msg_structure(tick, by, ctrl_state, input_length, tuple(input1[:input_length]),
+                                       tuple(input2[:input_length]))
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1348,7 +1613,7 @@ class MSG_HOST_OUT_START_SEQUENCE(Message):
         by = bytes(name, "utf-8")
         by += b"0" * (30 - len(by))
         self.data = self.msg_structure(tick, by)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1365,7 +1630,59 @@ class MSG_HOST_OUT_END_SEQUENCE(Message):
         by = bytes(name, "utf-8")
         by += b"0" * (30 - len(by))
         self.data = self.msg_structure(tick, by)
-        self.raw_data = bytes(self.data)
+        self.raw_data = memoryview(self.data).cast('B')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+class MSG_HOST_OUT_UPLOAD_BEGIN(Message):
+    """
+    start (or resume) the upload of a content to a robot, kind is the id of the load message the content replaces
+    (ID_MSG_HOST_OUT_LOAD_EXPERIMENT, ID_MSG_HOST_OUT_LOAD_SEQUENCE), the robot answers with MSG_HOST_IN_UPLOAD_ACK
+    """
+    class msg_structure(Structure):
+        _pack_ = 1
+        _fields_ = [("tick", c_uint32), ("kind", c_uint8), ("size", c_uint32), ("digest", c_uint8 * 16)]
+
+    def __init__(self, tick, kind, size, digest):
+        super().__init__()
+        self.id = ID_MSG_HOST_OUT_UPLOAD_BEGIN
+        self.data = self.msg_structure(tick, kind, size, tuple(digest))
+        self.raw_data = memoryview(self.data).cast('B')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+class MSG_HOST_OUT_UPLOAD_CHUNK(Message):
+    """
+    bytes of the content from offset on, the payload is the structure followed by length bytes (not a fixed size)
+    """
+    class msg_structure(Structure):
+        _pack_ = 1
+        _fields_ = [("tick", c_uint32), ("offset", c_uint32), ("length", c_uint16)]
+
+    def __init__(self, tick, offset, chunk):
+        super().__init__()
+        self.id = ID_MSG_HOST_OUT_UPLOAD_CHUNK
+        self.data = self.msg_structure(tick, offset, len(chunk))
+        self.raw_data = bytes(self.data) + bytes(chunk)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+class MSG_HOST_OUT_UPLOAD_COMMIT(Message):
+    class msg_structure(Structure):
+        _pack_ = 1
+        _fields_ = [("tick", c_uint32), ("digest", c_uint8 * 16)]
+
+    def __init__(self, tick, digest):
+        super().__init__()
+        self.id = ID_MSG_HOST_OUT_UPLOAD_COMMIT
+        self.data = self.msg_structure(tick, tuple(digest))
+        self.raw_data = memoryview(self.data).cast('B')
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1394,4 +1711,5 @@ msg_dictionary = {
     ID_MSG_HOST_IN_END_EXPERIMENT: MSG_HOST_IN_END_EXPERIMENT,
     ID_MSG_HOST_IN_LOAD_SEQUENCE: MSG_HOST_IN_LOAD_SEQUENCE,
     ID_MSG_HOST_IN_START_SEQUENCE: MSG_HOST_IN_START_SEQUENCE,
-    ID_MSG_HOST_IN_END_SEQUENCE: MSG_HOST_IN_END_SEQUENCE}
+    ID_MSG_HOST_IN_END_SEQUENCE: MSG_HOST_IN_END_SEQUENCE,
+    ID_MSG_HOST_IN_UPLOAD_ACK: MSG_HOST_IN_UPLOAD_ACK}
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+This module records the continuous states of the robots (MSG_HOST_IN_CONTINIUOS) for long-term analysis: every sample
+is copied as one fixed-size record (CONTINUOUS_DTYPE) into a preallocated, memory-mapped .npy file, one directory per
+robot. A new file is started once a file is full (TELEMETRY_FILE_SIZE) or old enough (TELEMETRY_FILE_SECONDS). The
+number of valid records of a file is kept in a small .json file next to it, so a recording can be opened as numpy
+arrays (f.e. recording['theta']) without parsing anything.
+The records of a sample are stored together (one structured array) and not in one file per column: a received payload
+already has the layout of a record, so recording a sample is a single copy into one file instead of one write per
+column into about 20 files, and a column of a recording (recording['theta']) is still a numpy view without a copy.
+The HostServer records every connected robot (TELEMETRY_RECORDING), the samples are recorded by the message layer
+as they are received (MessageHandler.receive()).
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import glob
+import json
+import os
+import threading
+import time
+from typing import List
+
+import numpy as np
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.messages import CONTINUOUS_DTYPE
+from params import TELEMETRY_DIRECTORY, TELEMETRY_FILE_SIZE, TELEMETRY_FILE_SECONDS
+
+RECORDING_EXTENSION = '.npy'
+COUNT_EXTENSION = '.json'
+
+
+class TelemetryRecorder:
+    """
+    - records the samples of one robot, record() copies the payload of a message into the mapped file (no parsing, no
+      allocation of a record), record_batch() copies many decoded samples at once
+    - the number of records is written to the .json file of the current file every flush_interval seconds, when a
+      new file is started and on close()
+    - payloads with the wrong size are counted as dropped
+    """
+
+    def __init__(self, robot_name: str, directory: str = TELEMETRY_DIRECTORY, file_size: int = TELEMETRY_FILE_SIZE,
+                 file_seconds: float = TELEMETRY_FILE_SECONDS, flush_interval: float = 1.0):
+        """
+        :param robot_name: name of the robot, the files are stored in directory/robot_name
+        :param directory: directory of all recordings
+        :param file_size: maximum size of a file in bytes
+        :param file_seconds: maximum time span of a file in seconds
+        :param flush_interval: time between two updates of the number of records in seconds
+        """
+        self.robot_name = robot_name
+        self.directory = os.path.join(directory, robot_name)
+        self.capacity = max(1, file_size // CONTINUOUS_DTYPE.itemsize)
+        self.file_seconds = file_seconds
+        self.flush_interval = flush_interval
+        self.path = None
+        self.files = 0
+        self.samples = 0
+        self.dropped = 0
+        self._records = None
+        # the mapped file as bytes, a payload is copied into it as it is
+        self._raw = None
+        self._count = 0
+        self._file_start = 0.0
+        self._start_time = 0.0
+        self._next_flush = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, payload) -> bool:
+        """
+        :param payload: payload of a MSG_HOST_IN_CONTINIUOS (f.e. msg.raw_data)
+        :return: true if the sample has been recorded
+        """
+        size = CONTINUOUS_DTYPE.itemsize
+        if len(payload) != size:
+            self.dropped += 1
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._records is None or self._count == self.capacity or now - self._file_start >= self.file_seconds:
+                self._roll(now)
+            start = self._count * size
+            self._raw[start:start + size] = payload
+            self._count += 1
+            self.samples += 1
+            if now >= self._next_flush:
+                self._write_count(now)
+        return True
+
+    def record_batch(self, records: np.ndarray):
+        """
+        :param records: array of CONTINUOUS_DTYPE records, f.e. decoded with np.frombuffer
+        :return: nothing
+        """
+        now = time.monotonic()
+        with self._lock:
+            position = 0
+            while position < len(records):
+                if self._records is None or self._count == self.capacity or \
+                        now - self._file_start >= self.file_seconds:
+                    self._roll(now)
+                number = min(len(records) - position, self.capacity - self._count)
+                self._records[self._count:self._count + number] = records[position:position + number]
+                self._count += number
+                position += number
+            self.samples += len(records)
+            if now >= self._next_flush:
+                self._write_count(now)
+
+    def flush(self):
+        """
+        write the mapped file and its number of records to the disk
+        :return: nothing
+        """
+        with self._lock:
+            if self._records is not None:
+                self._records.flush()
+                self._write_count(time.monotonic())
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+    def report(self) -> dict:
+        """
+        :return: dict with current file, records in the current file, files, samples and dropped payloads
+        """
+        return {'file': self.path, 'records': self._count, 'files': self.files, 'samples': self.samples,
+                'dropped': self.dropped}
+
+    def _roll(self, now: float):
+        self._close_file()
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, "{}_{}_{:04d}{}".format(
+            self.robot_name, time.strftime('%Y%m%d_%H%M%S'), self.files, RECORDING_EXTENSION))
+        self._records = np.lib.format.open_memmap(self.path, mode='w+', dtype=CONTINUOUS_DTYPE,
+                                                  shape=(self.capacity,))
+        self._raw = memoryview(self._records.view(np.uint8))
+        self._count = 0
+        self._file_start = now
+        self._start_time = time.time()
+        self.files += 1
+        self._write_count(now)
+
+    def _close_file(self):
+        if self._records is None:
+            return
+        self._records.flush()
+        self._write_count(time.monotonic())
+        self._raw.release()
+        self._raw = None
+        # the file is unmapped once the last reference is gone
+        self._records = None
+
+    def _write_count(self, now: float):
+        self._next_flush = now + self.flush_interval
+        temp_path = self.path + COUNT_EXTENSION + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'robot': self.robot_name, 'start': self._start_time, 'count': self._count}, file)
+        os.replace(temp_path, self.path + COUNT_EXTENSION)
+
+
+def recording_files(robot_name: str, directory: str = TELEMETRY_DIRECTORY) -> List[str]:
+    """
+    :return: paths of all recording files of a robot, oldest first
+    """
+    return sorted(glob.glob(os.path.join(directory, robot_name, '*' + RECORDING_EXTENSION)))
+
+
+def open_recording_file(path: str) -> np.ndarray:
+    """
+    :param path: path of a recording file
+    :return: read-only memory-mapped array of the valid records of the file (all records if the number is unknown)
+    """
+    records = np.load(path, mmap_mode='r')
+    try:
+        with open(path + COUNT_EXTENSION) as file:
+            count = json.load(file)['count']
+    except (OSError, ValueError, KeyError):
+        return records
+    return records[:count]
+
+
+def open_recording(robot_name: str, directory: str = TELEMETRY_DIRECTORY) -> List[np.ndarray]:
+    """
+    :return: one memory-mapped array per recording file of a robot, oldest first, nothing is read until it is used
+    """
+    return [open_recording_file(path) for path in recording_files(robot_name, directory)]
+
+
+def load_recording(robot_name: str, directory: str = TELEMETRY_DIRECTORY) -> np.ndarray:
+    """
+    :return: all records of a robot in one array (copied into memory)
+    """
+    files = open_recording(robot_name, directory)
+    if not files:
+        return np.zeros(0, dtype=CONTINUOUS_DTYPE)
+    return np.concatenate(files)
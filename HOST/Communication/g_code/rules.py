@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+This module contains the abort rules of an experiment. Instead of a (condition, threshold) pair for every signal
+(MSG_HOST_OUT_LOAD_EXPERIMENT), only the rules that are used are sent: a count followed by one RULE_DTYPE entry
+(signal, op, threshold) per rule. The experiment is aborted once "signal op threshold" holds for any rule.
+
+rules in the experiment YAML:
+    abort:
+      - abs_theta > 0.5                                 signal op threshold, abs(theta) is the same as abs_theta
+      - {signal: x, op: '<', threshold: -1.5}
+    or
+    abort:
+      abs_theta: '> 0.5'
+
+The same rules are evaluated vectorized against decoded or recorded MSG_HOST_IN_CONTINIUOS samples (CONTINUOUS_DTYPE),
+so they can be checked offline, f.e. against a recording (recorder.open_recording()).
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import re
+import struct
+from typing import Iterable, Tuple, Union
+
+import numpy as np
+import yaml
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.data import RULE_SIGNAL, RULE_OP
+from params import MAX_ABORT_RULES
+
+# one rule on the wire (little endian, packed)
+RULE_DTYPE = np.dtype([('signal', 'u1'), ('op', 'u1'), ('threshold', '<f4')])
+# number of rules in front of the entries
+_COUNT_STRUCT = struct.Struct('<B')
+
+_OPS = {'>': RULE_OP.GREATER, '>=': RULE_OP.GREATER_EQUAL, '<': RULE_OP.LESS, '<=': RULE_OP.LESS_EQUAL,
+        '==': RULE_OP.EQUAL, '!=': RULE_OP.NOT_EQUAL}
+_COMPARE = {RULE_OP.GREATER: np.greater, RULE_OP.GREATER_EQUAL: np.greater_equal, RULE_OP.LESS: np.less,
+            RULE_OP.LESS_EQUAL: np.less_equal, RULE_OP.EQUAL: np.equal, RULE_OP.NOT_EQUAL: np.not_equal}
+# "abs_theta > 0.5", "abs(theta) >= 1e-2"
+_RULE_PATTERN = re.compile(r'^\s*(?:abs\s*\(\s*(\w+)\s*\)|(\w+))\s*(>=|<=|==|!=|>|<)\s*(\S+)\s*$')
+
+# field of CONTINUOUS_DTYPE (and index in it) of the signals that differ from the field names
+_SIGNAL_FIELDS = {RULE_SIGNAL.X_DOT: ('v', None), RULE_SIGNAL.GYR_X: ('gyr', 0), RULE_SIGNAL.GYR_Y: ('gyr', 1),
+                  RULE_SIGNAL.GYR_Z: ('gyr', 2), RULE_SIGNAL.ACC_X: ('acc', 0), RULE_SIGNAL.ACC_Y: ('acc', 1),
+                  RULE_SIGNAL.ACC_Z: ('acc', 2), RULE_SIGNAL.U1: ('u', 0), RULE_SIGNAL.U2: ('u', 1)}
+
+# number of samples that are evaluated at once
+_BLOCK_SIZE = 1 << 16
+# condition of a signal without a rule in MSG_HOST_OUT_LOAD_EXPERIMENT
+LEGACY_NO_CONDITION = 0
+
+
+def _signal_source(signal: RULE_SIGNAL) -> Tuple[str, Union[int, None], bool]:
+    absolute = signal.name.startswith('ABS_')
+    base = RULE_SIGNAL[signal.name[4:]] if absolute else signal
+    field, index = _SIGNAL_FIELDS.get(base, (base.name.lower(), None))
+    return field, index, absolute
+
+
+# signal -> field, index, abs
+_SIGNALS = {signal: _signal_source(signal) for signal in RULE_SIGNAL}
+
+
+def _signal(name: str) -> RULE_SIGNAL:
+    try:
+        return RULE_SIGNAL[name.strip().upper()]
+    except KeyError:
+        raise ValueError("unknown signal '{}' of an abort rule".format(name)) from None
+
+
+def _rule(entry) -> tuple:
+    if isinstance(entry, str):
+        match = _RULE_PATTERN.match(entry)
+        if match is None:
+            raise ValueError("abort rule '{}' is not 'signal op threshold'".format(entry))
+        name = 'abs_' + match.group(1) if match.group(1) else match.group(2)
+        op, threshold = match.group(3), match.group(4)
+    elif isinstance(entry, dict):
+        try:
+            name, op, threshold = entry['signal'], entry['op'], entry['threshold']
+        except KeyError as key:
+            raise ValueError("abort rule {} has no {}".format(entry, key)) from None
+    else:
+        raise ValueError("abort rule {} is neither a string nor a mapping".format(entry))
+    if op not in _OPS:
+        raise ValueError("unknown op '{}' of an abort rule, use one of {}".format(op, ', '.join(_OPS)))
+    try:
+        threshold = float(threshold)
+    except (TypeError, ValueError):
+        raise ValueError("threshold '{}' of an abort rule is not a number".format(threshold)) from None
+    return _signal(name), _OPS[op], threshold
+
+
+def build_rules(spec) -> np.ndarray:
+    """
+    :param spec: the abort rules of an experiment YAML, list of 'signal op threshold' strings or mappings with signal,
+                 op and threshold, or a mapping signal -> 'op threshold'
+    :return: array of RULE_DTYPE entries in the order of spec
+    """
+    if spec is None:
+        entries = []
+    elif isinstance(spec, dict):
+        entries = ["{} {}".format(name, condition) for name, condition in spec.items()]
+    else:
+        entries = list(spec)
+    if len(entries) > MAX_ABORT_RULES:
+        raise ValueError("{} abort rules, a robot can keep {}".format(len(entries), MAX_ABORT_RULES))
+    return np.array([_rule(entry) for entry in entries], dtype=RULE_DTYPE)
+
+
+def rules_from_yaml(source) -> np.ndarray:
+    """
+    :param source: experiment YAML (text) or the mapping it has been loaded into
+    :return: the abort rules of the experiment (key 'abort'), see build_rules()
+    """
+    experiment = yaml.safe_load(source) if isinstance(source, str) else source
+    return build_rules((experiment or {}).get('abort'))
+
+
+def encode_rules(rules: np.ndarray) -> bytes:
+    """
+    :return: number of rules followed by the rules (RULE_DTYPE)
+    """
+    rules = np.asarray(rules, dtype=RULE_DTYPE)
+    return _COUNT_STRUCT.pack(len(rules)) + rules.tobytes()
+
+
+def decode_rules(buffer, offset: int = 0) -> Tuple[np.ndarray, int]:
+    """
+    :return: the rules at offset in buffer and the position after them
+    """
+    count, = _COUNT_STRUCT.unpack_from(buffer, offset)
+    offset += _COUNT_STRUCT.size
+    rules = np.frombuffer(buffer, dtype=RULE_DTYPE, count=count, offset=offset)
+    return rules, offset + rules.nbytes
+
+
+def legacy_conditions(rules: np.ndarray) -> list:
+    """
+    conditions of MSG_HOST_OUT_LOAD_EXPERIMENT (for robots that do not know the upload protocol): one condition and
+    threshold per signal in the order of RULE_SIGNAL, the condition is LEGACY_NO_CONDITION or the op of the rule + 1
+    :param rules: array of RULE_DTYPE entries
+    :return: [condition, threshold] * len(RULE_SIGNAL), raises ValueError if a signal has more than one rule
+    """
+    conditions = [LEGACY_NO_CONDITION, 0.0] * len(RULE_SIGNAL)
+    for rule in np.asarray(rules, dtype=RULE_DTYPE):
+        position = 2 * int(rule['signal'])
+        if conditions[position] != LEGACY_NO_CONDITION:
+            raise ValueError("the load message has one condition per signal: {}".format(rule_string(rule)))
+        conditions[position:position + 2] = int(rule['op']) + 1, float(rule['threshold'])
+    return conditions
+
+
+def rule_string(rule) -> str:
+    op = next(text for text, value in _OPS.items() if value == rule['op'])
+    return "{} {} {:g}".format(RULE_SIGNAL(rule['signal']).name.lower(), op, rule['threshold'])
+
+
+def signal_values(records: np.ndarray, signal: RULE_SIGNAL) -> np.ndarray:
+    """
+    :param records: array of CONTINUOUS_DTYPE records
+    :return: values of the signal of every record
+    """
+    field, index, absolute = _SIGNALS[RULE_SIGNAL(signal)]
+    values = records[field] if index is None else records[field][:, index]
+    return np.abs(values) if absolute else values
+
+
+def evaluate_rules(rules: np.ndarray, records: np.ndarray) -> np.ndarray:
+    """
+    :param rules: array of RULE_DTYPE entries
+    :param records: array of CONTINUOUS_DTYPE records (f.e. decode_continuous() or a recording)
+    :return: bool array (records x rules), true where a rule holds (the experiment would be aborted)
+    """
+    holds = np.empty((len(rules), len(records)), dtype=bool)
+    values = {}
+    for row, (signal, op, threshold) in enumerate(rules.tolist()):
+        if signal not in values:
+            values[signal] = signal_values(records, signal)
+        # the robot compares in float32
+        _COMPARE[op](values[signal], np.float32(threshold), out=holds[row])
+    return holds.T
+
+
+def _blocks(recordings: Iterable[np.ndarray], block_size: int):
+    for records in recordings:
+        for start in range(0, len(records), block_size):
+            yield records[start:start + block_size]
+
+
+def first_violation(rules: np.ndarray, recordings: Union[np.ndarray, Iterable[np.ndarray]],
+                    block_size: int = _BLOCK_SIZE) -> Tuple[int, int]:
+    """
+    :param recordings: array of CONTINUOUS_DTYPE records or several of them (f.e. the files of a recording)
+    :return: index of the first record (counted over all arrays) for which a rule holds and the index of that rule,
+             (-1, -1) if no rule holds
+    """
+    if isinstance(recordings, np.ndarray):
+        recordings = (recordings,)
+    position = 0
+    for block in _blocks(recordings, block_size):
+        holds = evaluate_rules(rules, block)
+        any_rule = holds.any(axis=1)
+        if any_rule.any():
+            index = int(np.argmax(any_rule))
+            return position + index, int(np.argmax(holds[index]))
+        position += len(block)
+    return -1, -1
+
+
+def check_recording(rules: np.ndarray, recordings: Union[np.ndarray, Iterable[np.ndarray]],
+                    block_size: int = _BLOCK_SIZE) -> dict:
+    """
+    check the rules against recorded samples
+    :param recordings: array of CONTINUOUS_DTYPE records or several of them (f.e. recorder.open_recording(name))
+    :return: dict with the number of records, (rule, number of records it holds for) of every rule and the tick and
+             rule of the first record a rule holds for (None if no rule holds)
+    """
+    if isinstance(recordings, np.ndarray):
+        recordings = (recordings,)
+    counts = np.zeros(len(rules), dtype=np.int64)
+    records = 0
+    first = None
+    for block in _blocks(recordings, block_size):
+        holds = evaluate_rules(rules, block)
+        counts += holds.sum(axis=0)
+        if first is None and holds.any():
+            index = int(np.argmax(holds.any(axis=1)))
+            first = {'tick': int(block['tick'][index]), 'rule': rule_string(rules[int(np.argmax(holds[index]))])}
+        records += len(block)
+    return {'records': records, 'violations': [(rule_string(rule), int(count)) for rule, count in zip(rules, counts)],
+            'first': first}
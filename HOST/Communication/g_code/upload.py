@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+This module uploads experiments and sequences to the robots. Instead of MSG_HOST_OUT_LOAD_EXPERIMENT/ _SEQUENCE, which
+always carry 2000 samples per input, the content only holds input_length samples and is sent in chunks:
+
+    host                                        robot
+    MSG_HOST_OUT_UPLOAD_BEGIN (kind, size, digest) ->
+                                                <- MSG_HOST_IN_UPLOAD_ACK COMPLETE (has the digest, nothing to send)
+                                                   or ACCEPTED (offset: bytes of this digest it already has)
+    MSG_HOST_OUT_UPLOAD_CHUNK (offset, bytes)   -> at most UPLOAD_WINDOW chunks are not acknowledged
+                                                <- MSG_HOST_IN_UPLOAD_ACK ACCEPTED (offset: bytes received in order)
+    MSG_HOST_OUT_UPLOAD_COMMIT (digest)         ->
+                                                <- MSG_HOST_IN_UPLOAD_ACK COMPLETE (digest is valid) or ERROR
+
+Every answer carries the tick of the message it answers, the host waits for it with MessageHandler.expect(). A chunk
+that got lost is sent again from the offset of the robot, a robot that does not answer is asked for its offset with a
+new begin message, so an interrupted upload resumes where it stopped. An upload is sent to several robots in parallel.
+A robot that never answers the begin message does not know the protocol, it gets the load message (fallback) instead.
+
+layout of a content (little endian):
+    header      EXPERIMENT_HEADER or SEQUENCE_HEADER (the fields of the load message without tick, inputs and
+                conditions)
+    rules       experiment only: number of abort rules and the rules (see rules.py)
+    input1      input_length float32
+    input2      input_length float32
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import concurrent.futures
+import hashlib
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from ctypes import Structure
+from time import perf_counter
+from typing import Callable, Dict, Hashable, Tuple
+
+import numpy as np
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from Communication.g_code.data import UPLOAD_STATUS
+from Communication.g_code.general import Message, msg_size
+from Communication.g_code.messages import MessageHandler, MSG_HOST_OUT_LOAD_EXPERIMENT, MSG_HOST_OUT_LOAD_SEQUENCE, \
+    MSG_HOST_OUT_UPLOAD_BEGIN, MSG_HOST_OUT_UPLOAD_CHUNK, MSG_HOST_OUT_UPLOAD_COMMIT, MSG_HOST_IN_UPLOAD_ACK
+from Communication.g_code.rules import build_rules, encode_rules
+from params import ID_MSG_HOST_IN_UPLOAD_ACK, UPLOAD_CHUNK_SIZE, UPLOAD_WINDOW, UPLOAD_TIMEOUT, UPLOAD_RETRIES, \
+    UPLOAD_MAX_PARALLEL, MAX_INPUT_LENGTH
+
+# ticks of the messages of all uploads, the answers of the robots are matched by their tick
+_ticks = itertools.count(1)
+
+
+def _next_tick() -> int:
+    return next(_ticks) & 0xFFFFFFFF
+
+
+def _header_structure(name: str, message) -> type:
+    # the conditions are replaced by the abort rules
+    fields = [field for field in message.msg_structure._fields_ if field[0] not in ('tick', 'input1', 'input2')
+              and not field[0].endswith(('_condition', '_threshold'))]
+    return type(name, (Structure,), {'_pack_': 1, '_fields_': fields})
+
+
+EXPERIMENT_HEADER = _header_structure('EXPERIMENT_HEADER', MSG_HOST_OUT_LOAD_EXPERIMENT)
+SEQUENCE_HEADER = _header_structure('SEQUENCE_HEADER', MSG_HOST_OUT_LOAD_SEQUENCE)
+
+
+class UploadError(Exception):
+    """
+    raised if a robot rejects an upload or does not answer
+    """
+    pass
+
+
+def _pad(text: str, size: int) -> bytes:
+    # strings are filled with "0" like in the load messages
+    by = bytes(text, "utf-8")
+    return by + b"0" * (size - len(by))
+
+
+def _inputs(input1, input2) -> Tuple[np.ndarray, np.ndarray]:
+    input1 = np.asarray(input1, dtype='<f4')
+    input2 = np.asarray(input2, dtype='<f4')
+    if input1.ndim != 1 or input1.shape != input2.shape:
+        raise ValueError("input1 and input2 must be sequences of the same length")
+    if len(input1) > MAX_INPUT_LENGTH:
+        raise ValueError("inputs have {} samples, a robot can keep {}".format(len(input1), MAX_INPUT_LENGTH))
+    return input1, input2
+
+
+def experiment_content(name: str, sampling_frequency: int, duration: int, hardware_version: float,
+                       software_version: float, ctrl_state: int, logging_active: bool, filename: str, input1, input2,
+                       rules: np.ndarray = None) -> bytes:
+    """
+    :param input1: samples of the first input, only these are sent (input_length = len(input1))
+    :param input2: samples of the second input, same length as input1
+    :param rules: abort rules (RULE_DTYPE, see rules.build_rules()), only the rules that are used are sent
+    :return: content of an experiment (see Upload)
+    """
+    input1, input2 = _inputs(input1, input2)
+    header = EXPERIMENT_HEADER(name=_pad(name, 30), sampling_frequency=sampling_frequency, duration=duration,
+                               hardware_version=hardware_version, software_version=software_version,
+                               ctrl_state=ctrl_state, logging_active=logging_active, filename=_pad(filename, 20),
+                               input_length=len(input1))
+    return bytes(header) + encode_rules(build_rules(None) if rules is None else rules) + input1.tobytes() + \
+        input2.tobytes()
+
+
+def sequence_content(name: str, ctrl_state: int, input1, input2) -> bytes:
+    """
+    :return: content of a sequence (see Upload)
+    """
+    input1, input2 = _inputs(input1, input2)
+    header = SEQUENCE_HEADER(name=_pad(name, 30), ctrl_state=ctrl_state, input_length=len(input1))
+    return bytes(header) + input1.tobytes() + input2.tobytes()
+
+
+def content_digest(content) -> bytes:
+    """
+    :return: 16 byte hash of a content, a robot that has a content with this digest does not get it again
+    """
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+class Upload:
+    """
+    - upload of a content to one robot, run() blocks until the robot has the content or the upload failed
+    - the answers of the robot complete futures of its MessageHandler, so the messages of the robot have to be handled
+      by another thread meanwhile (update())
+    """
+
+    def __init__(self, content: bytes, kind: int, send: Callable[[Message], bool], handler: MessageHandler,
+                 chunk_size: int = UPLOAD_CHUNK_SIZE, window: int = UPLOAD_WINDOW, timeout: float = UPLOAD_TIMEOUT,
+                 retries: int = UPLOAD_RETRIES, digest: bytes = None, fallback: Message = None):
+        """
+        :param content: see experiment_content() and sequence_content()
+        :param kind: id of the load message the content replaces (ID_MSG_HOST_OUT_LOAD_EXPERIMENT/ _SEQUENCE)
+        :param send: sends a message to the robot, returns false if it could not be sent
+        :param handler: MessageHandler of the messages received from the robot
+        :param chunk_size: bytes of the content per chunk
+        :param window: maximum number of chunks that have not been acknowledged
+        :param timeout: time in seconds to wait for an answer
+        :param retries: number of times the robot is asked for its offset before the upload fails
+        :param digest: content_digest(content) if it is known already
+        :param fallback: load message of the content (MSG_HOST_OUT_LOAD_EXPERIMENT/ _SEQUENCE) that is sent instead if
+                         the robot never answers the begin message
+        """
+        self.content = memoryview(content)
+        self.kind = kind
+        self.send = send
+        self.handler = handler
+        self.chunk_size = chunk_size
+        self.window = window
+        self.timeout = timeout
+        self.retries = retries
+        self.digest = content_digest(content) if digest is None else digest
+        self.fallback = fallback
+        self.state = 'pending'
+        self.error = None
+        # offset the robot had when the upload started, > 0 if an interrupted upload is resumed
+        self.resumed_at = None
+        # bytes of all messages that have been sent (header, payload and crc)
+        self.bytes_sent = 0
+        self.retried = 0
+        # retries since the last acknowledged chunk
+        self._failures = 0
+        # set once the robot answered any message
+        self._answered = False
+        self.elapsed = 0.0
+
+    def run(self) -> dict:
+        """
+        :return: report(), the state is 'uploaded', 'skipped' (the robot has the content already), 'fallback' (the load
+                 message has been sent) or 'failed'
+        """
+        start = perf_counter()
+        try:
+            self.state = self._run()
+        except UploadError as error:
+            self.state = 'failed'
+            self.error = str(error)
+        self.elapsed = perf_counter() - start
+        return self.report()
+
+    def report(self) -> dict:
+        return {'state': self.state, 'size': len(self.content), 'bytes_sent': self.bytes_sent,
+                'resumed_at': self.resumed_at, 'retries': self.retried, 'elapsed': self.elapsed, 'error': self.error}
+
+    def _run(self) -> str:
+        try:
+            ack = self._begin()
+        except UploadError:
+            if self.fallback is None or self._answered:
+                raise
+            # the robot does not know the upload protocol
+            if not self.send(self.fallback):
+                raise UploadError("load message could not be sent") from None
+            self.bytes_sent += msg_size(self.fallback)
+            return 'fallback'
+        if ack.status == UPLOAD_STATUS.COMPLETE:
+            return 'skipped'
+        self.resumed_at = ack.offset
+        offset = ack.offset
+        while True:
+            if not self._send_chunks(offset):
+                return 'uploaded'
+            ack = self._request(MSG_HOST_OUT_UPLOAD_COMMIT(_next_tick(), self.digest))
+            if ack is not None and ack.status == UPLOAD_STATUS.COMPLETE:
+                return 'uploaded'
+            # no answer or the digest does not match, the robot tells where to start again
+            self._retry()
+            ack = self._begin()
+            if ack.status == UPLOAD_STATUS.COMPLETE:
+                return 'uploaded'
+            offset = ack.offset
+
+    def _send_chunks(self, offset: int) -> bool:
+        """
+        send the content from offset on, after a lost chunk the content is sent again from the offset of the robot
+        :return: false if the robot has the whole content already (nothing to commit)
+        """
+        size = len(self.content)
+        in_flight = deque()
+        while offset < size or in_flight:
+            while len(in_flight) < self.window and offset < size:
+                end = min(offset + self.chunk_size, size)
+                msg = MSG_HOST_OUT_UPLOAD_CHUNK(_next_tick(), offset, self.content[offset:end])
+                in_flight.append((self._expect(msg), end))
+                offset = end
+            ack = self._answer_oldest(in_flight)
+            _, end = in_flight.popleft()
+            if ack is not None and ack.status == UPLOAD_STATUS.ACCEPTED and ack.offset >= end:
+                self._failures = 0
+                continue
+            # the answers to the chunks after a lost one are not needed anymore
+            for pending, _ in in_flight:
+                pending.cancel()
+            in_flight.clear()
+            if ack is not None and ack.status == UPLOAD_STATUS.ERROR:
+                raise UploadError("robot rejected the chunk that ends at offset {}".format(end))
+            self._retry()
+            if ack is None:
+                ack = self._begin()
+                if ack.status == UPLOAD_STATUS.COMPLETE:
+                    return False
+            offset = ack.offset
+        return True
+
+    def _begin(self):
+        """
+        start the upload or ask the robot for its offset
+        :return: answer of the robot (ACCEPTED or COMPLETE)
+        """
+        while True:
+            ack = self._request(MSG_HOST_OUT_UPLOAD_BEGIN(_next_tick(), self.kind, len(self.content), self.digest))
+            if ack is not None:
+                break
+            self._retry()
+        if ack.status == UPLOAD_STATUS.ERROR:
+            raise UploadError("robot rejected the upload")
+        return ack
+
+    def _retry(self):
+        self.retried += 1
+        self._failures += 1
+        if self._failures > self.retries:
+            raise UploadError("no progress after {} retries".format(self.retries))
+
+    def _expect(self, msg) -> Future:
+        future = self.handler.expect(ID_MSG_HOST_IN_UPLOAD_ACK, msg.data.tick)
+        if not self.send(msg):
+            future.cancel()
+            raise UploadError("message could not be sent")
+        self.bytes_sent += msg_size(msg)
+        return future
+
+    def _answer(self, future: Future):
+        try:
+            answer = MSG_HOST_IN_UPLOAD_ACK(future.result(self.timeout)).data
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return None
+        self._answered = True
+        return answer
+
+    def _answer_oldest(self, in_flight: deque):
+        """
+        :return: answer to the oldest chunk, the answer to a later chunk if the oldest one got lost (the robot answers
+                 the chunks in order, so its offset is where the lost chunk starts) or None if there is no answer
+        """
+        oldest = in_flight[0][0]
+        done, _ = concurrent.futures.wait([future for future, _ in in_flight], self.timeout,
+                                          concurrent.futures.FIRST_COMPLETED)
+        if not done:
+            oldest.cancel()
+            return None
+        if oldest.done():
+            return self._answer(oldest)
+        # the answer to the oldest chunk got lost, its future is removed from the handler before it is popped
+        oldest.cancel()
+        return self._answer(next(future for future, _ in in_flight if future in done))
+
+    def _request(self, msg):
+        return self._answer(self._expect(msg))
+
+
+def upload_fleet(content: bytes, kind: int, robots: Dict[Hashable, Tuple[Callable[[Message], bool], MessageHandler]],
+                 max_parallel: int = UPLOAD_MAX_PARALLEL, **kwargs) -> Dict[Hashable, dict]:
+    """
+    upload a content to several robots in parallel, the digest is computed once
+    :param content: see experiment_content() and sequence_content()
+    :param kind: id of the load message the content replaces
+    :param robots: key (f.e. client) -> (send, handler) of every robot, see Upload
+    :param max_parallel: maximum number of robots the content is sent to at the same time
+    :param kwargs: see Upload
+    :return: key -> report of the upload (see Upload.run())
+    """
+    if not robots:
+        return {}
+    digest = content_digest(content)
+    uploads = {key: Upload(content, kind, send, handler, digest=digest, **kwargs)
+               for key, (send, handler) in robots.items()}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(uploads)))) as pool:
+        futures = {key: pool.submit(upload.run) for key, upload in uploads.items()}
+    return {key: future.result() for key, future in futures.items()}
@@ -18,7 +18,7 @@ slots(= functions)
 
 
 # pyQt
-from PyQt5.QtNetwork import QHostAddress, QTcpServer, QTcpSocket
+from PyQt5.QtNetwork import QHostAddress, QTcpServer, QTcpSocket, QAbstractSocket
 from PyQt5.QtCore import QObject, pyqtSignal as Signal, QThread
 
 # create threads
@@ -26,9 +26,12 @@ import threading
 
 # do crc8 checks of messages
 
-from typing import List, Dict, Union, Any
+from typing import List, Dict, Union, Any, Iterable, Callable
 
+import os
 import queue
+import time
+from collections import deque
 
 # ---------------------------------------------------------------------------
 # ---------------------------------------------------------------------------
@@ -36,52 +39,161 @@ import queue
 
 # Setting and Broadcasting Host-Ip
 from Communication.broadcast_host_ip import HostIp, BroadcastIpUDP
+from Communication.client_registry import ClientRegistry
+from params import SERVER_PORT, MAX_CLIENTS, GCODE_DIRECTORY, GCODE_CACHE_DIRECTORY, GCODE_FILE_WINDOW, \
+    TX_QUEUE_SIZE, RX_QUEUE_SIZE, TX_QUEUE_TIMEOUT, TX_CONFLATE_MSG_IDS, SETPOINT_RATE, TX_FRAGMENT_SIZE, \
+    EXPERIMENT_DIRECTORY, SEQUENCE_DIRECTORY, TELEMETRY_RECORDING, ID_MSG_HOST_OUT_LOAD_EXPERIMENT, \
+    ID_MSG_HOST_OUT_LOAD_SEQUENCE
 
 # Robot User-Interface
 
 from Communication.g_code.gcode_parser import gcode_parser
-from layer_core_communication.hl_core_communication import hl_rx_handling, hl_tx_handling
-from layer_core_communication.pl_core_communication import pl_translate_msg_tx
+from Communication.g_code.file_execution import FileExecution
+from Communication.g_code.gcode_compiler import load_program
+from Communication.g_code.general import Message, msg_builder, tx_priority, tx_queue_policy, rx_queue_policy
+from Communication.g_code.loader import FileLoader, LoadError
+from Communication.g_code.recorder import TelemetryRecorder
+from Communication.g_code.messages import MessageHandler, MSG_HOST_OUT_START_EXPERIMENT, MSG_HOST_OUT_END_EXPERIMENT, \
+    MSG_HOST_OUT_START_SEQUENCE, MSG_HOST_OUT_END_SEQUENCE
+from Communication.g_code.upload import upload_fleet
+from layer_core_communication.hl_core_communication import hl_rx_handling, hl_rx_backlog, hl_tx_handling, \
+    FrameDecoder, EncodedFrame, TX_MAX_BATCH_BYTES, TX_MAX_LATENCY
+from layer_core_communication.pl_core_communication import pl_translate_msg_tx, pl_fragment_msg, \
+    pl_is_gcode_frame, PL_RX_STATISTICS
+from layer_core_communication.wakeup import WakeupChannel, WakeupQueue, TxPriority
+from layer_core_communication.fanout import FanOut
+from layer_core_communication.setpoint import SetpointChannel
+from layer_core_communication.statistics import LatencyStatistics, TxStatistics
 
 
 # ---------------------------------------------------------------------------
 
 
+# internal calls of experiments and sequences -> action, experiment (else sequence)
+_EXPERIMENT_CALLS = {'M65': ('load', True), 'M66': ('start', True), 'M67': ('load_start', True),
+                     'M68': ('end', True), 'M69': ('load', False), 'M70': ('start', False),
+                     'M71': ('load_start', False), 'M72': ('end', False)}
+
+
+def _ends_batch(data) -> bool:
+    # a write ends after a bulk message (fragment), a safety message that is put in the meantime goes into the next one
+    return tx_priority(data) is TxPriority.BULK
+
+
 class Client:
     """
     -represents a client that has to be connected to the Server
-    -each client has their own receive/ transmit queue that is constantly checked by a thread each
+    -each client has their own receive/ transmit queue, putting data into the transmit queue wakes up the tx thread
+    -the queues are bounded: control inputs are conflated (tx_queue_policy), other messages wait for space in the tx
+     queue, the oldest received telemetry messages are dropped if the layers fall behind (rx_queue_policy), acks and
+     other answers are never dropped, if they do not fit into the rx queue the socket is not read until the protocol
+     layer caught up (rx_backlog)
+    -control inputs that are sent with HostServer.send_message go through the setpoint channel, only the newest one of
+     every msg id is sent
+    -the tx queue has priorities (tx_priority), large messages are sent in fragments of TX_FRAGMENT_SIZE bytes
     """
     rx_queue: queue.Queue
     tx_queue: queue.Queue
     pl_ml_tx_queue = queue.Queue
     pl_ml_rx_queue = queue.Queue
     socket: QTcpSocket
-    id: str
+    id: int
+    name: str
     type: str
     ip: str
+    port: int
 
-    def __init__(self, socket):
+    def __init__(self, socket, tx_wakeup: WakeupChannel = None, pl_tx_wakeup: WakeupChannel = None,
+                 pl_rx_wakeup: WakeupChannel = None, ml_rx_wakeup: WakeupChannel = None):
         self.socket = socket
         self.hl_pl_rx_queue = queue.Queue()
-        self.tx_queue = queue.Queue()
-        self.rx_queue = queue.Queue()
+        # every put wakes up the thread(s) waiting on the respective channel with this client as key
+        self.tx_queue = WakeupQueue(TX_QUEUE_SIZE, tx_wakeup, self, classify=tx_queue_policy, priority=tx_priority)
+        self.rx_queue = WakeupQueue(RX_QUEUE_SIZE, pl_rx_wakeup, self, classify=rx_queue_policy)
         # transmit queue to message layer
-        self.pl_ml_tx_queue = queue.Queue()
+        self.pl_ml_tx_queue = WakeupQueue(TX_QUEUE_SIZE, pl_tx_wakeup, self, classify=tx_queue_policy)
         # receive queue to message layer
-        self.pl_ml_rx_queue = queue.Queue()
+        self.pl_ml_rx_queue = WakeupQueue(RX_QUEUE_SIZE, ml_rx_wakeup, self, classify=rx_queue_policy)
+        # newest control input per msg id, written by the tx thread before the messages of the tx queue
+        self.setpoints = SetpointChannel(tx_wakeup, self, SETPOINT_RATE)
+        # keeps frames that are split over several reads of the socket
+        self.frame_decoder = FrameDecoder()
+        # received messages that did not fit into the full rx queue, the socket is not read until they have been put
+        self.rx_backlog = deque()
+        # called by the protocol layer once it has taken messages out of the rx queue while there is a backlog
+        self.on_rx_resume: Callable[[], None] = None
+        # set once the socket has been closed, nothing is queued for the client anymore
+        self.closed = False
+        # set when the client is added to the ClientRegistry
         self.id = None
+        self.name = None
         self.type = None
         self.ip = None
+        self.port = None
 
-    def send_message(self, data):
+    def send_message(self, data, timeout: float = None) -> bool:
+        """
+        :param data: translated message or EncodedFrame, a large message is split into fragments
+        :param timeout: time in seconds to wait for space in the tx queue (QueuePolicy.BLOCK), default: 0 on the Qt
+                        (main) thread, so a stalled robot does not freeze the UI, else TX_QUEUE_TIMEOUT
+        :return: false if the tx queue is full or the client has been closed and the message has not been queued
+                 (completely)
+        """
+        if self.closed:
+            return False
+        if timeout is None:
+            timeout = 0 if threading.current_thread() is threading.main_thread() else TX_QUEUE_TIMEOUT
         if isinstance(data, list):
             data = bytes(data)
-            self.tx_queue.put_nowait(data)
+        fragments = (data,) if isinstance(data, EncodedFrame) else pl_fragment_msg(data, TX_FRAGMENT_SIZE)
+        if timeout == 0 and len(fragments) > TX_QUEUE_SIZE - self.tx_queue.qsize():
+            # the fragments would not fit without waiting, none of them is queued
+            print("tx queue of", self.name, "is full, message not sent!")
+            return False
+        try:
+            for fragment in fragments:
+                self.tx_queue.put(fragment, timeout=timeout)
+        except queue.Full:
+            print("tx queue of", self.name, "is full, message not sent!")
+            return False
+        return True
+
+    def fail_pending(self) -> int:
+        """
+        remove the messages that have not been written yet (f.e. once the client has been closed), the fan-outs of the
+        encoded frames among them are told that the frames are not going to be sent
+        :return: number of removed messages
+        """
+        removed = 0
+        while True:
+            try:
+                data = self.tx_queue.get_nowait()
+            except queue.Empty:
+                return removed
+            removed += 1
+            if isinstance(data, EncodedFrame):
+                data.failed()
+
+    def resume_rx(self):
+        """
+        called by the protocol layer after it has taken messages out of the rx queue, the backlog is put into the queue
+        and the socket is read again (see HostServer.read_buffer)
+        :return: nothing
+        """
+        if self.rx_backlog and self.on_rx_resume is not None:
+            self.on_rx_resume()
 
     def rx_available(self):
         return self.rx_queue.qsize()
 
+    def queue_report(self) -> dict:
+        """
+        :return: dict with the report of every queue of the client (depth, dropped, conflated, rejected, ...)
+        """
+        return {'tx': self.tx_queue.report(), 'rx': self.rx_queue.report(),
+                'pl_ml_tx': self.pl_ml_tx_queue.report(), 'pl_ml_rx': self.pl_ml_rx_queue.report(),
+                'setpoints': self.setpoints.report()}
+
 
 
 
@@ -93,13 +205,11 @@ class HostServer(QObject):
     - The HostServer launches three separate threads:
         - broadcast IP
         - client rx thread
-        - client tx thread
+        - client tx thread, that sleeps until a message is put into the tx queue of any client
     """
 
     ip: str
-    max_clients: int
-    num_clients: int
-    clients: list[Client]
+    clients: ClientRegistry
 
     address: QHostAddress
     port: int
@@ -108,19 +218,20 @@ class HostServer(QObject):
 
     new_client_accepted_signal = Signal(str, int)
     finished_signal = Signal()
+    # emitted by the protocol layer to read the socket of a client again (see Client.resume_rx)
+    rx_resume_signal = Signal(object)
 
     thread = QThread()
 
-    def __init__(self):
+    def __init__(self, max_clients: int = MAX_CLIENTS):
 
         super().__init__()
 
         # select IP-Address that the Host Application is going to use
         host_ip = HostIp().selected_ip
 
-        self.max_clients = 10
-        self.num_clients = 0
-        self.clients = []
+        # connected clients, indexed by id, name and address
+        self.clients = ClientRegistry(max_clients)
 
         self.ip = host_ip
 
@@ -129,8 +240,37 @@ class HostServer(QObject):
 
         self.cops_encode_rx = True
 
-        self.port = 6666  # TODO: move to some other file -> params?
+        self.port = SERVER_PORT
         self.server = QTcpServer()
+        # the sockets are read on the main thread (like readyRead), also if the signal is emitted by a worker thread
+        self.rx_resume_signal.connect(lambda client: self.read_buffer(client))
+
+        # the tx thread blocks on this channel until a client has data to send
+        self.tx_wakeup = WakeupChannel()
+        # channels the workers of the protocol and message layer block on
+        self.pl_tx_wakeup = WakeupChannel()
+        self.pl_rx_wakeup = WakeupChannel()
+        self.ml_rx_wakeup = WakeupChannel()
+        # time between the first message put into a tx queue and the write to the socket
+        self.tx_latency = LatencyStatistics()
+        # number of writes (syscalls) and messages sent with them
+        self.tx_statistics = TxStatistics()
+        # time between the first and the last write of a message that is sent to several clients
+        self.fanout_skew = LatencyStatistics()
+        # write coalescing: all messages of a client are sent with one write up to this number of bytes
+        self.tx_max_batch_bytes = TX_MAX_BATCH_BYTES
+        # time to wait for more messages before a batch is written (0 -> write immediately)
+        self.tx_max_latency = TX_MAX_LATENCY
+        # print to console every time data is sent
+        self.tx_debug = False
+        self.tx_running = True
+        # execution of the last G-code file (M63), can be paused/ resumed/ aborted
+        self.file_execution = None
+        # experiments and sequences (M65-M72), a file is only parsed again once it has changed
+        self.file_loader = FileLoader()
+        # client -> MessageHandler of its received messages (one per connected client, see receive_message),
+        # experiments and sequences are uploaded to these clients
+        self.message_handlers: Dict[Client, MessageHandler] = {}
 
         # start Broadcasting of IP via UDP in separate thread
         broadcast_ip_thread = threading.Thread(target=BroadcastIpUDP, args=(host_ip,))
@@ -140,25 +280,93 @@ class HostServer(QObject):
         client_tx_thread = threading.Thread(target=self._tx_thread)
         client_tx_thread.start()
 
+        # sample the setpoints of the clients at a fixed rate (otherwise a setpoint is sent as soon as it changes)
+        if SETPOINT_RATE > 0:
+            setpoint_thread = threading.Thread(target=self._setpoint_thread, daemon=True)
+            setpoint_thread.start()
+
 
-    def run(self):
+    @property
+    def max_clients(self) -> int:
+        return self.clients.max_clients
+
+    @max_clients.setter
+    def max_clients(self, max_clients: int):
+        self.clients.max_clients = max_clients
+        self.server.setMaxPendingConnections(max_clients)
+
+    def _tx_thread(self):
         """
-        just the run method so that the Host Server thread can be started
+        - Routine of the tx-Thread is going to be executed
+        - sleep until a message is put into the tx queue of a client (tx_wakeup), no polling of the queues
+        - put the data from the queue of that client into the socket, flush to send data via socket
         :return: nothing
         """
-        while True:
-            pass
+        while self.tx_running:
+            client, notify_time = self.tx_wakeup.wait()
+            if client is None:
+                continue
+            try:
+                # the newest setpoints are written first, they never wait behind older messages
+                hl_tx_handling(client.tx_queue, client.socket, debug=self.tx_debug,
+                               max_batch_bytes=self.tx_max_batch_bytes, max_latency=self.tx_max_latency,
+                               statistics=self.tx_statistics, first=client.setpoints.take(), split=_ends_batch)
+            finally:
+                self.tx_wakeup.done(client)
+            self.tx_latency.add(time.perf_counter() - notify_time)
+
+    def _setpoint_thread(self):
+        """
+        - wake up the tx thread for every client whose setpoints changed, SETPOINT_RATE times per second
+        :return: nothing
+        """
+        interval = 1 / SETPOINT_RATE
+        next_sample = time.perf_counter()
+        while self.tx_running:
+            for client in self.clients.snapshot():
+                client.setpoints.sample()
+            next_sample += interval
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+
+    def tx_report(self) -> dict:
+        """
+        :return: dict with the tx counters (writes, messages, bytes, writes per message), the latency from the first
+                 message put into a tx queue until it has been written to the socket and the start skew of messages
+                 sent to several clients (count, mean, p50, p99, max)
+        """
+        report = self.tx_statistics.report()
+        report['latency'] = self.tx_latency.report()
+        report['fanout_skew'] = self.fanout_skew.report()
+        return report
 
-    def _tx_thread(self):
+    def queue_report(self) -> dict:
         """
-        - Routine of the tx-Thread is going to be executed
-        - loop through the clients and check if there are any data that is supposed to be sent
-        - check each queue and put data from there into the socket, flush to send data via socket
+        :return: dict client name -> report of the queues of the client (see Client.queue_report) and of the messages
+                 that wait for its MessageHandler ('handler')
+        """
+        reports = {}
+        for client in self.clients.snapshot():
+            report = reports[client.name] = client.queue_report()
+            handler = self.message_handlers.get(client)
+            if handler is not None:
+                report['handler'] = handler.incoming_queue.report()
+        return reports
+
+    @staticmethod
+    def rx_report() -> dict:
+        """
+        :return: dict with the received frames and the frames that have been dropped by the protocol layer (f.e. wrong
+                 crc8), see RxStatistics
+        """
+        return PL_RX_STATISTICS.report()
+
+    def stop_tx_thread(self):
+        """
+        stop the tx thread, messages that are still in the queues are not sent anymore
         :return: nothing
         """
-        while True:
-            for client in self.clients:
-                hl_tx_handling(client.tx_queue, client.socket, debug = True)
+        self.tx_running = False
+        self.tx_wakeup.close()
 
 
     def start(self):
@@ -166,13 +374,12 @@ class HostServer(QObject):
         start the Host Server:
         - listen for new connections
         - move the HostServer to a new thread where it is being executed
-        - connect the start signal of the thread to the run method of HostServer
-        - start the HostServer in the thread
+        - start the thread, it runs its event loop (QThread.exec_()) and sleeps until an event is posted to it instead
+          of spinning in a loop
         :return: nothing
         """
         self.listen()
         self.moveToThread(self.thread)
-        self.thread.started.connect(self.run)
         self.thread.start()
 
     def listen(self):
@@ -194,74 +401,145 @@ class HostServer(QObject):
         :return: nothing
         """
         # check if clients_max is already reached
-        if len(self.clients) < self.max_clients:
+        if not self.clients.is_full():
             # Next pending connection is being returned as a QTcpSocket Object
             socket = self.server.nextPendingConnection()
-            client = Client(socket)
-            # add a new client to the list
-            self.clients.append(client)
+            client = Client(socket, self.tx_wakeup, self.pl_tx_wakeup, self.pl_rx_wakeup, self.ml_rx_wakeup)
             peer_address = socket.peerAddress().toString()
             peer_port = socket.peerPort()
-
-            client.ip = peer_address
-
-            print("New connection from", peer_address, ":", peer_port, "!\n")
+            # register the client, a robot that reconnects from the same ip gets its old id
+            self.clients.add(client, peer_address, peer_port)
+            # the messages that are not handled wait for update() of a robot ui, the oldest are dropped once
+            # RX_QUEUE_SIZE messages are waiting, the continuous states are recorded as they are received
+            recorder = TelemetryRecorder(client.name) if TELEMETRY_RECORDING else None
+            self.message_handlers[client] = MessageHandler(recorder, queue_size=RX_QUEUE_SIZE)
+
+            print("New connection from", client.name, peer_address, ":", peer_port, "!\n")
             # emit new connection signal with peer address and peer port to the interface
             self.new_client_accepted_signal.emit(peer_address, peer_port)
             # quick fix: the buffering number depends on the size of the biggest message
             socket.setReadBufferSize(10000)
+            # do not delay small messages (control inputs), batching is done by the tx thread
+            socket.setSocketOption(QAbstractSocket.LowDelayOption, 1)
             # connect readyRead-Signal to read_buffer function of new client
             socket.readyRead.connect(lambda: self.read_buffer(client))
+            # the protocol layer (worker thread) asks to read the socket again once a full rx queue has space
+            client.on_rx_resume = lambda: self.rx_resume_signal.emit(client)
             # connect error-Signal to close_socket function of new client to call after connection ended
             socket.error.connect(lambda: self.close_socket(client))
             # pause accepting new clients but keep them in connection queue
-            if len(self.clients) == self.max_clients:
+            if self.clients.is_full():
                 self.server.pauseAccepting()
         else:
             # do not accept more clients than max number of clients
             pass
 
-    def send_message(self, msg, client: Union[Client, int, list, str] = None):
+    def send_message(self, msg, client: Union[Client, int, list, str] = None) -> bool:
         """
         - todo: this method is just for the use of an interface, when the message layer is defined this function hast to be modified as well!
         - send a message to selected clients
         - it is possible to select a single client, a list of clients, all at once, or a client via its name (string)
         - -> Terminal function
         :param msg: message that has to be sent
-        :param client: which client(s) are supposed to receive the message
-        :return: nothing
+        :param client: which client(s) are supposed to receive the message: client, list of clients, id (int), name
+                       (str) or None for all clients
+        :return: true if the message has been queued for every selected client (the clients it has not been queued for
+                 are printed)
         """
 
         # change command list in buffer to bytes
         # if isinstance(msg, list): #todo: implement a way to send multiple messages at once -> even needed?
         #     buffer = bytes(buffer)
 
-        buffer = pl_translate_msg_tx(msg)
+        # send to all clients
+        if client is None:
+            recipients = self.clients.snapshot()
 
         # only one client
-        if isinstance(client, Client):
-            client.send_message(buffer)
+        elif isinstance(client, Client):
+            recipients = (client,)
 
         # multiple clients in list
         elif isinstance(client, list):
-            assert ([isinstance(c, Client) for c in client])
-            for c in client:
-                c.send_message(buffer)
-
-        # client as number (eg. "1" for client_1)
-        elif isinstance(client, int):
-            if client >= len(self.clients):
-                return
-            self.clients[client].send_message(buffer)
+            assert all([isinstance(c, Client) for c in client])
+            recipients = client
 
-        # send to all clients
-        elif client is None:
-            for c in self.clients:
-                c.send_message(buffer)
+        # client as id (eg. 1 for TWIPR_1) or as a string (eg. "TWIPR_1")
+        else:
+            recipients = (self.clients.get(client),)
+            if recipients[0] is None:
+                return False
+
+        # control inputs: only the newest one of every msg id is sent
+        if isinstance(msg, Message) and msg.id in TX_CONFLATE_MSG_IDS:
+            buffer = bytes(msg_builder(msg))
+            for c in recipients:
+                c.setpoints.set(msg.id, buffer)
+            return len(recipients) > 0
+
+        if len(recipients) > 1:
+            # a client that did not get a fragment is marked as failed in the fan-out of the last one
+            failed = self.broadcast(msg, recipients).failed()
+            if failed:
+                print("message not sent to", ", ".join(str(c.name) for c in failed), "!")
+            return not failed
+
+        # the message is packed straight from its ctypes structure into a single buffer
+        if not recipients:
+            return False
+        return recipients[0].send_message(self._translate_msg(msg))
+
+    def broadcast(self, msg, clients: Iterable[Client] = None, encoded: bool = False,
+                  priority: TxPriority = None) -> FanOut:
+        """
+        - send a message to several clients at once (f.e. start an experiment on all robots)
+        - the message is translated and encoded only once, the encoded bytes are shared by the tx queues of all clients
+        - the returned FanOut tells when the message has been written for each client and the start skew
+        - a large message is sent in fragments, one FanOut per fragment
+        - a client whose tx queue is full or that has been closed is marked as failed in the FanOut (and gets none of
+          the remaining fragments), so waiting for the FanOut does not block forever
+        :param msg: message that has to be sent
+        :param clients: recipients, default: all clients
+        :param encoded: if true msg is a frame that has already been translated and encoded (compiled G-code)
+        :param priority: TxPriority of an encoded frame (see tx_priority), default: config
+        :return: FanOut of the (last fragment of the) message, wait() blocks until it has been sent to (or failed for)
+                 all clients
+        """
+        recipients = self.clients.snapshot() if clients is None else tuple(clients)
+        failed = set()
+        fragments = [msg] if encoded else pl_fragment_msg(self._translate_msg(msg), TX_FRAGMENT_SIZE)
+        for fragment in fragments:
+            # the priority is determined before the frame is encoded (compiled programs store it for their frames)
+            fanout = FanOut(fragment, recipients, self.fanout_skew, encoded,
+                            priority if encoded else tx_priority(fragment))
+            # queue the frames in a tight loop, the tx thread writes them in the order the clients have been notified
+            for c in recipients:
+                frame = fanout.frame(c)
+                if c in failed or not c.send_message(frame):
+                    failed.add(c)
+                    frame.failed()
+        return fanout
+
+    def upload(self, content: bytes, kind: int, handlers: Dict[Client, MessageHandler], fallback=None) -> dict:
+        """
+        - upload an experiment or a sequence to several clients in parallel (see upload.py), a client that has the
+          content already does not get it again, an interrupted upload is resumed
+        - blocks until all clients have the content or failed, call it from a worker thread
+        :param content: experiment_content() or sequence_content()
+        :param kind: ID_MSG_HOST_OUT_LOAD_EXPERIMENT or ID_MSG_HOST_OUT_LOAD_SEQUENCE
+        :param handlers: client -> MessageHandler of its received messages, its answers complete the futures
+        :param fallback: load message of the content, sent to a client that does not answer the upload (older firmware)
+        :return: client -> report of the upload (state, bytes sent, offset it resumed at, ...)
+        """
+        robots = {c: (lambda msg, c=c: c.send_message(self._translate_msg(msg)), handler)
+                  for c, handler in handlers.items()}
+        return upload_fleet(content, kind, robots, fallback=fallback)
 
-        # client as a string (eg. "green robot")
-        elif isinstance(client, str):
-            pass  # TODO
+    @staticmethod
+    def _translate_msg(msg):
+        if isinstance(msg, Message):
+            return msg_builder(msg)
+        return pl_translate_msg_tx(msg)
 
     def process_user_input_gcode(self, input_text, write_to_terminal=False, recipient="All"):
         """
@@ -300,37 +578,26 @@ class HostServer(QObject):
         """
 
         # check if any clients are registered
-
         if len(self.clients) > 0:
             # check if message is meant to be sent to all clients
             if recipient == "All":
-                for client_index in range(self.max_clients):
-                    if self.client_list[client_index] != 0:
-                        # todo: check if params msg and client_index got mixed up and are in wrong order
-                        if self.send_message(msg, client_index) == 1:
-                            # write sent command to terminal
-                            if write_to_terminal:
-                                self.write_sent_command_to_terminals(client_index, line_text, "Y")
-                        else:
-                            # write error message to terminals
-                            self.write_sent_command_to_terminals(client_index, line_text, "R")
-                            self.write_message_to_terminals(client_index, "Failed to sent message!", "R")
-            #
+                recipients = self.clients.snapshot()
             else:
-                for client_index in range(self.max_clients):
-                    string = "TWIPR_" + str(client_index)
-                    if recipient == string:  # todo: find better way to do comparison than using a string -> list object?
-                        if self.client_list[client_index] != 0:  # don't send if client has disconnected
-                            if self.send_message(msg, client_index) == 1:
-                                # write sent command to terminal
-                                if write_to_terminal:
-                                    self.write_sent_command_to_terminals(client_index, line_text, "Y")
-                            else:
-                                # write error message to terminals
-                                self.write_sent_command_to_terminals(client_index, line_text, "R")
-                                self.write_message_to_terminals(client_index, "Failed to sent message!", "R")
-                        else:
-                            self.popup_invalid_input_main_terminal("{} not connected!".format(recipient))
+                client = self.clients.get_by_name(recipient)
+                if client is None:
+                    self.popup_invalid_input_main_terminal("{} not connected!".format(recipient))
+                    return
+                recipients = (client,)
+
+            for client in recipients:
+                if self.send_message(msg, client):
+                    # write sent command to terminal
+                    if write_to_terminal:
+                        self.write_sent_command_to_terminals(client.id, line_text, "Y")
+                else:
+                    # write error message to terminals
+                    self.write_sent_command_to_terminals(client.id, line_text, "R")
+                    self.write_message_to_terminals(client.id, "Failed to sent message!", "R")
 
         else:
             # warning popup
@@ -351,33 +618,168 @@ class HostServer(QObject):
         for gcode in cmd_list:
             if gcode['type'] == 'M61':
                 print("internal call function called (Debug message)")
+            elif gcode['type'] == 'M63':
+                self.execute_file(os.path.join(GCODE_DIRECTORY, gcode['filename'] + '.gcode'))
+            elif gcode['type'] in _EXPERIMENT_CALLS:
+                self.execute_experiment_call(gcode['type'], gcode['filename'])
             else:
                 pass
 
+    def execute_experiment_call(self, cmd: str, filename: str) -> None:
+        """
+        M65-M68 (experiments, YAML) and M69-M72 (sequences, CSV): load (upload to the clients), start, load and start,
+        end. The file is loaded from the cache of the file loader as long as it did not change.
+        :param cmd: 'M65' - 'M72'
+        :param filename: name of the file without extension
+        :return: nothing
+        """
+        action, experiment = _EXPERIMENT_CALLS[cmd]
+        if experiment:
+            loaded = self._load(self.file_loader.load_experiment,
+                                os.path.join(EXPERIMENT_DIRECTORY, filename + '.yaml'))
+            kind, start_msg, end_msg = ID_MSG_HOST_OUT_LOAD_EXPERIMENT, MSG_HOST_OUT_START_EXPERIMENT, \
+                MSG_HOST_OUT_END_EXPERIMENT
+        else:
+            loaded = self._load(self.file_loader.load_sequence, os.path.join(SEQUENCE_DIRECTORY, filename + '.csv'))
+            kind, start_msg, end_msg = ID_MSG_HOST_OUT_LOAD_SEQUENCE, MSG_HOST_OUT_START_SEQUENCE, \
+                MSG_HOST_OUT_END_SEQUENCE
+        if loaded is None:
+            return
+        if action == 'start':
+            self.broadcast(start_msg(0, loaded.name))
+        elif action == 'end':
+            self.broadcast(end_msg(0, loaded.name))
+        else:
+            # the upload blocks until the clients answered
+            upload_thread = threading.Thread(target=self._upload_loaded,
+                                             args=(loaded, kind, start_msg if action == 'load_start' else None),
+                                             daemon=True)
+            upload_thread.start()
+
+    def _load(self, load, path: str):
+        try:
+            loaded = load(path)
+        except LoadError as error:
+            print("Could not load {}".format(error))
+            return None
+        source, elapsed = self.file_loader.last
+        print("{} ({} samples) loaded from {} in {:.2f}ms".format(path, loaded.input_length, source, elapsed * 1e3))
+        return loaded
+
+    def _upload_loaded(self, loaded, kind: int, start_msg=None):
+        handlers = {c: handler for c, handler in self.message_handlers.items() if c in self.clients}
+        if not handlers:
+            print("Connect client first!")
+            return
+        try:
+            fallback = loaded.load_message()
+        except ValueError as error:
+            print("{} cannot be sent as load message: {}".format(loaded.name, error))
+            fallback = None
+        reports = self.upload(loaded.content(), kind, handlers, fallback)
+        uploaded = []
+        for c, report in reports.items():
+            print("{} uploaded to {}: {} ({} bytes sent, {:.1f}s)".format(loaded.name, c.name, report['state'],
+                                                                            report['bytes_sent'], report['elapsed']))
+            if report['error'] is None:
+                uploaded.append(c)
+        if start_msg is not None and uploaded:
+            self.broadcast(start_msg(0, loaded.name), uploaded)
+
+    def execute_file(self, path: str, client: Union[Client, list] = None,
+                     compiled: bool = True) -> Union[FileExecution, None]:
+        """
+        execute a G-code file: the file is streamed line by line, every message is sent to the selected clients
+        :param path: path of the G-code file
+        :param client: client or list of clients, default: all clients that are connected when the execution starts
+        :param compiled: if true the compiled program of the file is executed, the file is only compiled if it is not
+                         in the cache (GCODE_CACHE_DIRECTORY) yet
+        :return: the FileExecution (pause(), resume(), abort(), progress()) or None if it could not be started
+        """
+        if not os.path.isfile(path):
+            print("G-code file {} not found!".format(path))
+            return None
+        if client is None:
+            recipients = self.clients.snapshot()
+        elif isinstance(client, list):
+            recipients = tuple(client)
+        else:
+            recipients = (client,)
+        if not recipients:
+            print("Connect client first!")
+            return None
+        if self.file_execution is not None and not self.file_execution.wait(0):
+            print("G-code file {} is still being executed!".format(self.file_execution.path))
+            return None
+
+        def print_progress(progress):
+            if progress['state'] != 'running':
+                print("G-code file {}: {} ({} lines, {} messages, {} invalid, {:.1f}s)".format(
+                    path, progress['state'], progress['lines'], progress['messages'], progress['invalid'],
+                    progress['elapsed']))
+
+        program = load_program(path, GCODE_CACHE_DIRECTORY) if compiled else None
+        self.file_execution = FileExecution(path, lambda msg: self.broadcast(msg, recipients),
+                                            lambda cmd_list: self.execute_internal_call(cmd_list, False, ''),
+                                            window=GCODE_FILE_WINDOW, progress_callback=print_progress,
+                                            program=program,
+                                            send_encoded=lambda data, priority: self.broadcast(data, recipients, True,
+                                                                                               priority))
+        self.file_execution.start()
+        return self.file_execution
+
     def close_socket(self, client: Client):
         """
         close a socket once the client has disconnected
         :param client:
         :return: nothing
         """
+        # the error signal can be emitted more than once for the same socket
+        if not self.clients.remove(client):
+            return
         # handle client connection
+        handler = self.message_handlers.pop(client, None)
+        if handler is not None and handler.recorder is not None:
+            handler.recorder.close()
+        client.closed = True
         client.socket.close()
-        print("Client socket", client.ip, "closed and removed from the list!")
-        # remove client from list
-        self.clients.remove(client)
+        # the frames that are still queued are never going to be written, a FanOut must not wait for them
+        client.fail_pending()
+        print("Client socket", client.name, client.ip, "closed and removed from the registry!")
         self.server.resumeAccepting()
 
+    def receive_message(self, client: Client, raw_message):
+        """
+        - called by the message layer for every message received from a client
+        - G-code messages complete the futures of the MessageHandler of the client (f.e. the acks of an upload), the
+          continuous states are recorded (TELEMETRY_RECORDING), the other messages are queued for
+          MessageHandler.update() (see queue_report() for the messages that have been dropped because nobody handled
+          them)
+        :param client: client the message has been received from
+        :param raw_message: raw message of the protocol layer
+        :return: nothing
+        """
+        handler = self.message_handlers.get(client)
+        if handler is not None and pl_is_gcode_frame(raw_message.frame):
+            # the frame can be a view of a buffer of the lower layers, the futures and the queue keep the message
+            handler.receive(bytes(raw_message.frame))
+
     def read_buffer(self, client: Client):
         """
         read the clients buffer, slot is connected with readyRead Signal of each client -> gets called when emitted
         :param client: buffer that is supposed to be read
         :return: nothing
         """
+        # the read_buffer must not block the Qt main thread: while the rx queue is full the received messages are kept
+        # in the backlog and the socket is not read (its read buffer fills up and TCP slows down the robot), the
+        # protocol layer calls resume_rx() once it has taken messages out of the queue
+        if client.closed or not hl_rx_backlog(client.rx_queue, client.rx_backlog):
+            return
         num = client.socket.bytesAvailable()
         # get all available bytes
         data = client.socket.read(num)
 
-        hl_rx_handling(data, client.rx_queue)
+        hl_rx_handling(data, client.rx_queue, decoder=client.frame_decoder, backlog=client.rx_backlog)
 
 
 
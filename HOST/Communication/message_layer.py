@@ -12,38 +12,47 @@ This file represents the message-layer of the application
 # ---------------------------------------------------------------------------
 # Module Imports
 # ---------------------------------------------------------------------------
-import threading
 # ---------------------------------------------------------------------------
 # Imports
 # ---------------------------------------------------------------------------
-from Communication.host_server import HostServer
+from Communication.host_server import HostServer, Client
 from layer_core_communication.ml_core_communication import ml_tx_handling, ml_rx_handling
+from layer_core_communication.layer_runtime import LayerRuntime
 
 
 class MessageLayer:
     """
     The protocol layer is the middleman between HL and ML, it translates the tx/rx queues so that data can be
     exchanged between the two other layers
+    - the rx workers sleep until the PL put a message into the queue of any client (wakeup channel of the HostServer)
+    - the received messages are passed to HostServer.receive_message, so the answers of the robots complete the
+      futures of their MessageHandler (f.e. the acks of an upload)
     """
-    def __init__(self, host_server: HostServer):
+    def __init__(self, host_server: HostServer, num_workers: int = 1):
         # variable to start protocol layer #todo
         self.pl_start = False
         self.host_server = host_server
 
-        # start ML receive thread
-        ml_rx_thread = threading.Thread(target=self._ml_rx_thread)
-        ml_rx_thread.start()
+        # start ML receive workers
+        self.ml_rx_runtime = LayerRuntime(host_server.ml_rx_wakeup, self._ml_rx_handling, num_workers, "ml_rx")
+        self.ml_rx_runtime.start()
 
-    def _ml_rx_thread(self):
+    def stop(self):
         """
-        function used by rx_thread to handle protocol layer rx
+        stop the rx workers of the message layer
+        :return: nothing
         """
-        while True:
-            for client in self.host_server.clients:
-                ml_rx_handling(client.pl_ml_rx_queue, debug = True)
-
-
-
-
+        self.ml_rx_runtime.stop()
 
+    def cpu_time(self) -> float:
+        """
+        :return: cpu time in seconds used by the message layer workers so far
+        """
+        return self.ml_rx_runtime.cpu_time()
 
+    def _ml_rx_handling(self, client: Client):
+        """
+        function used by the rx workers to handle message layer rx of a client
+        """
+        ml_rx_handling(client.pl_ml_rx_queue, debug=True,
+                       handler=lambda raw_message: self.host_server.receive_message(client, raw_message))
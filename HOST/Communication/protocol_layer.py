@@ -12,44 +12,58 @@ This file represents the protocol layer of the application
 # ---------------------------------------------------------------------------
 # Module Imports 
 # ---------------------------------------------------------------------------
-import threading
-# ---------------------------------------------------------------------------
 # Imports 
 # ---------------------------------------------------------------------------
-from Communication.host_server import HostServer
+from Communication.host_server import HostServer, Client
 from layer_core_communication.pl_core_communication import pl_tx_handling, pl_rx_handling
+from layer_core_communication.layer_runtime import LayerRuntime
 
 
 class ProtocolLayer:
     """
     The protocol layer is the middleman between HL and ML, it translates the tx/rx queues so that data can be
     exchanged between the two other layers
+    - the tx/rx workers sleep until a queue of any client has data (wakeup channels of the HostServer)
     """
-    def __init__(self, host_server: HostServer):
+    def __init__(self, host_server: HostServer, num_workers: int = 1):
         # variable to start protocol layer #todo
         self.pl_start = False
         self.host_server = host_server
 
-        # start PL transmit thread
-        pl_tx_thread = threading.Thread(target=self._pl_tx_thread)
-        pl_tx_thread.start()
+        # start PL transmit workers
+        self.pl_tx_runtime = LayerRuntime(host_server.pl_tx_wakeup, self._pl_tx_handling, num_workers, "pl_tx")
+        self.pl_tx_runtime.start()
+
+        # start PL receive workers
+        self.pl_rx_runtime = LayerRuntime(host_server.pl_rx_wakeup, self._pl_rx_handling, num_workers, "pl_rx")
+        self.pl_rx_runtime.start()
 
-        # start PL receive thread
-        pl_rx_thread = threading.Thread(target=self._pl_rx_thread)
-        pl_rx_thread.start()
+    def stop(self):
+        """
+        stop the tx/rx workers of the protocol layer
+        :return: nothing
+        """
+        self.pl_tx_runtime.stop()
+        self.pl_rx_runtime.stop()
+
+    def cpu_time(self) -> float:
+        """
+        :return: cpu time in seconds used by the protocol layer workers so far
+        """
+        return self.pl_tx_runtime.cpu_time() + self.pl_rx_runtime.cpu_time()
 
-    def _pl_tx_thread(self):
+    @staticmethod
+    def _pl_tx_handling(client: Client):
         """
-        function used by tx_thread to handle protocol layer tx
+        function used by the tx workers to handle protocol layer tx of a client
         """
-        while True:
-            for client in self.host_server.clients:
-                pl_tx_handling(client.pl_ml_tx_queue, client.tx_queue)
+        pl_tx_handling(client.pl_ml_tx_queue, client.tx_queue)
 
-    def _pl_rx_thread(self):
+    @staticmethod
+    def _pl_rx_handling(client: Client):
         """
-        function used by rx_thread to handle protocol layer rx
+        function used by the rx workers to handle protocol layer rx of a client
         """
-        while True:
-            for client in self.host_server.clients:
-                pl_rx_handling(client.rx_queue, client.pl_ml_rx_queue)
\ No newline at end of file
+        pl_rx_handling(client.rx_queue, client.pl_ml_rx_queue)
+        # the rx queue has space again, the messages that did not fit are put and the socket is read again
+        client.resume_rx()
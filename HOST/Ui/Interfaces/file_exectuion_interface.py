@@ -14,7 +14,6 @@ in the file are executed
 # Module Imports
 # QCoreApplication since there is no UI needed
 from PyQt5.QtWidgets import QWidget
-from time import sleep
 # ---------------------------------------------------------------------------
 # Imports 
 # ---------------------------------------------------------------------------
@@ -33,18 +32,27 @@ class FileExecutionInterface(BaseInterface, QWidget):
 
     def send_messages_to_host_server(self, msg, client_index):
         """
-        send each command you want to be executed as a message one by one to the host Server
+        send a single message to the host Server
         :param msg: msg to be sent
         :param client_index: index of client the message is meant for
         :return: nothing
         """
-        while True:
-            if self.client_is_connected:
-                self.send_byte_message_signal.emit(client_index, msg)
-                print("File is being executed")
-            else:
-                print("message can not be sent since no client is connected")
-            sleep(1)
+        if self.client_is_connected:
+            self.send_byte_message_signal.emit(client_index, msg)
+        else:
+            print("message can not be sent since no client is connected")
+
+    def execute_file(self, filename: str):
+        """
+        let the host Server execute a G-code file (M63), the file is streamed to the clients by the host Server
+        :param filename: name of the file in the G-code directory (without .gcode)
+        :return: nothing
+        """
+        if self.client_is_connected:
+            self.user_gcode_input_signal.emit('M63 F"{}"'.format(filename))
+            print("File is being executed")
+        else:
+            print("file can not be executed since no client is connected")
 
     def new_client_accepted(self):
         pass
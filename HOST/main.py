@@ -2,24 +2,21 @@ import sys
 import threading
 from PyQt5.QtWidgets import QApplication
 
-from Communication import host_server
 from layer_core_communication import core_messages
-from Communication.protocol_layer import ProtocolLayer
-from Communication.message_layer import MessageLayer
+from params import ASYNC_HOST_SERVER
 
 
 
 import time
 
 
-def example_host():
+def example_host(host_server):
     while 1:
-        pass
+        time.sleep(1)
         if len(host_server.host.clients) < 1:
             continue
         msg = core_messages.SetLEDMessage(1, 0)
         host_server.host.clients[0].pl_ml_tx_queue.put_nowait(msg)
-        time.sleep(1)
 
 
 def main():
@@ -34,6 +31,11 @@ def main():
     :return: Nothing
     """
 
+    # the HostServer is created when its module is imported
+    from Communication import host_server
+    from Communication.protocol_layer import ProtocolLayer
+    from Communication.message_layer import MessageLayer
+
     # pass sys.arg to allow command line arguments
     app = QApplication(sys.argv)
 
@@ -46,11 +48,37 @@ def main():
     # Message Layer
     message_layer = MessageLayer(host_server.host)
 
-    demo_thread_host = threading.Thread(target=example_host)
+    demo_thread_host = threading.Thread(target=example_host, args=(host_server,))
     demo_thread_host.start()
 
     sys.exit(app.exec())
 
 
+def main_async():
+    """
+    same as main() with the asyncio based host engine (ASYNC_HOST_SERVER): all robot connections are handled by one
+    event loop thread instead of the threads and queues of the layers, the interface is connected through the Signals
+    of the AsyncHostBridge
+    :return: Nothing
+    """
+    from Communication.async_host_server import AsyncHostServer, AsyncHostBridge
+    from Communication.broadcast_host_ip import HostIp, BroadcastIpUDP
+
+    app = QApplication(sys.argv)
+
+    host_ip = HostIp().selected_ip
+    broadcast_ip_thread = threading.Thread(target=BroadcastIpUDP, args=(host_ip,))
+    broadcast_ip_thread.start()
+
+    bridge = AsyncHostBridge()
+    server = AsyncHostServer(host_ip, bridge=bridge)
+    server.start()
+
+    sys.exit(app.exec())
+
+
 if __name__ == '__main__':
-    main()
+    if ASYNC_HOST_SERVER:
+        main_async()
+    else:
+        main()
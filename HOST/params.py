@@ -2,6 +2,65 @@ from enum import IntEnum
 
 # Communication
 SERVER_PORT = 6666
+# maximum number of robots that can be connected to the host at the same time
+MAX_CLIENTS = 10
+# maximum number of messages in the tx/ rx queues of a client, a robot that stalls cannot make the host run out of
+# memory and control inputs do not get old in a queue
+TX_QUEUE_SIZE = 256
+RX_QUEUE_SIZE = 1024
+# time in seconds a message (f.e. config) waits for space in a full tx queue before it is not sent, messages that are
+# sent from the Qt (main) thread do not wait, so a stalled robot does not freeze the UI
+TX_QUEUE_TIMEOUT = 1.0
+# samples per second of the setpoints (control inputs) of a robot, 0 -> a setpoint is sent as soon as it changes
+SETPOINT_RATE = 0
+# messages that are larger are sent in fragments of this size (bytes), a safety message waits for one fragment at most
+TX_FRAGMENT_SIZE = 1024
+# asyncio host engine (Communication.async_host_server) instead of the HostServer and the threads of the layers
+ASYNC_HOST_SERVER = False
+# bytes in the write buffer of a connection of the asyncio engine at which it stops writing (flow control), the tx
+# queue of the robot fills up in the meantime and its policies apply
+TX_WRITE_BUFFER_HIGH = 65536
+# uploads of experiments and sequences (Communication.g_code.upload): the content is sent in chunks of this size
+# (bytes), at most UPLOAD_WINDOW chunks are waiting for their acknowledgement, a robot that does not answer within
+# UPLOAD_TIMEOUT seconds is asked for its position UPLOAD_RETRIES times before the upload fails
+UPLOAD_CHUNK_SIZE = 512
+UPLOAD_WINDOW = 8
+UPLOAD_TIMEOUT = 1.0
+UPLOAD_RETRIES = 3
+# number of robots an upload is sent to at the same time
+UPLOAD_MAX_PARALLEL = MAX_CLIENTS
+# maximum number of abort rules of an experiment (one per condition of MSG_HOST_OUT_LOAD_EXPERIMENT)
+MAX_ABORT_RULES = 40
+
+# Files
+# directory of the G-code files that are executed via M63
+GCODE_DIRECTORY = 'gcode'
+# directory of the compiled G-code files (programs), a program is reused as long as its file does not change
+GCODE_CACHE_DIRECTORY = 'gcode/.cache'
+# maximum number of messages of a G-code file that are waiting to be written to the sockets
+GCODE_FILE_WINDOW = 32
+# record the continuous states (MSG_HOST_IN_CONTINIUOS) of every connected robot
+TELEMETRY_RECORDING = True
+# directory of the recorded continuous states, one subdirectory per robot
+TELEMETRY_DIRECTORY = 'recordings'
+# a new recording file is started once a file has this size (bytes) or is older than this (seconds)
+TELEMETRY_FILE_SIZE = 64 * 1024 * 1024
+TELEMETRY_FILE_SECONDS = 3600
+# directories of the experiments (YAML, M65-M68) and sequences (CSV, M69-M72)
+EXPERIMENT_DIRECTORY = 'experiments'
+SEQUENCE_DIRECTORY = 'sequences'
+# number of loaded experiments/ sequences that are kept, a file is only parsed again once it has changed
+LOADER_CACHE_SIZE = 32
+
+# Experiments and sequences
+# limits of the robots (MSG_HOST_OUT_LOAD_EXPERIMENT/ _SEQUENCE), a file that exceeds them is not loaded
+MAX_INPUT_LENGTH = 2000
+MAX_SAMPLING_FREQUENCY = 255
+MAX_EXPERIMENT_DURATION = 255
+MAX_EXPERIMENT_NAME_LENGTH = 30
+MAX_LOG_FILENAME_LENGTH = 20
+# controller state of a sequence whose file does not set it (CTRL_STATE.DIRECT)
+SEQUENCE_CTRL_STATE = 1
 
 # General
 FSM_LOOP_TIME = 20
@@ -49,6 +108,9 @@ ID_MSG_HOST_OUT_START_EXPERIMENT = 0x53
 ID_MSG_HOST_OUT_START_SEQUENCE = 0x54
 ID_MSG_HOST_OUT_END_EXPERIMENT = 0x55
 ID_MSG_HOST_OUT_END_SEQUENCE = 0x56
+ID_MSG_HOST_OUT_UPLOAD_BEGIN = 0x57
+ID_MSG_HOST_OUT_UPLOAD_CHUNK = 0x58
+ID_MSG_HOST_OUT_UPLOAD_COMMIT = 0x59
 
 ID_MSG_HOST_IN_ERROR = 0x60
 ID_MSG_HOST_IN_INFO = 0x61
@@ -73,6 +135,21 @@ ID_MSG_HOST_IN_START_EXPERIMENT = 0x74
 ID_MSG_HOST_IN_START_SEQUENCE = 0x75
 ID_MSG_HOST_IN_END_EXPERIMENT = 0x76
 ID_MSG_HOST_IN_END_SEQUENCE = 0x77
+ID_MSG_HOST_IN_UPLOAD_ACK = 0x78
+
+# received telemetry, the oldest of these messages are dropped once an rx queue is full (QueuePolicy.DROP_OLDEST), all
+# other received messages (acks, answers to config messages, errors, ...) are never dropped
+RX_DROP_MSG_IDS = frozenset({ID_MSG_HOST_IN_CONT, ID_MSG_HOST_IN_DYNAMICS, ID_MSG_HOST_IN_IMU, ID_MSG_HOST_IN_DRIVE})
+
+# control inputs (xdot/psidot, torque, heading, mocap): only the latest message of these ids is sent, they go through
+# the setpoint channel of a robot (or are conflated in a tx queue, QueuePolicy.CONFLATE)
+TX_CONFLATE_MSG_IDS = frozenset({ID_MSG_HOST_OUT_CTRL_INPUT, ID_MSG_HOST_OUT_MOCAP, ID_MSG_HOST_OUT_HEADING})
+# priorities in the tx queue (TxPriority): safety messages are sent before everything else, bulk messages (and their
+# fragments) after everything else, the control inputs are TX_CONFLATE_MSG_IDS and all other messages are config
+TX_SAFETY_MSG_IDS = frozenset({ID_MSG_HOST_OUT_FSM, ID_MSG_HOST_OUT_SV_CTRL, ID_MSG_HOST_OUT_END_EXPERIMENT,
+                               ID_MSG_HOST_OUT_END_SEQUENCE})
+TX_BULK_MSG_IDS = frozenset({ID_MSG_HOST_OUT_LOAD_EXPERIMENT, ID_MSG_HOST_OUT_LOAD_SEQUENCE,
+                             ID_MSG_HOST_OUT_UPLOAD_CHUNK})
 
 ERROR_HL_MSG_HANDLER_BLOCK = 0x08
 ERROR_LL_MSG_HANDLER_BLOCK = 0x09
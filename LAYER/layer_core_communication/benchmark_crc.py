@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the crc8: the crc8 package (one object per message, as crc_generate did before) against the table-driven
+crc8() and the batched crc8_batch(), compared to the cost of the framing (cobs encoding) of the same frames
+usage (from the LAYER directory): python -m layer_core_communication.benchmark_crc
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import crc8 as crc8_package
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.benchmark_framing import MESSAGE_SIZES, _make_payloads, _run
+from layer_core_communication.core_messages import BASE_MESSAGE_SIZE
+from layer_core_communication.crc import crc8, crc8_batch
+from layer_core_communication.hl_core_communication import cobs_encode_batch
+
+
+def _package(frames):
+    for frame in frames:
+        crc8_package.crc8(bytes(frame)).digest()
+
+
+def _table(frames):
+    for frame in frames:
+        crc8(frame)
+
+
+def bench_crc(data_size: int, batch: int) -> dict:
+    """
+    :return: dict method -> seconds per frame
+    """
+    frames = _make_payloads(data_size, batch)
+    # the views are created once, as on the rx path
+    views = [memoryview(frame) for frame in frames]
+    assert list(crc8_batch(views)) == [crc8_package.crc8(frame).digest()[0] for frame in frames]
+    return {'crc8 package': _run(_package, views) / batch,
+            'crc8': _run(_table, views) / batch,
+            'crc8_batch': _run(crc8_batch, views) / batch,
+            'cobs framing': _run(cobs_encode_batch, frames) / batch}
+
+
+def main():
+    print("{:<30} {:>6} {:<14} {:>12} {:>10}".format("message", "batch", "method", "us/frame", "MB/s"))
+    for name, data_size in MESSAGE_SIZES.items():
+        frame_size = BASE_MESSAGE_SIZE + data_size
+        for batch in (1, 16, max(1, 65536 // frame_size)):
+            for method, seconds in bench_crc(data_size, batch).items():
+                print("{:<30} {:>6} {:<14} {:>12.2f} {:>10.2f}".format(name, batch, method, seconds * 1e6,
+                                                                       frame_size / seconds / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+send one message to many clients (socket pairs) through the tx queues and a tx thread like the one of the Host Server:
+once by putting the translated message into every queue (encoded per client) and once as a FanOut (encoded once)
+reports the time to queue the message and the start skew (time between the first and the last write)
+usage (from the LAYER directory): python -m layer_core_communication.benchmark_fanout [num_clients]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import socket
+import sys
+import threading
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.core_messages import DebugMessage
+from layer_core_communication.fanout import FanOut
+from layer_core_communication.hl_core_communication import hl_tx_handling
+from layer_core_communication.pl_core_communication import pl_translate_msg_tx
+from layer_core_communication.statistics import LatencyStatistics
+from layer_core_communication.wakeup import WakeupChannel, WakeupQueue
+
+
+class _FakeClient:
+    def __init__(self, channel: WakeupChannel):
+        self.socket, self.peer = socket.socketpair()
+        self.peer.setblocking(False)
+        self.tx_queue = WakeupQueue(channel=channel, key=self)
+
+    def drain(self):
+        try:
+            while self.peer.recv(65536):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def _tx_thread(channel: WakeupChannel, write_times: dict):
+    while True:
+        client, _ = channel.wait()
+        if client is None:
+            return
+        try:
+            hl_tx_handling(client.tx_queue, client.socket)
+            write_times[client] = time.perf_counter()
+        finally:
+            channel.done(client)
+
+
+def bench_fanout(num_clients: int = 30, repetitions: int = 200) -> dict:
+    """
+    :return: dict with a report of the queue time and the start skew (seconds) for both methods
+    """
+    channel = WakeupChannel()
+    clients = [_FakeClient(channel) for _ in range(num_clients)]
+    write_times = {}
+    thread = threading.Thread(target=_tx_thread, args=(channel, write_times))
+    thread.start()
+    msg = DebugMessage(1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+
+    results = {}
+    for method in ('per_client', 'fanout'):
+        queue_time = LatencyStatistics()
+        skew = LatencyStatistics()
+        for _ in range(repetitions):
+            write_times.clear()
+            start = time.perf_counter()
+            if method == 'per_client':
+                for client in clients:
+                    client.tx_queue.put_nowait(pl_translate_msg_tx(msg))
+            else:
+                fanout = FanOut(pl_translate_msg_tx(msg), clients)
+                for client in clients:
+                    client.tx_queue.put_nowait(fanout.frame(client))
+            queue_time.add(time.perf_counter() - start)
+            while len(write_times) < num_clients:
+                time.sleep(0.0001)
+            skew.add(max(write_times.values()) - min(write_times.values()))
+            for client in clients:
+                client.drain()
+        results[method] = {'queue': queue_time.report(), 'skew': skew.report()}
+
+    channel.close()
+    thread.join()
+    for client in clients:
+        client.socket.close()
+        client.peer.close()
+    return results
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    for name, result in bench_fanout(number).items():
+        print("{:<11} clients={} queue mean={:.1f}us skew mean={:.1f}us p99={:.1f}us max={:.1f}us".format(
+            name, number, result['queue']['mean'] * 1e6, result['skew']['mean'] * 1e6, result['skew']['p99'] * 1e6,
+            result['skew']['max'] * 1e6))
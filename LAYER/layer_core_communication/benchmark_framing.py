@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the framing (cobs encoding/ decoding) of the hardware layer: the old path (one cobs call and one copy
+per message, list conversion on rx) against the batch path (one contiguous buffer) and the streaming decoder
+usage (from the LAYER directory): python -m layer_core_communication.benchmark_framing
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import os
+import time
+import cobs.cobs as cobs
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.core_messages import BASE_MESSAGE_SIZE
+from layer_core_communication.hl_core_communication import cobs_encode_tx, cobs_encode_batch, cobs_decode_batch, \
+    FrameDecoder
+
+# size of the data field of the messages that are benchmarked
+MESSAGE_SIZES = {
+    'DebugMessage': 10,
+    'MSG_HOST_OUT_CTRL_INPUT': 20,
+    'MSG_HOST_IN_CONTINIUOS': 90,
+    'MSG_HOST_OUT_LOAD_SEQUENCE': 16037,
+    'MSG_HOST_OUT_LOAD_EXPERIMENT': 16268,
+}
+
+
+def _make_payloads(data_size: int, num: int) -> list:
+    # header 0xAA followed by random bytes with some zeros (floats that are 0.0)
+    data = bytearray(os.urandom(BASE_MESSAGE_SIZE - 1 + data_size))
+    data[::7] = bytes(len(data[::7]))
+    return [b'\xaa' + bytes(data)] * num
+
+
+def _old_encode(payloads):
+    return [cobs_encode_tx(payload) for payload in payloads]
+
+
+def _old_decode(stream):
+    # chop into a list of ints, split at 0x00 and decode every frame separately (former hw_layer_process_data_rx)
+    data_list = list(stream)
+    frames = []
+    start = 0
+    for x in range(len(data_list)):
+        if data_list[x] == 0:
+            frames.append(list(cobs.decode(bytes(data_list[start:x]))))
+            start = x + 1
+    return frames
+
+
+def _run(function, argument, min_time: float = 0.5) -> float:
+    """
+    :return: seconds per call
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function(argument)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def bench_encode(data_size: int, batch: int) -> dict:
+    payloads = _make_payloads(data_size, batch)
+    return {'old': _run(_old_encode, payloads),
+            'batch': _run(cobs_encode_batch, payloads)}
+
+
+def bench_decode(data_size: int, batch: int) -> dict:
+    stream = cobs_encode_batch(_make_payloads(data_size, batch))
+    decoder = FrameDecoder()
+    return {'old': _run(_old_decode, stream),
+            'batch': _run(cobs_decode_batch, stream),
+            'decoder': _run(decoder.feed, stream)}
+
+
+def main():
+    print("{:<30} {:<7} {:<8} {:>14} {:>14}".format("message", "path", "method", "frames/s", "MB/s"))
+    for name, data_size in MESSAGE_SIZES.items():
+        frame_size = BASE_MESSAGE_SIZE + data_size
+        batch = max(1, 65536 // frame_size)
+        for path, results in (('tx', bench_encode(data_size, batch)), ('rx', bench_decode(data_size, batch))):
+            for method, seconds in results.items():
+                frames_per_second = batch / seconds
+                print("{:<30} {:<7} {:<8} {:>14.0f} {:>14.2f}".format(name, path, method, frames_per_second,
+                                                                      frames_per_second * frame_size / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+measure the cpu time of the LayerRuntime workers for idle clients and the time a message needs from being put into a
+queue until a worker handled it
+usage (from the LAYER directory): python -m layer_core_communication.benchmark_layer_runtime
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.wakeup import WakeupChannel, WakeupQueue
+from layer_core_communication.layer_runtime import LayerRuntime
+from layer_core_communication.statistics import LatencyStatistics
+
+
+class _FakeClient:
+    def __init__(self, channel: WakeupChannel):
+        self.rx_queue = WakeupQueue(channel=channel, key=self)
+
+
+def bench_idle_cpu(num_clients: int = 10, num_workers: int = 2, duration: float = 2.0) -> float:
+    """
+    :return: cpu time in seconds per second and client while no client has any data
+    """
+    channel = WakeupChannel()
+    clients = [_FakeClient(channel) for _ in range(num_clients)]
+
+    def handler(client):
+        while client.rx_queue.qsize() > 0:
+            client.rx_queue.get_nowait()
+
+    runtime = LayerRuntime(channel, handler, num_workers, "bench")
+    runtime.start()
+    cpu_start = time.process_time()
+    time.sleep(duration)
+    cpu = time.process_time() - cpu_start
+    runtime.stop()
+    return cpu / duration / len(clients)
+
+
+def bench_latency(num_clients: int = 10, num_workers: int = 2, num_messages: int = 10000) -> dict:
+    """
+    :return: latency report (seconds) from put() until the message has been taken out of the queue by a worker
+    """
+    channel = WakeupChannel()
+    clients = [_FakeClient(channel) for _ in range(num_clients)]
+    statistics = LatencyStatistics()
+
+    def handler(client):
+        while client.rx_queue.qsize() > 0:
+            statistics.add(time.perf_counter() - client.rx_queue.get_nowait())
+
+    runtime = LayerRuntime(channel, handler, num_workers, "bench")
+    runtime.start()
+    for index in range(num_messages):
+        clients[index % num_clients].rx_queue.put_nowait(time.perf_counter())
+        if index % 100 == 0:
+            time.sleep(0.001)
+    while statistics.count < num_messages:
+        time.sleep(0.01)
+    runtime.stop()
+    return statistics.report()
+
+
+if __name__ == '__main__':
+    print("idle cpu per client: {:.6f} s/s".format(bench_idle_cpu()))
+    report = bench_latency()
+    print("put -> handled latency: mean={:.1f}us p99={:.1f}us max={:.1f}us".format(report['mean'] * 1e6,
+                                                                                   report['p99'] * 1e6,
+                                                                                   report['max'] * 1e6))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+benchmark of the message objects: memory per queued message and construction time of the former _RawMessage (list of
+ints, one attribute per header field, data copied) and BaseMessage (__dict__ per message with a memoryview) against the
+compact versions (__slots__, header fields read from the frame when they are accessed)
+usage (from the LAYER directory): python -m layer_core_communication.benchmark_messages [num_messages]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import sys
+import tracemalloc
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.benchmark_framing import MESSAGE_SIZES, _make_payloads, _run
+from layer_core_communication.core_messages import DebugMessage
+from layer_core_communication.pl_core_communication import MsgProtocol, _RawMessage
+
+
+class _OldRawMessage:
+    # former _RawMessage: the frame arrived as a list of ints, every header field and the data field were copied
+    def __init__(self, byte_list: list):
+        self.header = byte_list[MsgProtocol.HEADER_POS]
+        self.src = byte_list[MsgProtocol.SRC_POS]
+        self.add0 = byte_list[MsgProtocol.ADD_0_POS]
+        self.add1 = byte_list[MsgProtocol.ADD_1_POS]
+        self.cmd = byte_list[MsgProtocol.CMD_POS]
+        self.msg = byte_list[MsgProtocol.MSG_POS]
+        self.len = byte_list[MsgProtocol.LEN_POS]
+        self.crc8 = byte_list[MsgProtocol.CRC8_POS]
+        self.data = byte_list[MsgProtocol.DATA_START_POS:len(byte_list)]
+
+
+class _OldDebugMessage:
+    # former BaseMessage: __dict__ per message, the view of the data field was created in __init__
+    def __init__(self, *values):
+        self.data_struct = DebugMessage.DatafieldStructure(*values)
+        self.data = memoryview(self.data_struct).cast('B')
+
+
+def _old_raw(frames):
+    # the old rx path converted every frame into a list before the message was created
+    return [_OldRawMessage(list(frame)) for frame in frames]
+
+
+def _new_raw(frames):
+    return [_RawMessage(frame) for frame in frames]
+
+
+def _old_debug(values):
+    return [_OldDebugMessage(*value) for value in values]
+
+
+def _new_debug(values):
+    return [DebugMessage(*value) for value in values]
+
+
+def _memory(function, argument) -> float:
+    """
+    :return: bytes that stay allocated per message while all messages are queued (the frames are not counted)
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    messages = function(argument)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(messages)
+
+
+def bench_messages(num: int) -> list:
+    """
+    :return: list of (message, version, bytes per queued message, seconds per message)
+    """
+    results = []
+    for name, data_size in MESSAGE_SIZES.items():
+        frames = _make_payloads(data_size, num)
+        for version, function in (('old', _old_raw), ('new', _new_raw)):
+            results.append(("_RawMessage " + name, version, _memory(function, frames), _run(function, frames) / num))
+    values = [tuple((index + value) % 256 for value in range(10)) for index in range(num)]
+    for version, function in (('old', _old_debug), ('new', _new_debug)):
+        results.append(('DebugMessage', version, _memory(function, values), _run(function, values) / num))
+    return results
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print("{:<45} {:<6} {:>14} {:>12}".format("message", "", "bytes/message", "us/message"))
+    for message, version, memory, seconds in bench_messages(number):
+        print("{:<45} {:<6} {:>14.0f} {:>12.3f}".format(message, version, memory, seconds * 1e6))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+latency of safety messages during an experiment upload: large messages (16 kB, like MSG_HOST_OUT_LOAD_EXPERIMENT) are
+sent over a slow link without pause while a safety message is sent every 20ms, the time from putting a safety message
+into the tx queue until it is taken out of the queue and until the recipient decoded it is compared for a FIFO tx
+queue and a tx queue with priorities whose large messages are sent in fragments
+usage (from the LAYER directory): python -m layer_core_communication.benchmark_priority [duration] [link_rate]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.crc import crc8
+from layer_core_communication.hl_core_communication import FrameDecoder, hl_tx_handling
+from layer_core_communication.pl_core_communication import MsgProtocol, PL_FRAGMENT_SIZE, pl_fragment_msg, \
+    pl_is_fragment, _HEADER_STRUCT
+from layer_core_communication.statistics import LatencyStatistics
+from layer_core_communication.wakeup import TxPriority, WakeupChannel, WakeupQueue
+
+# add1 of the messages of the benchmark
+_SAFETY = 1
+_BULK = 2
+_BULK_SIZE = 16268
+_TIMESTAMP = struct.Struct('<d')
+
+
+def _frame(add1: int, data: bytes) -> bytes:
+    header = _HEADER_STRUCT.pack(0xAA, 0, 1, add1, 0, 0, len(data) & 0xFF, crc8(data))
+    return header + data
+
+
+def _priority(frame) -> TxPriority:
+    if pl_is_fragment(frame) or frame[MsgProtocol.ADD_1_POS] == _BULK:
+        return TxPriority.BULK
+    return TxPriority.SAFETY
+
+
+def _add_safety(frame, latency: LatencyStatistics):
+    # the safety messages carry the time they have been queued
+    if not pl_is_fragment(frame) and frame[MsgProtocol.ADD_1_POS] == _SAFETY:
+        latency.add(time.perf_counter() - _TIMESTAMP.unpack_from(frame, MsgProtocol.DATA_START_POS)[0])
+
+
+def _receiver(sock: socket.socket, link_rate: float, latency: LatencyStatistics):
+    # reads as fast as the link (bytes per second)
+    decoder = FrameDecoder()
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            return
+        for frame in decoder.feed(data):
+            _add_safety(frame, latency)
+        time.sleep(len(data) / link_rate)
+
+
+def bench_upload(priorities: bool, duration: float, link_rate: float) -> dict:
+    """
+    :param priorities: true -> tx queue with priorities and fragments, false -> FIFO
+    :param duration: time in seconds
+    :param link_rate: bytes per second of the link
+    :return: dict with the latency reports (seconds) of the safety messages until they have been taken out of the tx
+             queue ('queue') and until they have been received ('received')
+    """
+    host, robot = socket.socketpair()
+    # small buffers, the link is the bottleneck and not the buffers of the sockets
+    host.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    robot.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    channel = WakeupChannel()
+    tx_queue = WakeupQueue(64, channel, 'robot', priority=_priority if priorities else None)
+    latency = LatencyStatistics()
+    queue_latency = LatencyStatistics()
+    receiver = threading.Thread(target=_receiver, args=(robot, link_rate, latency))
+    receiver.start()
+    running = [True]
+
+    def taken(frame) -> bool:
+        _add_safety(frame, queue_latency)
+        return priorities and _priority(frame) is TxPriority.BULK
+
+    def tx_thread():
+        while running[0]:
+            key, _ = channel.wait(0.1)
+            if key is None:
+                continue
+            hl_tx_handling(tx_queue, host, split=taken)
+            channel.done(key)
+
+    def upload():
+        bulk = _frame(_BULK, os.urandom(_BULK_SIZE))
+        while running[0]:
+            for fragment in pl_fragment_msg(bulk, PL_FRAGMENT_SIZE) if priorities else (bulk,):
+                tx_queue.put(fragment)
+
+    threads = [threading.Thread(target=tx_thread), threading.Thread(target=upload, daemon=True)]
+    for thread in threads:
+        thread.start()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        tx_queue.put(_frame(_SAFETY, _TIMESTAMP.pack(time.perf_counter())))
+        time.sleep(0.02)
+    running[0] = False
+    threads[0].join()
+    host.close()
+    receiver.join()
+    robot.close()
+    return {'queue': queue_latency.report(), 'received': latency.report()}
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1e6
+    print("link: {:.0f} kB/s, upload of {} byte messages".format(rate / 1000, _BULK_SIZE))
+    for name, with_priorities in (('fifo', False), ('priority', True)):
+        reports = bench_upload(with_priorities, seconds, rate)
+        for step, report in reports.items():
+            print("{:<10}{:<10} safety messages={:>4} latency p50={:8.1f}ms p99={:8.1f}ms max={:8.1f}ms".format(
+                name, step, report['count'], report['p50'] * 1000, report['p99'] * 1000, report['max'] * 1000))
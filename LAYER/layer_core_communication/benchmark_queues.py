@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+overload of a tx queue: control inputs and telemetry are put faster than a stalled robot takes them out of the queue,
+the age of the control inputs when they are taken out and the depth of the queue are compared for an unbounded queue
+and a bounded queue with policies (control inputs conflated, telemetry drops the oldest)
+usage (from the LAYER directory): python -m layer_core_communication.benchmark_queues [duration]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import sys
+import threading
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.wakeup import WakeupQueue, QueuePolicy
+from layer_core_communication.statistics import LatencyStatistics
+
+_CONTROL = 'control'
+_TELEMETRY = 'telemetry'
+
+
+def _classify(item) -> tuple:
+    if item[0] == _CONTROL:
+        return QueuePolicy.CONFLATE, _CONTROL
+    return QueuePolicy.DROP_OLDEST, None
+
+
+def bench_overload(tx_queue: WakeupQueue, duration: float, put_interval: float = 0.0005,
+                   telemetry_per_control: int = 4, get_interval: float = 0.002) -> dict:
+    """
+    :param tx_queue: queue that is benchmarked
+    :param duration: time in seconds the producer puts messages
+    :param put_interval: time between two control inputs
+    :param telemetry_per_control: telemetry messages put with every control input
+    :param get_interval: time the consumer needs per message (stalled robot)
+    :return: dict with the age report of the control inputs (seconds) and the report of the queue
+    """
+    age = LatencyStatistics()
+    running = threading.Event()
+    running.set()
+
+    def consumer():
+        while running.is_set() or tx_queue.qsize() > 0:
+            try:
+                kind, created = tx_queue.get(timeout=0.1)
+            except Exception:
+                continue
+            if kind == _CONTROL:
+                age.add(time.perf_counter() - created)
+            time.sleep(get_interval)
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        tx_queue.put((_CONTROL, time.perf_counter()))
+        for _ in range(telemetry_per_control):
+            tx_queue.put((_TELEMETRY, time.perf_counter()))
+        time.sleep(put_interval)
+    running.clear()
+    # the messages that are still queued when the producer stopped are not of interest
+    with tx_queue.mutex:
+        tx_queue.queue.clear()
+    thread.join()
+    return {'age': age.report(), 'queue': tx_queue.report()}
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    results = [('unbounded', bench_overload(WakeupQueue(), seconds)),
+               ('bounded 64', bench_overload(WakeupQueue(64, classify=_classify), seconds))]
+    print("{:<12}{:>10}{:>12}{:>12}{:>12}{:>12}{:>12}".format('queue', 'inputs', 'age p50[ms]', 'age max[ms]',
+                                                            'max depth', 'dropped', 'conflated'))
+    for name, result in results:
+        print("{:<12}{:>10}{:>12.1f}{:>12.1f}{:>12}{:>12}{:>12}".format(
+            name, result['age']['count'], result['age']['p50'] * 1000, result['age']['max'] * 1000,
+            result['queue']['max_depth'], result['queue']['dropped'], result['queue']['conflated']))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+control inputs that are sent faster than the link drains: the age of a command when it is written is compared for a
+tx queue that keeps every command and for the SetpointChannel (on change and at a fixed rate)
+usage (from the LAYER directory): python -m layer_core_communication.benchmark_setpoint [duration]
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import queue
+import sys
+import threading
+import time
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.setpoint import SetpointChannel
+from layer_core_communication.statistics import LatencyStatistics
+from layer_core_communication.wakeup import WakeupChannel
+
+# msg ids of the control inputs that are set (MSG_HOST_OUT_CTRL_INPUT, MSG_HOST_OUT_HEADING)
+_KEYS = (0x44, 0x4C)
+
+
+def _produce(put, duration: float, interval: float):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        for key in _KEYS:
+            put(key, time.perf_counter())
+        time.sleep(interval)
+
+
+def bench_queue(duration: float, interval: float, write_time: float) -> dict:
+    """
+    :return: dict with the age report of the commands (seconds) and the number of written commands
+    """
+    tx_queue = queue.Queue()
+    age = LatencyStatistics()
+    producer = threading.Thread(target=_produce, args=(lambda key, created: tx_queue.put(created), duration,
+                                                       interval))
+    producer.start()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        try:
+            created = tx_queue.get(timeout=0.01)
+        except queue.Empty:
+            continue
+        age.add(time.perf_counter() - created)
+        time.sleep(write_time)
+    producer.join()
+    return {'age': age.report(), 'sent': age.count, 'superseded': 0}
+
+
+def bench_setpoint(duration: float, interval: float, write_time: float, rate: float = 0.0) -> dict:
+    """
+    :return: report of the SetpointChannel, the age is the time from set() until the command has been taken
+    """
+    channel = WakeupChannel()
+    setpoints = SetpointChannel(channel, 'client', rate)
+    producer = threading.Thread(target=_produce, args=(setpoints.set, duration, interval))
+    producer.start()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        if rate > 0:
+            setpoints.sample()
+        key, _ = channel.wait(0.001 if rate > 0 else 0.01)
+        if key is None:
+            continue
+        if setpoints.take():
+            time.sleep(write_time)
+        channel.done(key)
+    producer.join()
+    return setpoints.report()
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    # two commands every 0.5ms, every write of the link takes 2ms
+    arguments = (seconds, 0.0005, 0.002)
+    results = [('queue', bench_queue(*arguments)),
+               ('on change', bench_setpoint(*arguments)),
+               ('100 Hz', bench_setpoint(*arguments, rate=100))]
+    print("{:<12}{:>10}{:>12}{:>14}{:>14}".format('', 'sent', 'superseded', 'age p50 [ms]', 'age max [ms]'))
+    for name, result in results:
+        print("{:<12}{:>10}{:>12}{:>14.2f}{:>14.2f}".format(name, result['sent'], result['superseded'],
+                                                            result['age']['p50'] * 1000, result['age']['max'] * 1000))
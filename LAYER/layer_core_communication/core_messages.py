@@ -37,7 +37,11 @@ BASE_MESSAGE_SIZE = 8
 class BaseMessage:
     """
         Base Class for every Message
+        - the header fields are class attributes, an instance only holds the ctypes structure of its data field
+          (__slots__, no __dict__ per message)
     """
+    __slots__ = ('data_struct',)
+
     # header byte
     header: int = 0xAA
     # ID of the source
@@ -54,8 +58,15 @@ class BaseMessage:
     len: int = 0    #todo
     # crc8 checksum of the data field
     crc8: int = 0 # todo
-    # bytes of the data field
-    data: bytearray(0)
+    # ctypes structure of the data field (DatafieldStructure of the message)
+    data_struct: Structure
+
+    @property
+    def data(self) -> memoryview:
+        """
+        :return: bytes of the data field (view on data_struct, no copy)
+        """
+        return memoryview(self.data_struct).cast('B')
 
 # -------------------------------------------------------Write messages-------------------------------------------------
 
@@ -65,6 +76,8 @@ class WriteMessage(BaseMessage):
     Base Class for every Write Message
     """
 
+    __slots__ = ()
+
     # ID for write-messages
     add0 = _WRITE_MSG_ID
 
@@ -80,6 +93,8 @@ class SetLEDMessage(WriteMessage):
     0		|uint8	|led_num	| Id of the led (1 or 2)
     1		|int8	|state		| 0: off, 1: on, -1: toggle
     """
+    __slots__ = ()
+
     add1 = _SET_LED_ID
 
     class DatafieldStructure(Structure):
@@ -89,7 +104,6 @@ class SetLEDMessage(WriteMessage):
     def __init__(self, led_id: c_uint8, led_state: c_int8):
         super().__init__()
         self.data_struct = self.DatafieldStructure(led_id, led_state)
-        self.data = bytes(self.data_struct)
 
 
 class SetMotorMessage(WriteMessage):
@@ -102,6 +116,8 @@ class SetMotorMessage(WriteMessage):
     5		|bool	|dir_right	| Direction of right motor (0 forward, 1 backwards)
     6-9		|float	|speed_left	|
     """
+    __slots__ = ()
+
     add1 = _SET_MOTOR_ID
 
     class DatafieldStructure(Structure):
@@ -111,7 +127,6 @@ class SetMotorMessage(WriteMessage):
     def __init__(self, dir_left: c_bool, speed_left: c_float, dir_right: c_int8, speed_right: c_float ):
         super().__init__()
         self.data_struct = self.DatafieldStructure(dir_left, speed_left, dir_right, speed_right)
-        self.data = bytes(self.data_struct)
 
 
 class DebugMessage(WriteMessage):
@@ -130,6 +145,8 @@ class DebugMessage(WriteMessage):
     8		|uint8	|val9		|
     9		|uint8	|val10		|
     """
+    __slots__ = ()
+
     add1 = _DEBUG_MESSAGE_ID
 
     class DatafieldStructure(Structure):
@@ -141,6 +158,5 @@ class DebugMessage(WriteMessage):
                  val7: c_uint8,val8: c_uint8,val9: c_uint8, val10: c_uint8 ):
         super().__init__()
         self.data_struct = self.DatafieldStructure(val1, val2, val3, val4, val5, val6, val7, val8, val9, val10)
-        self.data = bytes(self.data_struct)
 
 
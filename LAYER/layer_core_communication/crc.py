@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+this module contains the crc8 checksum of the messages (polynomial 0x07, initial value 0, the same as the crc8 package)
+- crc8() works on any buffer (bytes, bytearray, memoryview) without copying it and without creating any objects
+- crc8_batch() computes the checksums of many frames at once with numpy
+numpy is imported on the first use and is optional: without it crc8() loops over the bytes of long buffers as well and
+batch_available() is false (the robot does not need numpy)
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+from typing import Sequence
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+
+CRC8_POLYNOMIAL = 0x07
+
+
+def _make_table(polynomial: int) -> bytes:
+    table = bytearray(256)
+    for index in range(256):
+        crc = index
+        for _ in range(8):
+            crc = ((crc << 1) ^ polynomial) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[index] = crc
+    return bytes(table)
+
+
+# crc of one byte
+CRC8_TABLE = _make_table(CRC8_POLYNOMIAL)
+# indexing a list is faster than indexing bytes
+_CRC8_TABLE_LIST = list(CRC8_TABLE)
+
+# long buffers are split into chunks of this size, the crcs of the chunks are computed with numpy and then combined
+_CHUNK_SIZE = 64
+# from this length on crc8() uses the chunks, below the loop over the bytes is faster
+_CHUNK_MIN_LENGTH = 512
+# frames longer than this are not part of the matrix of crc8_batch (the positional table would not fit into the cache)
+_BATCH_MAX_LENGTH = 1024
+
+# set by _load_numpy()
+np = None
+_numpy_missing = False
+_CRC8_TABLE_NP = None
+_positional_table = None
+_CHUNK_TABLE = None
+_CHUNK_DISTANCE = None
+# crc of the chunks so far, shifted by one chunk
+_CHUNK_SHIFT = None
+
+
+def _load_numpy() -> bool:
+    # import numpy and build the tables on the first call, false if numpy is not installed
+    global np, _numpy_missing, _CRC8_TABLE_NP, _positional_table, _CHUNK_TABLE, _CHUNK_DISTANCE, _CHUNK_SHIFT
+    if np is not None or _numpy_missing:
+        return np is not None
+    try:
+        import numpy
+    except ImportError:
+        _numpy_missing = True
+        return False
+    _CRC8_TABLE_NP = numpy.frombuffer(CRC8_TABLE, dtype=numpy.uint8)
+    _positional_table = _CRC8_TABLE_NP[numpy.newaxis, :].copy()
+    np = numpy
+    _grow_positional_table(_CHUNK_SIZE)
+    _CHUNK_TABLE = _positional_table[:_CHUNK_SIZE].copy()
+    _CHUNK_DISTANCE = numpy.arange(_CHUNK_SIZE - 1, -1, -1)
+    _CHUNK_SHIFT = _CHUNK_TABLE[_CHUNK_SIZE - 1].tolist()
+    return True
+
+
+def batch_available() -> bool:
+    """
+    :return: true if numpy is installed and crc8_batch() can be used
+    """
+    return _load_numpy()
+
+
+def _grow_positional_table(length: int):
+    # row k: crc of a byte followed by k zero bytes, the crc of a frame is the xor of the rows of its bytes (the crc is
+    # linear), k being the distance of the byte to the end of the frame
+    global _positional_table
+    rows = len(_positional_table)
+    if length <= rows:
+        return
+    table = np.empty((max(length, 2 * rows), 256), dtype=np.uint8)
+    table[:rows] = _positional_table
+    for row in range(rows, len(table)):
+        table[row] = _CRC8_TABLE_NP[table[row - 1]]
+    _positional_table = table
+
+
+def crc8(data, crc: int = 0) -> int:
+    """
+    :param data: bytes, bytearray or memoryview (not copied)
+    :param crc: crc of the preceding data (to continue a checksum)
+    :return: crc8 of the data
+    """
+    if not isinstance(data, (bytes, bytearray)):
+        data = memoryview(data).cast('B')
+    if len(data) >= _CHUNK_MIN_LENGTH and _load_numpy():
+        return _crc8_chunks(data, crc)
+    table = _CRC8_TABLE_LIST
+    for byte in data:
+        crc = table[crc ^ byte]
+    return crc
+
+
+def _crc8_chunks(data, crc: int) -> int:
+    array = np.frombuffer(data, dtype=np.uint8)
+    chunks = -(-len(array) // _CHUNK_SIZE)
+    # leading zeros do not change the crc, the crc so far is xor-ed into the first byte of the data
+    padded = np.zeros(chunks * _CHUNK_SIZE, dtype=np.uint8)
+    first = len(padded) - len(array)
+    padded[first:] = array
+    padded[first] ^= crc
+    chunk_crcs = np.bitwise_xor.reduce(_CHUNK_TABLE[_CHUNK_DISTANCE, padded.reshape(chunks, _CHUNK_SIZE)], axis=1)
+    shift = _CHUNK_SHIFT
+    crc = 0
+    for chunk_crc in chunk_crcs.tolist():
+        crc = shift[crc] ^ chunk_crc
+    return crc
+
+
+def crc8_batch(frames: Sequence):
+    """
+    compute the crc8 of many frames at once: the crc of every byte is looked up depending on its distance to the end of
+    its frame and the results are xor-ed per frame, all with numpy operations over the bytes of all frames
+    :param frames: list of frames (bytes, bytearray, memoryview)
+    :return: numpy array (uint8) with the crc8 of every frame, raises ImportError if numpy is not installed
+    """
+    if not _load_numpy():
+        raise ImportError("crc8_batch() requires numpy")
+    lengths = np.fromiter((len(frame) for frame in frames), dtype=np.int64, count=len(frames))
+    crc = np.zeros(len(frames), dtype=np.uint8)
+    long_frames = lengths > _BATCH_MAX_LENGTH
+    for index in np.flatnonzero(long_frames).tolist():
+        crc[index] = crc8(frames[index])
+    if long_frames.any():
+        frames = [frame for frame, is_long in zip(frames, long_frames.tolist()) if not is_long]
+        short = ~long_frames
+        crc[short] = crc8_batch(frames)
+        return crc
+    if not lengths.any():
+        return crc
+    data = np.frombuffer(b''.join(frames), dtype=np.uint8)
+    ends = np.cumsum(lengths)
+    _grow_positional_table(int(lengths.max()))
+    distance = np.repeat(ends - 1, lengths) - np.arange(len(data))
+    contributions = _positional_table[distance, data]
+    # reduceat does not handle empty frames, their crc stays 0
+    not_empty = lengths > 0
+    crc[not_empty] = np.bitwise_xor.reduceat(contributions, (ends - lengths)[not_empty])
+    return crc
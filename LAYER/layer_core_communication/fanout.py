@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+this module contains the fan-out of a message to many clients (f.e. start an experiment on all robots at once): the
+message is encoded once, the encoded bytes are shared by the tx queues of all recipients and the time each recipient
+got the message written to its socket is recorded
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import threading
+from time import perf_counter
+from typing import Dict, Hashable, Iterable, Set
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.hl_core_communication import EncodedFrame, encode_frame
+from layer_core_communication.statistics import LatencyStatistics
+from layer_core_communication.wakeup import TxPriority
+
+
+class FanOut:
+    """
+    - one message that is sent to several recipients
+    - frame(recipient) returns the EncodedFrame that is put into the tx queue of the recipient
+    - once the frame has been written for every recipient, wait() returns and the start skew (time between the first
+      and the last write) is added to the statistics
+    - a recipient whose frame is never going to be written (tx queue full, client closed) is marked with fail(), the
+      fan-out completes with the other recipients, so nobody waits for it forever
+    """
+
+    def __init__(self, payload, recipients: Iterable[Hashable], skew_statistics: LatencyStatistics = None,
+                 encoded: bool = False, priority: TxPriority = None):
+        """
+        :param payload: translated (not encoded) message
+        :param recipients: keys of the recipients (f.e. the clients)
+        :param skew_statistics: if given, the start skew is added once the message has been sent to all recipients
+        :param encoded: if true the payload has already been encoded (see encode_frame), f.e. a frame of a compiled
+                        G-code program
+        :param priority: TxPriority of the frames (the encoded frames cannot be classified by the tx queues)
+        """
+        self.data = bytes(payload) if encoded else encode_frame(payload)
+        self.priority = priority
+        self.recipients = tuple(recipients)
+        self.skew_statistics = skew_statistics
+        self.created = perf_counter()
+        # recipient -> time the write to its socket was done
+        self.sent_times: Dict[Hashable, float] = {}
+        # recipients the message has not been and is not going to be sent to
+        self.failed_recipients: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not self.recipients:
+            self._done.set()
+
+    def frame(self, recipient: Hashable) -> EncodedFrame:
+        """
+        :param recipient: one of the recipients
+        :return: frame for the tx queue of the recipient, all frames share the same encoded bytes
+        """
+        return EncodedFrame(self.data, lambda: self._sent(recipient), priority=self.priority,
+                            on_failed=lambda: self.fail(recipient))
+
+    def fail(self, recipient: Hashable):
+        """
+        the message is not going to be sent to the recipient (f.e. its tx queue is full or it has been closed)
+        :param recipient: one of the recipients
+        :return: nothing
+        """
+        with self._lock:
+            if recipient in self.sent_times or recipient in self.failed_recipients:
+                return
+            self.failed_recipients.add(recipient)
+            done = len(self.sent_times) + len(self.failed_recipients) == len(self.recipients)
+        if done:
+            self._complete()
+
+    def _sent(self, recipient: Hashable):
+        with self._lock:
+            if recipient in self.sent_times or recipient in self.failed_recipients:
+                return
+            self.sent_times[recipient] = perf_counter()
+            done = len(self.sent_times) + len(self.failed_recipients) == len(self.recipients)
+        if done:
+            self._complete()
+
+    def _complete(self):
+        if self.skew_statistics is not None and self.sent_times:
+            self.skew_statistics.add(self.skew())
+        self._done.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        wait until the message has been sent to (or failed for) every recipient
+        :param timeout: maximum time to wait in seconds
+        :return: true if no recipient is pending anymore, failed() tells the recipients that did not get the message
+        """
+        return self._done.wait(timeout)
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def pending(self) -> tuple:
+        """
+        :return: recipients the message has not been sent to yet
+        """
+        with self._lock:
+            return tuple(r for r in self.recipients if r not in self.sent_times and r not in self.failed_recipients)
+
+    def failed(self) -> tuple:
+        """
+        :return: recipients the message is not going to be sent to
+        """
+        with self._lock:
+            return tuple(r for r in self.recipients if r in self.failed_recipients)
+
+    def skew(self) -> float:
+        """
+        :return: time in seconds between the first and the last write of the message (so far)
+        """
+        with self._lock:
+            times = list(self.sent_times.values())
+        return max(times) - min(times) if times else 0.0
+
+    def report(self) -> dict:
+        """
+        :return: dict with recipients, sent, failed, skew and the latency from creating the fan-out until the first/
+                 last write (seconds)
+        """
+        with self._lock:
+            times = list(self.sent_times.values())
+            failed = len(self.failed_recipients)
+        return {'recipients': len(self.recipients), 'sent': len(times), 'failed': failed,
+                'skew': max(times) - min(times) if times else 0.0,
+                'first': min(times) - self.created if times else 0.0,
+                'last': max(times) - self.created if times else 0.0}
@@ -12,80 +12,144 @@ this module contains the functions used for hw_layer_core communication
 # ---------------------------------------------------------------------------
 # Module Imports
 import cobs.cobs as cobs
-from queue import Queue
+from collections import deque
+from queue import Queue, Empty, Full
 from datetime import datetime
+from time import perf_counter
 from PyQt5.QtNetwork import QTcpSocket
 from socket import socket
-from typing import Union, Iterable
+from typing import Union, Iterable, List, Callable, Hashable, Any
 
 
 # ---------------------------------------------------------------------------
 # ---------------------------------------------------------------------------
 # Imports
-
+from layer_core_communication.statistics import TxStatistics
+from layer_core_communication.wakeup import QueuePolicy, TxPriority
 
 # ---------------------------------------------------------------------------
 
 
-def hw_layer_process_data_rx(data, cops_encode_rx=True):
+# header of a message (first byte after decoding)
+_MSG_HEADER = 0xAA
+# header of a json-encoded message
+_JSON_HEADER = 0xBB
+# default for the maximum size of a frame, the biggest message (experiment upload) has about 16.3 KB
+MAX_FRAME_SIZE = 32768
+# default for the maximum number of bytes that are collected for a single write to the socket
+TX_MAX_BATCH_BYTES = 65536
+# default for the time to wait for more messages before a batch is written (0 -> write immediately)
+TX_MAX_LATENCY = 0.0
+
+
+class FrameDecoder:
+    """
+    - incremental decoder for the byte stream of one connection (one object per socket)
+    - bytes of a frame that is split over several reads are kept until the delimiter is received
+    - every complete frame of a read is returned, not only the first one
+    - if more than max_frame_size bytes are received without a delimiter, the bytes are dropped (garbage input)
     """
-    process received data in form of bytes and put
-    :param cops_encode_rx: if true -> data is encoded via cobs and has to be processed before put into queue
-    :param data: data that is supposed to be put in a clients queue
-    :return: decoded list
-    """
-    # chop data into separate bytes
-    byte_list = _hw_layer_chop_bytes_rx(data)
-    # every entry is a separate message ->
-    for index in range(len(byte_list)):
-        # check seconde byte (= Header after cobs encoding), if true-> normal message
-        if byte_list[index][1] == 0xAA:
-            # if bytes are encoded by cops -> decode
-            if cops_encode_rx:
-                # list to store decoded messages in
-                decoded_list = []
-                # put byte into rx queue
-                entry = bytes(byte_list[index])
-                # decode given bytes and add the message to the list
-                decoded_list.append(list(cobs.decode(entry)))
-                return decoded_list
-            # if not encoded by cobs
-            else:
-                return byte_list  # todo: depending on how the end of messages are defined choose new method to process
-
-        elif byte_list[index][0] == 0xBB:
-            print("JSON-encoding detected")  # todo: implement json-handling!
 
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE, delimiter: int = 0x00, cobs_encoded: bool = True):
+        """
+        :param max_frame_size: maximum number of bytes of an (encoded) frame
+        :param delimiter: delimiter that is used to separate each message
+        :param cobs_encoded: if true -> frames are encoded via cobs and have to be decoded
+        """
+        self.max_frame_size = max_frame_size
+        self.delimiter = bytes([delimiter])
+        self.cobs_encoded = cobs_encoded
+        self._buffer = bytearray()
+        # counters for debugging
+        self.frames = 0
+        self.dropped_frames = 0
+        self.dropped_bytes = 0
+
+    def feed(self, data) -> List[bytes]:
+        """
+        add received data and return all frames that are complete now
+        :param data: received bytes (bytes, bytearray or memoryview)
+        :return: list with the decoded messages
+        """
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        start = 0
+        try:
+            while True:
+                end = buffer.find(self.delimiter, start)
+                if end < 0:
+                    break
+                # the cobs extension does not accept memoryviews, so the frame is sliced (copied) from the buffer
+                frame = buffer[start:end]
+                start = end + 1
+                if frame:
+                    frame = self._decode_frame(frame)
+                    if frame is not None:
+                        frames.append(frame)
+        finally:
+            # remove everything up to the last delimiter, keep the beginning of the next frame (also if decoding a
+            # frame raised, otherwise the frame would be decoded again with every read)
+            if start:
+                del buffer[:start]
+            if len(buffer) > self.max_frame_size:
+                self.dropped_bytes += len(buffer)
+                buffer.clear()
+        return frames
+
+    def reset(self):
+        """
+        drop the bytes of an incomplete frame, f.e. after a reconnect
+        :return: nothing
+        """
+        self._buffer.clear()
+
+    def pending(self) -> int:
+        """
+        :return: number of bytes of the incomplete frame that are kept until the next read
+        """
+        return len(self._buffer)
+
+    def _decode_frame(self, frame: bytearray):
+        """
+        decode a single frame (without delimiter) and check its header
+        :param frame: encoded frame
+        :return: decoded message as bytes, None if the frame is invalid
+        """
+        if self.cobs_encoded:
+            try:
+                frame = cobs.decode(frame)
+            except cobs.DecodeError:
+                self.dropped_frames += 1
+                print("frame could not be decoded and is not going to be processed!")
+                return None
+        else:
+            frame = bytes(frame)
+
+        if not frame:
+            # f.e. b'\x01' decodes to an empty frame
+            self.dropped_frames += 1
+            return None
+        if frame[0] == _MSG_HEADER:
+            self.frames += 1
+            return frame
+        elif frame[0] == _JSON_HEADER:
+            print("JSON-encoding detected")  # todo: implement json-handling!
         else:
             print("header of byte is not valid message is not going to be processed!")
+        self.dropped_frames += 1
+        return None
 
 
-def _hw_layer_chop_bytes_rx(bytestring, delimiter=0x00):
+def hw_layer_process_data_rx(data, cops_encode_rx=True):
     """
-    - chop input-bytes into separate message bytes
-    - check if received bytes are predefined message or json file and based on that choose further handling of msg
-    - if msg: chop the by cobs encoded byte-strings into separate messages, return an array of integers
-    - if json: for now: pass
-    :param delimiter: delimiter that is used to separate each message
-    :param bytestring: bytestring that is supposed to be chopped int separate messages
-    :return: list, with separate messages as elements
+    process received data in form of bytes, data has to contain complete messages only -> for a stream of data use
+    a FrameDecoder per connection
+    :param cops_encode_rx: if true -> data is encoded via cobs and has to be processed before put into queue
+    :param data: data that is supposed to be put in a clients queue
+    :return: list of decoded messages
     """
-    # empty list to append the messages later on
-    chopped_bytes = []
-    # start position of each byte
-    start_byte = 0
-
-    # convert bytes into list
-    data_list = list(bytestring)
-
-    for x in range(len(data_list)):
-        # check if the byte equals delimiter, if so -> end of byte
-        if data_list[x] == delimiter:
-            chopped_bytes.append(data_list[start_byte:x])
-            # start of next byte is right after delimiter
-            start_byte = x + 1
-
-    return chopped_bytes
+    return FrameDecoder(max_frame_size=len(data), cobs_encoded=cops_encode_rx).feed(data)
 
 
 def cobs_encode_tx(bytestring: bytes, cobs_encode=True):
@@ -103,63 +167,222 @@ def cobs_encode_tx(bytestring: bytes, cobs_encode=True):
     return bytestring
 
 
+class EncodedFrame:
+    """
+    - message that has already been encoded via cobs (including the delimiter), it is written as it is
+    - the encoded bytes are immutable and can be shared by the tx queues of many clients (fan-out), each queue gets its
+      own EncodedFrame though, so sent() tells which client the frame has been written to
+    - policy and conflate_key tell a bounded WakeupQueue what to do with the frame if it is full (None -> policy of
+      the queue), priority is its class in a queue with priorities (the frame cannot be classified by its content
+      anymore)
+    - failed() is called instead of sent() if the frame is never going to be written (queue full, client closed)
+    """
+    __slots__ = ('data', 'on_sent', 'policy', 'conflate_key', 'priority', 'on_failed')
+
+    def __init__(self, data: bytes, on_sent: Callable[[], None] = None, policy: QueuePolicy = None,
+                 conflate_key: Hashable = None, priority: TxPriority = None, on_failed: Callable[[], None] = None):
+        """
+        :param data: cobs encoded message followed by the delimiter 0x00 (see encode_frame)
+        :param on_sent: called by hl_tx_handling after the write that contained the frame
+        :param policy: QueuePolicy of the frame
+        :param conflate_key: key of QueuePolicy.CONFLATE, f.e. the msg id
+        :param priority: TxPriority of the frame
+        :param on_failed: called if the frame could not be queued or has been removed from the queue unsent
+        """
+        self.data = data
+        self.on_sent = on_sent
+        self.policy = policy
+        self.conflate_key = conflate_key
+        self.priority = priority
+        self.on_failed = on_failed
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def sent(self):
+        if self.on_sent is not None:
+            self.on_sent()
+
+    def failed(self):
+        if self.on_failed is not None:
+            self.on_failed()
+
+
+def encode_frame(payload) -> bytes:
+    """
+    encode a single message via cobs, so it can be sent as an EncodedFrame
+    :param payload: message (bytes-like) that is supposed to be sent
+    :return: encoded message followed by the delimiter 0x00
+    """
+    return cobs.encode(payload) + b'\x00'
+
+
+def cobs_encode_batch(payloads: Iterable) -> bytes:
+    """
+    encode several messages via cobs into one contiguous buffer, every message is followed by the delimiter 0x00
+    - the encoded messages are joined once, which is much faster than copying them into a preallocated buffer one by
+      one (the buffer would have to be converted to bytes for the socket anyway)
+    :param payloads: messages (bytes-like or EncodedFrame, which is copied without encoding again) that are supposed to
+                     be sent
+    :return: encoded bytes
+    """
+    parts = []
+    for payload in payloads:
+        if isinstance(payload, EncodedFrame):
+            parts.append(payload.data)
+        else:
+            if isinstance(payload, memoryview):
+                # the cobs extension does not accept memoryviews
+                payload = payload.tobytes()
+            parts.append(cobs.encode(payload))
+            # add 0x00 byte, that signals the end of the message for the recipient
+            parts.append(b'\x00')
+    return b''.join(parts)
+
+
+def cobs_decode_batch(buffer) -> List[bytes]:
+    """
+    decode every complete frame of a buffer (bytes after the last delimiter are ignored)
+    :param buffer: cobs encoded frames that are separated by 0x00 (bytes or bytearray)
+    :return: list with the decoded messages
+    """
+    frames = []
+    start = 0
+    while True:
+        end = buffer.find(b'\x00', start)
+        if end < 0:
+            break
+        if end > start:
+            frames.append(cobs.decode(buffer[start:end]))
+        start = end + 1
+    return frames
+
+
 def hl_tx_handling(hl_tx_queue: Queue(), Socket: Union[QTcpSocket, socket], cobs_encode: bool = True,
-                   debug: bool = False):
+                   debug: bool = False, max_batch_bytes: int = TX_MAX_BATCH_BYTES, max_latency: float = TX_MAX_LATENCY,
+                   statistics: TxStatistics = None, first: List = None, split: Callable[[Any], bool] = None):
     """
     - handling of transmitting messages from hardware layer
     - host and client use different kinds of sockets, thats why argument is passed as Union
+    - all messages waiting in the queue are encoded into one buffer and sent with a single write (write coalescing)
+    - EncodedFrames are not encoded again, they are notified once the write that contained them is done
     :param hl_tx_queue: queue to get message(s) for transmitting
     :param Socket: socket that is used
-    :param debug: if true print to console when message is sent
-    :return: return
+    :param cobs_encode: if true -> encode data before sending
+    :param debug: if true print to console when data is sent
+    :param max_batch_bytes: a write is issued once the messages of a batch exceed this number of bytes
+    :param max_latency: time in seconds to wait for more messages before a batch that is not full yet is written,
+                        0 -> write everything that is in the queue right away (this blocks the calling thread!)
+    :param statistics: if given, number of writes, messages and bytes are counted
+    :param first: messages that are written before the messages of the queue (f.e. the commands of a SetpointChannel)
+    :param split: if split(message) is true the batch is written right after the message (f.e. a fragment of a bulk
+                  message, so a message of a higher priority that is put in the meantime waits for one fragment only)
+    :return: nothing
     """
+    if not isinstance(Socket, (QTcpSocket, socket)):
+        raise TypeError
+
     # check if there is any data in queue waiting to be sent
-    while hl_tx_queue.qsize() > 0:
+    while first or hl_tx_queue.qsize() > 0:
+        batch = []
+        # frames that want to know when they have been sent
+        encoded_frames = []
+        batch_bytes = 0
+        if first:
+            batch.extend(first)
+            batch_bytes = sum(len(data) for data in first)
+            first = None
+        deadline = perf_counter() + max_latency
+        while batch_bytes < max_batch_bytes:
+            try:
+                data = hl_tx_queue.get_nowait()
+            except Empty:
+                # wait for more messages if the batch is not due yet
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    data = hl_tx_queue.get(timeout=remaining)
+                except Empty:
+                    break
+            batch.append(data)
+            batch_bytes += len(data)
+            if isinstance(data, EncodedFrame):
+                encoded_frames.append(data)
+            if split is not None and split(data):
+                break
+
+        if not batch:
+            break
+        if cobs_encode:
+            data = cobs_encode_batch(batch)
+        else:
+            data = b''.join(d.data if isinstance(d, EncodedFrame) else d for d in batch)
+
         # Host Server
         if isinstance(Socket, QTcpSocket):
-            data = hl_tx_queue.get_nowait()
-            if cobs_encode:
-                data = cobs_encode_tx(data)
-            # write to socket
+            # write to socket (PyQt converts bytes into a QByteArray)
             Socket.write(data)
             # send the data by using flush
             Socket.flush()
-
-        # ComModule -> there seems to be some issue with get_nowait() for the CM -> rather do get
-        elif isinstance(Socket, socket):
-            data = hl_tx_queue.get(timeout=None)
-            if cobs_encode:
-                data = cobs_encode_tx(data)
-            Socket.send(data)
-
+        # ComModule
         else:
-            raise TypeError
-            return
-
-        time = datetime.now().strftime("%H:%M:%S:")
-        string = "{}: HL: sending Message!\n".format(time)
-        print(string)
-
-
+            Socket.sendall(data)
 
+        for frame in encoded_frames:
+            frame.sent()
+        if statistics is not None:
+            statistics.add_write(len(batch), len(data))
+        if debug:
+            _debug_print_tx_data()
 
 
-def hl_rx_handling(data, rx_queue: Queue, print_to_console=False):
+def hl_rx_handling(data, rx_queue: Queue, print_to_console=False, decoder: FrameDecoder = None,
+                   backlog: deque = None) -> bool:
     """
     handle incoming data by processing data and putting it into the queue for the PL
     :param data: received data
     :param rx_queue: queue that connects to the PL
     :param print_to_console: if true, print the incoming data to the console (debugging only)
-    :return: nothing
+    :param decoder: decoder of the connection, keeps incomplete frames until the next call
+    :param backlog: if given, the messages are put without blocking, the messages that do not fit into the queue are
+                    kept in the backlog (see hl_rx_backlog), otherwise a full queue blocks until the PL caught up
+    :return: true if every message has been put into the queue
     """
     if print_to_console:
         _debug_print_rx_byte(data)
-    bytes_list = hw_layer_process_data_rx(data)
+    if decoder is None:
+        bytes_list = hw_layer_process_data_rx(data)
+    else:
+        bytes_list = decoder.feed(data)
+
+    if backlog is None:
+        # put every msg-element in queue separately, a full queue with QueuePolicy.BLOCK blocks until the PL caught up
+        # (backpressure: the socket is not read in the meantime)
+        for msg in bytes_list:
+            rx_queue.put(msg)
+        return True
+    backlog.extend(bytes_list)
+    return hl_rx_backlog(rx_queue, backlog)
+
 
-    if isinstance(bytes_list, list):
-        # loop through list put every msg-element in queue separately
-        for index in range(len(bytes_list)):
-            rx_queue.put_nowait(bytes_list[index])
+def hl_rx_backlog(rx_queue: Queue, backlog: deque) -> bool:
+    """
+    - put the messages of a backlog into the rx queue without blocking, in the order they have been received
+    - a message that does not fit (queue.Full, counted as rejected by a WakeupQueue) and all messages after it stay in
+      the backlog, the socket should not be read until the backlog is empty (backpressure without blocking the thread
+      that reads the socket, f.e. the Qt main thread of the HostServer)
+    :param rx_queue: queue that connects to the PL
+    :param backlog: messages that have been received but not put into the queue yet
+    :return: true if the backlog is empty
+    """
+    while backlog:
+        try:
+            rx_queue.put_nowait(backlog[0])
+        except Full:
+            return False
+        backlog.popleft()
+    return True
 
 
 def _debug_print_rx_byte(client_data, client_ip=None, pos=False):
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+this module contains the runtime of the layers: a configurable number of worker threads that block on a WakeupChannel
+and handle the queues of a client once they have data
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import threading
+import time
+from typing import Callable, Hashable, List
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.wakeup import WakeupChannel
+
+
+class LayerRuntime:
+    """
+    - runs handler(key) for every key that is posted on the channel
+    - the workers sleep while no queue has data, so an idle client costs no CPU time
+    - a key is never handled by two workers at the same time (see WakeupChannel)
+    """
+
+    def __init__(self, channel: WakeupChannel, handler: Callable[[Hashable], None], num_workers: int = 1,
+                 name: str = "layer"):
+        """
+        :param channel: channel the queues of the layer notify
+        :param handler: function that handles the queue(s) of a key (f.e. a client)
+        :param num_workers: number of worker threads
+        :param name: name of the worker threads (debugging only)
+        """
+        assert num_workers > 0
+        self.channel = channel
+        self.handler = handler
+        self.num_workers = num_workers
+        self.name = name
+        self.running = False
+        self._threads: List[threading.Thread] = []
+        # cpu time of each worker, updated after every handled key
+        self._cpu_times = [0.0] * num_workers
+
+    def start(self):
+        """
+        start the worker threads
+        :return: nothing
+        """
+        self.running = True
+        for index in range(self.num_workers):
+            thread = threading.Thread(target=self._worker, args=(index,), name="{}_{}".format(self.name, index))
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self, timeout: float = None):
+        """
+        stop the workers after they handled the key they are working on and wait until they are finished
+        :param timeout: maximum time to wait for each worker
+        :return: nothing
+        """
+        self.running = False
+        self.channel.close(self.num_workers)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def cpu_time(self) -> float:
+        """
+        :return: cpu time in seconds that has been used by the workers so far
+        """
+        return sum(self._cpu_times)
+
+    def _worker(self, index: int):
+        """
+        function used by each worker thread: wait for a key and handle it
+        """
+        while self.running:
+            key, _ = self.channel.wait()
+            if key is None:
+                break
+            try:
+                self.handler(key)
+            finally:
+                self.channel.done(key)
+                self._cpu_times[index] = time.thread_time()
+        self._cpu_times[index] = time.thread_time()
@@ -12,6 +12,7 @@ this module contains the functions used for protocol_layer_core communication
 # ---------------------------------------------------------------------------
 # Module Imports
 from datetime import datetime
+from typing import Any, Callable
 # ---------------------------------------------------------------------------
 # ---------------------------------------------------------------------------
 # Imports
@@ -29,18 +30,21 @@ def ml_tx_handling(pl_ml_tx_queue: Queue(), msg: core_messages.BaseMessage):
     :param pl_ml_tx_queue: queue that connects to the next layer
     :return: nothing
     """
-    # check if there is anything in queue to transmit
-    pl_ml_tx_queue.put_nowait(msg)
+    # a full queue with QueuePolicy.BLOCK blocks until the PL caught up
+    pl_ml_tx_queue.put(msg)
 
 
-def ml_rx_handling(rx_queue: Queue(), debug: bool = False):
+def ml_rx_handling(rx_queue: Queue(), debug: bool = False, handler: Callable[[Any], None] = None):
     """
     - Routine for checking the rx queue, if size is not 0, do sth
     :param rx_queue: rx queue message-layer
+    :param handler: if given, it is called with every raw message of the queue
     :return: nothing
     """
     while rx_queue.qsize() > 0:
-        rx_queue.get_nowait()
+        raw_message = rx_queue.get_nowait()
+        if handler is not None:
+            handler(raw_message)
         if debug:
             _debug_print_rx_message()
 
@@ -17,9 +17,15 @@ this module contains the functions used for protocol_layer_core communication
 # ---------------------------------------------------------------------------
 from queue import Queue
 from layer_core_communication.core_messages import BASE_MESSAGE_SIZE
+from layer_core_communication.crc import batch_available, crc8, crc8_batch
+from layer_core_communication.statistics import RxStatistics
 from cobs import cobs as cobs
 from dataclasses import dataclass
-from typing import Union
+from typing import Union, List, Optional
+from ctypes import sizeof
+import itertools
+import struct
+import time
 import unittest
 
 # valid range of message parameters
@@ -29,6 +35,32 @@ _ADD0_RANGE = [0, 255]
 _ADD1_RANGE = [0, 255]
 _CMD_RANGE = [0, 255]
 
+# received and dropped frames of all clients
+PL_RX_STATISTICS = RxStatistics()
+# below this number of frames the crc8 is computed frame by frame, numpy does not pay off for a few frames
+_CRC_BATCH_MIN_FRAMES = 16
+
+# fragments of a large message: add0 = PL_FRAGMENT_ADD0, src/ add1 = high/ low byte of the 16 bit sequence number of
+# the message, cmd = index of the fragment, msg = number of fragments, data field = part of the translated message
+PL_FRAGMENT_ADD0 = 0xFF
+# default size of the data field of a fragment
+PL_FRAGMENT_SIZE = 1024
+# one counter for all connections (a message to several clients is fragmented once), 16 bits so a sequence number is
+# not used again on a connection while a message with the same number may still be incomplete
+_fragment_sequence = itertools.count()
+
+
+# header of a message (see MsgProtocol): header, src, add0, add1, cmd, msg, len, crc8
+_HEADER_STRUCT = struct.Struct('<8B')
+
+# G-code messages (msg_builder) take the same rx path: 0xAA, 0xBB, length of the message (2 bytes, big endian), id,
+# payload, crc8 of all bytes before it. They are told apart from the messages of the protocol layer by the second byte
+# (src of a protocol layer message, which must therefore not be 0xBB)
+_GCODE_HEADER_1 = 0xBB
+_GCODE_LENGTH_STRUCT = struct.Struct('>H')
+# header (header 0, header 1, length, id) and crc8
+_GCODE_MIN_SIZE = 6
+
 
 @dataclass(frozen=True)
 class MsgProtocol:
@@ -46,88 +78,221 @@ class MsgProtocol:
     DATA_START_POS: int = 8
 
 
+class _HeaderField:
+    """
+    header field of a _RawMessage, read from the frame when it is accessed
+    """
+    __slots__ = ('position',)
+
+    def __init__(self, position: int):
+        self.position = position
+
+    def __get__(self, raw_message, owner=None):
+        if raw_message is None:
+            return self
+        # indexing bytes returns one of the cached small ints, nothing is created
+        return raw_message.frame[self.position]
+
+
 class _RawMessage:
     """
     creates a RawMessage from input bytes that can then be interpreted from the hw-layer
+    - only the frame is stored, the header fields are read from it when they are accessed and data is a view of the
+      data field (no copy)
     """
+    __slots__ = ('frame',)
+
+    header = _HeaderField(MsgProtocol.HEADER_POS)
+    src = _HeaderField(MsgProtocol.SRC_POS)
+    add0 = _HeaderField(MsgProtocol.ADD_0_POS)
+    add1 = _HeaderField(MsgProtocol.ADD_1_POS)
+    cmd = _HeaderField(MsgProtocol.CMD_POS)
+    msg = _HeaderField(MsgProtocol.MSG_POS)
+    len = _HeaderField(MsgProtocol.LEN_POS)
+    crc8 = _HeaderField(MsgProtocol.CRC8_POS)
 
     # todo: make it possible to not only create a message by byte-input -> directly setting params
-    def __init__(self, byte_list: list):
-        length = len(byte_list)
-        self.header: int = byte_list[MsgProtocol.HEADER_POS]
-        self.src: int = byte_list[MsgProtocol.SRC_POS]
-        self.add0: int = byte_list[MsgProtocol.ADD_0_POS]
-        self.add1: int = byte_list[MsgProtocol.ADD_1_POS]
-        self.cmd: int = byte_list[MsgProtocol.CMD_POS]
-        self.msg: int = byte_list[MsgProtocol.MSG_POS]
-        self.len: int = byte_list[MsgProtocol.LEN_POS]
-        self.crc8: int = byte_list[MsgProtocol.CRC8_POS]
-        self.data: int = byte_list[MsgProtocol.DATA_START_POS:length - 1]
+    def __init__(self, byte_list):
+        """
+        :param byte_list: frame (bytes, bytearray), a list of ints is converted
+        """
+        self.frame = byte_list if isinstance(byte_list, (bytes, bytearray, memoryview)) else bytes(byte_list)
+
+    @property
+    def data(self) -> memoryview:
+        """
+        :return: view of the data field (the rest of the frame after the header)
+        """
+        return memoryview(self.frame)[MsgProtocol.DATA_START_POS:]
 
+    def header_fields(self) -> tuple:
+        """
+        :return: all fields of the header at once (see MsgProtocol): header, src, add0, add1, cmd, msg, len, crc8
+        """
+        return _HEADER_STRUCT.unpack_from(self.frame)
 
-def pl_create_raw_msg_rx(bytes_msg: list):
+
+# public name of the raw messages that are handed to the message layer (f.e. for type hints)
+RawMessage = _RawMessage
+
+
+def pl_create_raw_msg_rx(bytes_msg: list, statistics: RxStatistics = PL_RX_STATISTICS):
     """
     create from a list of bytes a raw message that can be interpreted later
     :param bytes_msg: list of bytes to create message from
-    :return: not
+    :param statistics: counts the received and dropped frames
+    :return: the raw message or None if the message is invalid (dropped)
     """
+    statistics.add_received()
+    return _create_raw_msg_rx(bytes_msg, None, statistics)
+
+
+def pl_create_raw_msgs_rx(frames: list, statistics: RxStatistics = PL_RX_STATISTICS) -> list:
+    """
+    create the raw messages of many frames at once, the crc8 of all frames is computed at once (see crc8_batch)
+    :param frames: decoded frames
+    :param statistics: counts the received and dropped frames
+    :return: list of the valid raw messages, invalid messages are dropped
+    """
+    statistics.add_received(len(frames))
+    if len(frames) >= _CRC_BATCH_MIN_FRAMES and batch_available():
+        crcs = crc8_batch([_crc_range(frame) for frame in frames]).tolist()
+    else:
+        crcs = [None] * len(frames)
+    raw_messages = []
+    for frame, crc in zip(frames, crcs):
+        raw_message = _create_raw_msg_rx(frame, crc, statistics)
+        if raw_message is not None:
+            raw_messages.append(raw_message)
+    return raw_messages
+
+
+def pl_is_gcode_frame(frame) -> bool:
+    """
+    :param frame: decoded frame (bytes-like)
+    :return: true if the frame is a G-code message (see msg_builder) and not a message of the protocol layer
+    """
+    return len(frame) >= 2 and frame[MsgProtocol.HEADER_POS] == _HEADER_VALUE[0] and \
+        frame[MsgProtocol.SRC_POS] == _GCODE_HEADER_1
+
+
+def _crc_range(frame) -> memoryview:
+    # bytes that are covered by the crc8: the data field of a protocol layer message, everything but the crc8 of a
+    # G-code message
+    if pl_is_gcode_frame(frame):
+        return memoryview(frame)[:-1]
+    return memoryview(frame)[MsgProtocol.DATA_START_POS:]
+
+
+def _create_raw_msg_rx(bytes_msg, crc, statistics: RxStatistics):
+    if len(bytes_msg) < (_GCODE_MIN_SIZE if pl_is_gcode_frame(bytes_msg) else BASE_MESSAGE_SIZE):
+        statistics.add_dropped('length')
+        return None
     raw_message = _RawMessage(bytes_msg)
-    if _check_raw_msg_rx(raw_message) is True:
+    if _check_raw_msg_rx(raw_message, crc, statistics) is True:
         return raw_message
-    else:
-        pass  # todo
+    return None
 
 
-def _check_raw_msg_rx(msg: _RawMessage):
+def _check_gcode_msg_rx(frame, crc: int = None, statistics: RxStatistics = PL_RX_STATISTICS) -> bool:
+    """
+    check the length and the crc8 of a G-code message
+    :param frame: G-code message (see pl_is_gcode_frame)
+    :param crc: crc8 of the message without its crc8 if it has already been computed
+    :param statistics: counts the dropped frames
+    :return: true -> message valid; false -> invalid message
+    """
+    length, = _GCODE_LENGTH_STRUCT.unpack_from(frame, 2)
+    if length != len(frame):
+        statistics.add_dropped('length')
+        return False
+    if (crc8(memoryview(frame)[:-1]) if crc is None else crc) != frame[-1]:
+        statistics.add_dropped('crc')
+        return False
+    return True
+
+
+def _check_raw_msg_rx(msg: _RawMessage, crc: int = None, statistics: RxStatistics = PL_RX_STATISTICS):
     """
     conduct message checks
     :param msg: message that is going to be validated
+    :param crc: crc8 of the data field (of the whole message for a G-code message) if it has already been computed
+    :param statistics: counts the dropped frames
     :return: true -> message valid; false -> invalid message
     """
+    if pl_is_gcode_frame(msg.frame):
+        # the header of a G-code message has a different layout and its crc8 is at the end
+        return _check_gcode_msg_rx(msg.frame, crc, statistics)
+    # all header fields are read with one unpack
+    header, src, add0, add1, cmd, _, _, msg_crc8 = msg.header_fields()
     # no need to check for json here
-    if not msg.header == 0xAA:
+    if not header == 0xAA:
         print("header corrupted")
+        statistics.add_dropped('header')
         return False
-    if not _SRC_RANGE[0] <= msg.src <= _SRC_RANGE[1]:
+    if not _SRC_RANGE[0] <= src <= _SRC_RANGE[1]:
         print("SRC not in expected range, can not create raw_msg!")
+        statistics.add_dropped('range')
         return False
-    if not _ADD0_RANGE[0] <= msg.add0 <= _ADD0_RANGE[1]:
+    if not _ADD0_RANGE[0] <= add0 <= _ADD0_RANGE[1]:
         print("ADD_0 not in expected range, can not create raw_msg!")
+        statistics.add_dropped('range')
         return False
-    if not _ADD1_RANGE[0] <= msg.add1 <= _ADD1_RANGE[1]:
+    if not _ADD1_RANGE[0] <= add1 <= _ADD1_RANGE[1]:
         print("ADD1 not in expected range, can not create raw_msg!")
+        statistics.add_dropped('range')
         return False
-    if not _CMD_RANGE[0] <= msg.cmd <= _CMD_RANGE[1]:
+    if not _CMD_RANGE[0] <= cmd <= _CMD_RANGE[1]:
         print("CMD not in expected range, can not create raw_msg!")
+        statistics.add_dropped('range')
         return False
     # todo: len-check
     # if not msg.len == len(msg.data):  # todo: did I get this right? or should I just look for the overhead?
     #     print("length byte of message incorrect, can not create raw_msg!")
-    # todo: crc8-check!
+    if (crc8(msg.data) if crc is None else crc) != msg_crc8:
+        # corrupted frames are only counted, printing every one of them would flood the console
+        statistics.add_dropped('crc')
+        return False
     return True
 
 
-def pl_translate_msg_tx(msg, cobs_encode = False):
+
+def pl_msg_size(msg) -> int:
+    """
+    :param msg: message that is supposed to be translated
+    :return: number of bytes of the translated message (header + data field)
+    """
+    return BASE_MESSAGE_SIZE + sizeof(msg.data_struct)
+
+
+def pl_pack_msg_into(msg, buffer, offset: int = 0) -> int:
+    """
+    - pack header and data field of a message directly into a preallocated buffer, without any intermediate objects
+    - the data field is copied straight from the ctypes structure of the message, the crc8 of the data field is
+      written into the header
+    :param msg: msg that is supposed to be translated
+    :param buffer: writable buffer (bytearray, memoryview) with at least pl_msg_size(msg) bytes after offset
+    :param offset: position of the header in the buffer
+    :return: position after the last byte of the message
+    """
+    _HEADER_STRUCT.pack_into(buffer, offset, msg.header, msg.src, msg.add0, msg.add1, msg.cmd, msg.msg, msg.len,
+                             msg.crc8)
+    start = offset + MsgProtocol.DATA_START_POS
+    end = start + sizeof(msg.data_struct)
+    with memoryview(buffer) as view:
+        view[start:end] = memoryview(msg.data_struct).cast('B')
+        view[offset + MsgProtocol.CRC8_POS] = crc8(view[start:end])
+    return end
+
+
+def pl_translate_msg_tx(msg, cobs_encode=False):
     """
     - this message builder creates a buffer from a given Message so it can be sent
     :param msg: msg that is supposed to be translated
     :return: translated message as bytearray
     """
-    # determine the size of data
-    payload_size = len(msg.data)
-    # length of complete message
-    msg_length = BASE_MESSAGE_SIZE + payload_size
-    buffer = bytearray(msg_length)
-
-    buffer[MsgProtocol.HEADER_POS] = msg.header
-    buffer[MsgProtocol.SRC_POS] = msg.src
-    buffer[MsgProtocol.ADD_0_POS] = msg.add0
-    buffer[MsgProtocol.ADD_1_POS] = msg.add1
-    buffer[MsgProtocol.CMD_POS] = msg.cmd
-    buffer[MsgProtocol.MSG_POS] = msg.msg
-    buffer[MsgProtocol.LEN_POS] = msg.len
-    buffer[MsgProtocol.CRC8_POS] = msg.crc8
-    buffer[MsgProtocol.DATA_START_POS:msg_length] = msg.data_struct
+    buffer = bytearray(pl_msg_size(msg))
+    pl_pack_msg_into(msg, buffer)
 
     if cobs_encode:
         buffer = cobs.encode(buffer)
@@ -135,6 +300,100 @@ def pl_translate_msg_tx(msg, cobs_encode = False):
     return buffer
 
 
+def pl_is_fragment(frame) -> bool:
+    """
+    :param frame: translated message (bytes-like)
+    :return: true if the frame is a fragment of a larger message (see pl_fragment_msg)
+    """
+    return len(frame) >= BASE_MESSAGE_SIZE and frame[MsgProtocol.HEADER_POS] == _HEADER_VALUE[0] and \
+        frame[MsgProtocol.ADD_0_POS] == PL_FRAGMENT_ADD0
+
+
+def pl_fragment_msg(frame, fragment_size: int = PL_FRAGMENT_SIZE) -> List[bytes]:
+    """
+    - split a translated message into fragments, so that a message of a higher priority can be sent in between (the
+      recipient puts the message together again with a FragmentReassembler)
+    - every fragment is a message of its own with the crc8 of its data field
+    :param frame: translated message
+    :param fragment_size: maximum size of the data field of a fragment
+    :return: list of fragments, [frame] if it fits into one fragment
+    """
+    if len(frame) <= BASE_MESSAGE_SIZE + fragment_size:
+        return [frame]
+    count = -(-len(frame) // fragment_size)
+    if count > 255:
+        raise ValueError("message of {} bytes does not fit into 255 fragments of {} bytes".format(len(frame),
+                                                                                              fragment_size))
+    sequence = next(_fragment_sequence) & 0xFFFF
+    fragments = []
+    with memoryview(frame) as view:
+        for index in range(count):
+            chunk = view[index * fragment_size:(index + 1) * fragment_size]
+            fragment = bytearray(BASE_MESSAGE_SIZE + len(chunk))
+            _HEADER_STRUCT.pack_into(fragment, 0, _HEADER_VALUE[0], sequence >> 8, PL_FRAGMENT_ADD0, sequence & 0xFF,
+                                     index, count, len(chunk) & 0xFF, crc8(chunk))
+            fragment[MsgProtocol.DATA_START_POS:] = chunk
+            fragments.append(bytes(fragment))
+    return fragments
+
+
+class FragmentReassembler:
+    """
+    - puts the fragments of the messages of one connection together again (see pl_fragment_msg)
+    - fragments of other messages may arrive in between, a message whose fragments are not complete after timeout
+      seconds is dropped
+    """
+
+    def __init__(self, timeout: float = 1.0, statistics: RxStatistics = PL_RX_STATISTICS):
+        """
+        :param timeout: time in seconds from the first until the last fragment of a message
+        :param statistics: counts the dropped messages ('fragment')
+        """
+        self.timeout = timeout
+        self.statistics = statistics
+        # sequence number -> [fragments, number of received fragments, time of the first fragment]
+        self._messages = {}
+
+    def feed(self, raw_message: _RawMessage) -> Optional[bytes]:
+        """
+        :param raw_message: valid fragment
+        :return: the translated message once all of its fragments have been received, else None
+        """
+        sequence, index, count = raw_message.src << 8 | raw_message.add1, raw_message.cmd, raw_message.msg
+        if index >= count:
+            self.statistics.add_dropped('fragment')
+            return None
+        now = time.monotonic()
+        entry = self._messages.get(sequence)
+        if entry is not None and (len(entry[0]) != count or now - entry[2] > self.timeout):
+            # the sequence number is used by a new message, the old one is not going to be completed
+            del self._messages[sequence]
+            self.statistics.add_dropped('fragment')
+            entry = None
+        if entry is None:
+            self._drop_expired(now)
+            entry = self._messages[sequence] = [[None] * count, 0, now]
+        fragments = entry[0]
+        if fragments[index] is None:
+            entry[1] += 1
+        fragments[index] = bytes(raw_message.data)
+        if entry[1] < count:
+            return None
+        del self._messages[sequence]
+        return b''.join(fragments)
+
+    def pending(self) -> int:
+        """
+        :return: number of messages whose fragments are not complete yet
+        """
+        return len(self._messages)
+
+    def _drop_expired(self, now: float):
+        for sequence in [sequence for sequence, entry in self._messages.items() if now - entry[2] > self.timeout]:
+            del self._messages[sequence]
+            self.statistics.add_dropped('fragment')
+
+
 def pl_tx_handling(pl_ml_tx_queue: Queue(), hl_tx_queue: Queue()):
     """
     - Routine for checking the tx queue, if size is not 0, process msg from hl by translate it into a bytearray
@@ -149,23 +408,35 @@ def pl_tx_handling(pl_ml_tx_queue: Queue(), hl_tx_queue: Queue()):
         msg = pl_ml_tx_queue.get_nowait()
         # translate msg into bytes for hardware layer
         msg_bytearray = pl_translate_msg_tx(msg)
-        hl_tx_queue.put_nowait(msg_bytearray)
+        # a full queue with QueuePolicy.BLOCK blocks until the HL caught up
+        hl_tx_queue.put(msg_bytearray)
 
 
-def pl_rx_handling(hl_rx_queue: Queue(), pl_ml_rx_queue: Queue()):
+def pl_rx_handling(hl_rx_queue: Queue(), pl_ml_rx_queue: Queue(), reassembler: FragmentReassembler = None):
     """
     - Routine for checking the rx queue, if size is not 0, create a raw message from bytes_msg
     - loop through the clients and check if there are any data that is supposed to be sent
     :param hl_rx_queue:
     :param pl_ml_rx_queue:
+    :param reassembler: if given, fragments are put together and the message is forwarded once it is complete
     :return: nothing
     """
 
+    frames = []
     while hl_rx_queue.qsize() > 0:
         # get data from rx_queue
-        bytes_msg = hl_rx_queue.get_nowait()
-        # create a new raw message from data bytes
-        raw_message = pl_create_raw_msg_rx(bytes_msg)
-        # put raw message in queue for message-layer
-        pl_ml_rx_queue.put_nowait(raw_message)
+        frames.append(hl_rx_queue.get_nowait())
+    # create the raw messages of all frames at once, invalid frames are dropped
+    for raw_message in pl_create_raw_msgs_rx(frames):
+        if reassembler is not None and raw_message.add0 == PL_FRAGMENT_ADD0:
+            frame = reassembler.feed(raw_message)
+            if frame is None:
+                continue
+            # every fragment has been checked already, the message is checked according to its own framing (a G-code
+            # message by its length and crc8) and not counted as received a second time
+            raw_message = _create_raw_msg_rx(frame, None, PL_RX_STATISTICS)
+            if raw_message is None:
+                continue
+        # put raw message in queue for message-layer (blocks if the queue is full and its policy is QueuePolicy.BLOCK)
+        pl_ml_rx_queue.put(raw_message)
 
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+this module contains the setpoint channel of a client: only the newest command of every key (f.e. the msg id of a
+control input) is kept, a command that is set while an older one has not been sent yet replaces it, so a robot never
+runs a command that is older than the newest one the host knows about
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import threading
+from time import perf_counter
+from typing import Hashable, List
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+from layer_core_communication.statistics import LatencyStatistics
+from layer_core_communication.wakeup import WakeupChannel
+
+
+class SetpointChannel:
+    """
+    - newest command (translated message) per key of one client
+    - rate == 0 (on change): set() wakes up the tx thread via the channel right away
+    - rate > 0 (fixed rate): the commands are sampled at most rate times per second, the tx thread is woken up by
+      sample() (f.e. called by a timer thread)
+    - take() returns the commands that changed since the last sample, the tx thread writes them before the messages of
+      the tx queue
+    """
+
+    def __init__(self, channel: WakeupChannel = None, key: Hashable = None, rate: float = 0.0):
+        """
+        :param channel: channel of the tx thread
+        :param key: key that is posted to the channel (f.e. the client)
+        :param rate: samples per second, 0 -> on change
+        """
+        self.channel = channel
+        self.key = key
+        self.rate = rate
+        self._lock = threading.Lock()
+        # key -> (command, time it has been set), commands that have not been sent yet
+        self._pending = {}
+        self._next_sample = 0.0
+        self._first_set = None
+        self.sent = 0
+        # commands that have been replaced before they were sent
+        self.superseded = 0
+        # time from set() until the command has been taken by the tx thread
+        self.age = LatencyStatistics()
+
+    def set(self, key: Hashable, command):
+        """
+        :param key: key of the command, f.e. the msg id
+        :param command: translated message
+        :return: nothing
+        """
+        now = perf_counter()
+        with self._lock:
+            if key in self._pending:
+                self.superseded += 1
+            self._pending[key] = (command, now)
+            if self._first_set is None:
+                self._first_set = now
+        if self.rate <= 0 and self.channel is not None:
+            self.channel.notify(self.key)
+
+    def pending(self) -> bool:
+        return bool(self._pending)
+
+    def sample(self) -> bool:
+        """
+        wake up the tx thread if there are commands to send and the next sample is due (fixed rate)
+        :return: true if the tx thread has been woken up
+        """
+        if not self._pending or perf_counter() < self._next_sample:
+            return False
+        if self.channel is not None:
+            self.channel.notify(self.key)
+        return True
+
+    def take(self) -> List:
+        """
+        :return: commands that changed since the last sample (oldest first), nothing if the next sample is not due
+        """
+        if not self._pending:
+            return []
+        now = perf_counter()
+        with self._lock:
+            if now < self._next_sample:
+                return []
+            pending = sorted(self._pending.values(), key=lambda entry: entry[1])
+            self._pending.clear()
+            if self.rate > 0:
+                self._next_sample = now + 1 / self.rate
+            self.sent += len(pending)
+        for _, set_time in pending:
+            self.age.add(now - set_time)
+        return [command for command, _ in pending]
+
+    def report(self) -> dict:
+        """
+        :return: dict with sent commands, send rate (commands per second since the first command), superseded commands
+                 and the age of the commands when they have been taken (seconds, see LatencyStatistics)
+        """
+        elapsed = perf_counter() - self._first_set if self._first_set is not None else 0.0
+        return {'sent': self.sent, 'send_rate': self.sent / elapsed if elapsed > 0 else 0.0,
+                'superseded': self.superseded, 'pending': len(self._pending), 'age': self.age.report()}
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+this module contains small helpers to measure the communication (latencies, counters)
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import threading
+from collections import deque
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+
+
+class LatencyStatistics:
+    """
+    - collects latency samples (in seconds)
+    - count, mean and max are kept over all samples, percentiles are computed over the last window_size samples
+    """
+
+    def __init__(self, window_size: int = 10000):
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency: float):
+        """
+        add a latency sample
+        :param latency: latency in seconds
+        :return: nothing
+        """
+        with self._lock:
+            self._window.append(latency)
+            self.count += 1
+            self.total += latency
+            if latency > self.max:
+                self.max = latency
+
+    def percentile(self, p: float) -> float:
+        """
+        percentile over the last window_size samples
+        :param p: percentile in [0, 100]
+        :return: latency in seconds, 0 if there are no samples
+        """
+        with self._lock:
+            samples = sorted(self._window)
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def report(self) -> dict:
+        """
+        :return: dict with count, mean, p50, p99 and max (latencies in seconds)
+        """
+        mean = self.total / self.count if self.count else 0.0
+        return {'count': self.count, 'mean': mean, 'p50': self.percentile(50), 'p99': self.percentile(99),
+                'max': self.max}
+
+
+class TxStatistics:
+    """
+    counts the writes to a socket and the messages/ bytes that are sent with them
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.messages = 0
+        self.bytes = 0
+
+    def add_write(self, num_messages: int, num_bytes: int):
+        """
+        :param num_messages: number of messages that have been sent with the write
+        :param num_bytes: number of bytes of the write
+        :return: nothing
+        """
+        with self._lock:
+            self.writes += 1
+            self.messages += num_messages
+            self.bytes += num_bytes
+
+    def report(self) -> dict:
+        """
+        :return: dict with writes, messages, bytes and writes (= syscalls) per message
+        """
+        writes_per_message = self.writes / self.messages if self.messages else 0.0
+        return {'writes': self.writes, 'messages': self.messages, 'bytes': self.bytes,
+                'writes_per_message': writes_per_message}
+
+
+class RxStatistics:
+    """
+    counts the received frames and the frames that have been dropped (f.e. because of a wrong crc8)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.received = 0
+        # reason -> number of dropped frames
+        self.dropped = {}
+
+    def add_received(self, num_frames: int = 1):
+        with self._lock:
+            self.received += num_frames
+
+    def add_dropped(self, reason: str):
+        """
+        :param reason: why the frame has been dropped, f.e. 'crc'
+        :return: nothing
+        """
+        with self._lock:
+            self.dropped[reason] = self.dropped.get(reason, 0) + 1
+
+    def report(self) -> dict:
+        """
+        :return: dict with received frames, dropped frames (total and per reason) and the fraction of dropped frames
+        """
+        with self._lock:
+            dropped = dict(self.dropped)
+            received = self.received
+        total = sum(dropped.values())
+        return {'received': received, 'dropped': total, 'dropped_by_reason': dropped,
+                'drop_rate': total / received if received else 0.0}
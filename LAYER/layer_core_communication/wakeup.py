@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------
+# Created By  : David Stoll
+# Supervisor  : Dustin Lehmann
+# Created Date: 18/10/26
+# version ='1.0'
+# ---------------------------------------------------------------------------
+"""
+this module contains the wakeup channel that lets a thread block until any queue of any client has data, instead of
+looping over every queue and polling qsize(), and the bounded queues whose policy decides what happens to a message
+once a queue is full (backpressure)
+"""
+# ---------------------------------------------------------------------------
+# Module Imports
+import queue
+import threading
+import time
+from collections import deque
+from enum import Enum, IntEnum
+from typing import Any, Callable, Hashable, Optional, Tuple
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Imports
+# ---------------------------------------------------------------------------
+
+
+class WakeupChannel:
+    """
+    - shared readiness source for many queues: every put on a WakeupQueue posts the key of its owner (f.e. the client)
+    - a key is posted only once until it has been handled, so a burst of messages results in a single wakeup
+    - a key that is handled by a thread (active) is not handed out to a second thread, this keeps the per-client order
+      of messages even if several threads wait on the same channel
+    """
+
+    def __init__(self):
+        self._ready = queue.Queue()
+        self._lock = threading.Lock()
+        # key -> time of the first notify since the key has been handled the last time
+        self._pending = {}
+        self._active = set()
+
+    def notify(self, key: Hashable):
+        """
+        signal that the queue(s) of key have data
+        :param key: key of the owner of the queue, f.e. the client
+        :return: nothing
+        """
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending[key] = time.perf_counter()
+            # key is handled right now -> done() is going to post it again
+            if key in self._active:
+                return
+        self._ready.put_nowait(key)
+
+    def wait(self, timeout: Optional[float] = None) -> Tuple[Any, Optional[float]]:
+        """
+        block until a key is ready, the key has to be released with done() after it has been handled
+        :param timeout: maximum time to wait in seconds, None -> wait forever
+        :return: (key, time of the first notify as perf_counter()), (None, None) on timeout or if the channel is closed
+        """
+        try:
+            key = self._ready.get(timeout=timeout)
+        except queue.Empty:
+            return None, None
+        if key is None:
+            return None, None
+        with self._lock:
+            notify_time = self._pending.pop(key, None)
+            self._active.add(key)
+        return key, notify_time
+
+    def done(self, key: Hashable):
+        """
+        release a key that has been returned by wait()
+        :param key: key that has been handled
+        :return: nothing
+        """
+        with self._lock:
+            self._active.discard(key)
+            requeue = key in self._pending
+        if requeue:
+            self._ready.put_nowait(key)
+
+    def close(self, num_waiters: int = 1):
+        """
+        wake up waiting threads so they can shut down
+        :param num_waiters: number of threads that are waiting on the channel
+        :return: nothing
+        """
+        for _ in range(num_waiters):
+            self._ready.put_nowait(None)
+
+
+class QueuePolicy(Enum):
+    """
+    what a bounded queue does with a message that is put while the queue is full
+    """
+    # wait until there is space (put_nowait()/ timeout -> queue.Full), f.e. config messages, the oldest queued message
+    # with DROP_OLDEST is dropped to make space if there is one
+    BLOCK = 0
+    # raise queue.Full right away, the sender decides what to do
+    REJECT = 1
+    # drop the oldest queued message with this policy (f.e. telemetry), if there is none the new message is dropped,
+    # messages with other policies are never dropped to make space
+    DROP_OLDEST = 2
+    # replace the queued message with the same key (f.e. the msg id of a control input), the new message takes the
+    # position of the old one, without a queued message of the key -> DROP_OLDEST
+    CONFLATE = 3
+
+
+class TxPriority(IntEnum):
+    """
+    class of a message in a priority queue, a message is taken out of the queue before all messages of lower classes
+    """
+    # f.e. FSM state changes (stop), supervisor
+    SAFETY = 0
+    # control inputs
+    CONTROL = 1
+    # configuration, everything that is not classified otherwise
+    CONFIG = 2
+    # large messages and their fragments (experiments, sequences)
+    BULK = 3
+
+
+class _ConflatedItem:
+    # queued message that can be replaced by a newer message with the same key
+    __slots__ = ('key', 'item')
+
+    def __init__(self, key: Hashable, item):
+        self.key = key
+        self.item = item
+
+
+class _PriorityDeque:
+    """
+    storage of a WakeupQueue with priorities: one deque per TxPriority, popleft() takes the oldest item of the highest
+    class, iterating goes through the items in the order they are taken
+    """
+
+    def __init__(self, priority: Callable[[Any], TxPriority]):
+        self.priority = priority
+        self.deques = tuple(deque() for _ in TxPriority)
+        self._length = 0
+
+    def append(self, item):
+        message = item.item if type(item) is _ConflatedItem else item
+        self.deques[self.priority(message)].append(item)
+        self._length += 1
+
+    def popleft(self):
+        for items in self.deques:
+            if items:
+                self._length -= 1
+                return items.popleft()
+        raise IndexError('pop from an empty _PriorityDeque')
+
+    def clear(self):
+        for items in self.deques:
+            items.clear()
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        for items in self.deques:
+            yield from items
+
+    def __delitem__(self, index: int):
+        for items in self.deques:
+            if index < len(items):
+                del items[index]
+                self._length -= 1
+                return
+            index -= len(items)
+        raise IndexError('_PriorityDeque index out of range')
+
+    def depths(self) -> dict:
+        """
+        :return: dict priority name -> number of queued items
+        """
+        return {priority.name.lower(): len(items) for priority, items in zip(TxPriority, self.deques)}
+
+
+class WakeupQueue(queue.Queue):
+    """
+    - queue.Queue that notifies a WakeupChannel whenever an item is put
+    - if maxsize is set, the policy of an item decides what happens once the queue is full (QueuePolicy):
+        - items with a policy attribute (f.e. EncodedFrame) bring their own policy and conflate_key
+        - otherwise classify(item) -> (policy, conflate_key) is used if given, else the policy of the queue
+    - the depth and the number of dropped, conflated and rejected items are counted (report())
+    - with priority(item) -> TxPriority, get() returns the oldest item of the highest class (f.e. a safety message is
+      sent before the fragments of an experiment that have been queued earlier), items of TxPriority.SAFETY are
+      always put, even if the queue is full
+    """
+
+    def __init__(self, maxsize: int = 0, channel: WakeupChannel = None, key: Hashable = None,
+                 policy: QueuePolicy = QueuePolicy.BLOCK,
+                 classify: Callable[[Any], Tuple[QueuePolicy, Optional[Hashable]]] = None,
+                 priority: Callable[[Any], TxPriority] = None):
+        """
+        :param maxsize: maximum number of items, 0 -> unbounded
+        :param channel: channel that is notified for every put
+        :param key: key that is posted to the channel (f.e. the client)
+        :param policy: policy of the items that do not have one
+        :param classify: returns the policy and the conflate key (or None) of an item
+        :param priority: returns the class of an item, None -> FIFO
+        """
+        super().__init__(maxsize)
+        if priority is not None:
+            self.queue = _PriorityDeque(priority)
+        self.channel = channel
+        self.key = key
+        self.policy = policy
+        self.classify = classify
+        # conflate key -> queued item
+        self._slots = {}
+        self.puts = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None):
+        """
+        put an item according to its policy
+        :param item: item that is put into the queue
+        :param block: only used by QueuePolicy.BLOCK, see queue.Queue.put()
+        :param timeout: only used by QueuePolicy.BLOCK, see queue.Queue.put()
+        :return: nothing, raises queue.Full if the item has been rejected
+        """
+        policy, conflate_key = self._policy_of(item)
+        if isinstance(self.queue, _PriorityDeque) and self.queue.priority(item) is TxPriority.SAFETY:
+            # a safety message does not wait behind a queue that is full of bulk messages, it may exceed maxsize
+            with self.not_full:
+                self.unfinished_tasks += 1
+                self._put(item)
+                self.not_empty.notify()
+            return
+        if policy is QueuePolicy.BLOCK:
+            with self.not_full:
+                if 0 < self.maxsize <= self._qsize() and self._drop_oldest():
+                    # the message takes the place of a message that may be dropped (f.e. an ack in a queue full of
+                    # telemetry), the number of unfinished tasks does not change
+                    self.dropped += 1
+                    self._put(item)
+                    self.not_empty.notify()
+                    return
+            try:
+                super().put(item, block, timeout)
+            except queue.Full:
+                with self.mutex:
+                    self.rejected += 1
+                raise
+            return
+        with self.not_full:
+            if policy is QueuePolicy.CONFLATE and conflate_key is not None:
+                slot = self._slots.get(conflate_key)
+                if slot is not None:
+                    # already queued (and notified), only the message is replaced
+                    slot.item = item
+                    self.conflated += 1
+                    return
+            if 0 < self.maxsize <= self._qsize():
+                if policy is QueuePolicy.REJECT:
+                    self.rejected += 1
+                    raise queue.Full
+                self.dropped += 1
+                if not self._drop_oldest():
+                    return
+                # the dropped item is replaced, the number of unfinished tasks does not change
+            else:
+                self.unfinished_tasks += 1
+            if policy is QueuePolicy.CONFLATE and conflate_key is not None:
+                item = self._slots[conflate_key] = _ConflatedItem(conflate_key, item)
+            self._put(item)
+            self.not_empty.notify()
+
+    def report(self) -> dict:
+        """
+        :return: dict with depth, maxsize, maximum depth so far and the number of put, dropped, conflated and rejected
+                 items (and the depth per TxPriority)
+        """
+        with self.mutex:
+            report = {'depth': self._qsize(), 'maxsize': self.maxsize, 'max_depth': self.max_depth, 'put': self.puts,
+                      'dropped': self.dropped, 'conflated': self.conflated, 'rejected': self.rejected}
+            if isinstance(self.queue, _PriorityDeque):
+                report['depth_by_priority'] = self.queue.depths()
+        return report
+
+    def _policy_of(self, item) -> Tuple[QueuePolicy, Optional[Hashable]]:
+        policy = getattr(item, 'policy', None)
+        if policy is not None:
+            return policy, item.conflate_key
+        if self.classify is not None:
+            return self.classify(item)
+        return self.policy, None
+
+    def _drop_oldest(self) -> bool:
+        # remove the oldest item with QueuePolicy.DROP_OLDEST, the queue is full so this only happens under overload
+        for index, queued in enumerate(self.queue):
+            if type(queued) is not _ConflatedItem and self._policy_of(queued)[0] is QueuePolicy.DROP_OLDEST:
+                del self.queue[index]
+                return True
+        return False
+
+    def _put(self, item):
+        super()._put(item)
+        self.puts += 1
+        if len(self.queue) > self.max_depth:
+            self.max_depth = len(self.queue)
+        if self.channel is not None:
+            self.channel.notify(self.key)
+
+    def _get(self):
+        item = self.queue.popleft()
+        if type(item) is _ConflatedItem:
+            del self._slots[item.key]
+            return item.item
+        return item